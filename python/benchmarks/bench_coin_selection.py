@@ -0,0 +1,73 @@
+"""
+    Coin selection benchmark
+
+    Runs CoinSelector over synthetic UTXO sets (log-normal values) and compares
+    it with the largest-first baseline: selection time, inputs used, fee paid,
+    change outputs created and Bitcoin Core waste. "selector" prepares the
+    UTXOs on every call, "prepared" reuses one CoinSelector.prepare result.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_coin_selection --utxos 100 1000 10000 --fee-rate 5
+"""
+import argparse
+import random
+import time
+
+from python.bitcoin_wallet.core.coin_selection import CoinSelector
+
+
+def synthetic_utxos(count: int, rng: random.Random):
+    utxos = [
+        {'txid': f"{i:064x}", 'vout': 0, 'value': int(rng.lognormvariate(11, 1.5))}
+        for i in range(count)
+    ]
+    # UtxoDB.select_candidates hands them out largest first
+    utxos.sort(key=lambda utxo: utxo['value'], reverse=True)
+    return utxos
+
+
+def run(utxo_counts, payments: int, fee_rate: float, long_term_fee_rate: float, seed: int):
+    selector = CoinSelector(fee_rate, long_term_fee_rate=long_term_fee_rate)
+    for count in utxo_counts:
+        rng = random.Random(seed)
+        utxos = synthetic_utxos(count, rng)
+        start = time.perf_counter()
+        candidates = selector.prepare(utxos, presorted=True)
+        prepare_ms = (time.perf_counter() - start) * 1000
+        strategies = (
+            ("selector", lambda _, amount: selector.select(utxos, amount, presorted=True)),
+            ("prepared", lambda _, amount: selector.select(candidates, amount)),
+            ("largest-first", selector.select_largest_first),
+        )
+        total = sum(utxo['value'] for utxo in utxos)
+        amounts = [int(total * rng.uniform(0.0001, 0.05)) + 1_000 for _ in range(payments)]
+
+        print(f"{count} UTXOs, {payments} payments at {fee_rate} sat/vB, prepare {prepare_ms:.3f} ms:")
+        for label, select in strategies:
+            timings, inputs, fees, changes, waste = [], 0, 0, 0, 0
+            for amount in amounts:
+                start = time.perf_counter()
+                selection = select(utxos, amount)
+                timings.append(time.perf_counter() - start)
+                inputs += len(selection.inputs)
+                fees += selection.fee
+                changes += selection.change > 0
+                waste += selection.waste
+
+            timings.sort()
+            median = timings[len(timings) // 2] * 1000
+            worst = timings[-1] * 1000
+            print(f"  {label:<14}: median {median:7.3f} ms  max {worst:7.3f} ms  "
+                  f"inputs {inputs:5d}  fees {fees:9d} sat  change outputs {changes:4d}  waste {waste:9d}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utxos", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--payments", type=int, default=200)
+    parser.add_argument("--fee-rate", type=float, default=5.0)
+    parser.add_argument("--long-term-fee-rate", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    run(args.utxos, args.payments, args.fee_rate, args.long_term_fee_rate, args.seed)
@@ -0,0 +1,85 @@
+"""
+    SQLite access benchmark
+
+    Compares the old connect-per-call pattern with the pooled, WAL-tuned
+    connection manager used by get_db_cursor, for inserts and wallet reads.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_db --count 2000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+from python.bitcoin_wallet.database.models import WalletDB, AddressDB
+from python.bitcoin_wallet.utils.db import db_op
+from python.bitcoin_wallet.utils.db.db_op import configure_db, close_db
+from python.bitcoin_wallet.utils.db.schema_init import init_db
+
+
+def connect_per_call(path: str):
+    """get_db_cursor as it was before the connection manager"""
+
+    @contextmanager
+    def get_db_cursor():
+        con = sqlite3.connect(path)
+        try:
+            cur = con.cursor()
+            yield cur
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            con.close()
+
+    return get_db_cursor
+
+
+def run_ops(label: str, count: int):
+    wallet_db, address_db = WalletDB(), AddressDB()
+    wallet_id = wallet_db.create_wallet(label, b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+
+    start = time.perf_counter()
+    for i in range(count):
+        address_db.create_address(wallet_id, f"{label}-addr-{i}", "p2pkh", i, f"m/44'/1'/0'/0/{i}")
+    inserts = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        wallet_db.get_wallet(wallet_id)
+    reads = count / (time.perf_counter() - start)
+
+    print(f"{label:<16}: {inserts:10.0f} inserts/s  {reads:10.0f} reads/s")
+
+
+def run(count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_db(os.path.join(tmp, "pooled.db"))
+        init_db()
+
+        pooled = db_op.get_db_cursor
+        legacy_path = os.path.join(tmp, "legacy.db")
+        init_db(sqlite3.connect(legacy_path))
+
+        # models import get_db_cursor by name, swap it there for the baseline run
+        from python.bitcoin_wallet.database import models
+        models.get_db_cursor = connect_per_call(legacy_path)
+        try:
+            run_ops("connect-per-call", count)
+        finally:
+            models.get_db_cursor = pooled
+
+        run_ops("pooled", count)
+        close_db()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    run(args.count)
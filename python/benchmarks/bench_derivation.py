@@ -0,0 +1,44 @@
+"""
+    Address derivation benchmark
+
+    Compares single-process derive_range against process-pool derive_many.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_derivation --count 20000 --workers 1 2 4
+"""
+import argparse
+import os
+import time
+
+from python.bitcoin_wallet.utils.crypto.keys import HDKeys
+
+MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+
+
+def run(count: int, workers_list, chunk_size: int):
+    hd = HDKeys(b"dummy_seed")
+    seed = hd.generate_seed_from_mnemonic(MNEMONIC)
+
+    start = time.perf_counter()
+    hd.derive_range(seed, 0, change=False, start=0, count=count)
+    baseline = time.perf_counter() - start
+    print(f"derive_range          : {count / baseline:10.0f} addr/s  ({baseline:.2f}s)")
+
+    for workers in workers_list:
+        start = time.perf_counter()
+        for _ in hd.derive_many(seed, 0, change=False, start=0, count=count,
+                                workers=workers, chunk_size=chunk_size):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"derive_many workers={workers:<2}: {count / elapsed:10.0f} addr/s  "
+              f"({elapsed:.2f}s, speedup x{baseline / elapsed:.2f})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    run(args.count, args.workers, args.chunk_size)
@@ -0,0 +1,85 @@
+"""
+    Bulk re-key benchmark
+
+    Fills a temporary database with legacy (version 1) wallets and re-keys
+    them to new Argon2 parameters twice. The first pass is the serial loop
+    (decrypt_mnemonic + encrypt_mnemonic + one UPDATE per wallet). The second
+    is RekeyJob: a process pool, batched writes and a checkpoint.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_rekey --wallets 500 --memory-kib 8192
+"""
+import argparse
+import base64
+import json
+import os
+import tempfile
+import time
+
+from python.bitcoin_wallet.core.rekey import RekeyJob
+from python.bitcoin_wallet.database.models import WalletDB
+from python.bitcoin_wallet.utils.crypto.security import Security
+from python.bitcoin_wallet.utils.db.db_op import close_db, configure_db, get_db_cursor
+from python.bitcoin_wallet.utils.db.schema_init import init_db
+
+MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+OLD_KDF = {"time_cost": 1, "memory_cost": 8192, "parallelism": 1}
+
+
+def password(wallet_id: int) -> str:
+    return f"password-{wallet_id}"
+
+
+def fill(count: int):
+    sec, wallet_db = Security(), WalletDB()
+    for i in range(1, count + 1):
+        legacy = sec.encrypt_mnemonic(MNEMONIC, password(i), kdf_params=OLD_KDF)
+        wallet_db.create_wallet(
+            f"w{i}", base64.b64decode(legacy["encrypted_mnemonic"]), legacy["kdf"],
+            base64.b64decode(legacy["kdf_salt"]), legacy["kdf_params"], base64.b64decode(legacy["enc_nonce"]), 1
+        )
+
+
+def serial(kdf_params: dict):
+    sec = Security()
+    wallet_db = WalletDB()
+    for wallet_id, blob in list(wallet_db.iter_encrypted_mnemonics()):
+        mnemonic = sec.decrypt_mnemonic(blob, password(wallet_id))
+        new = sec.encrypt_mnemonic(mnemonic, password(wallet_id), kdf_params=kdf_params)
+        with get_db_cursor() as cur:
+            cur.execute(
+                "UPDATE wallets SET encrypted_mnemonic = ?, kdf_salt = ?, kdf_params = ?, enc_nonce = ? WHERE id = ?",
+                (base64.b64decode(new["encrypted_mnemonic"]), base64.b64decode(new["kdf_salt"]),
+                 new["kdf_params"], base64.b64decode(new["enc_nonce"]), wallet_id)
+            )
+
+
+def run(count: int, kdf_params: dict, memory_budget_kib: int, batch_size: int):
+    print(f"{count} wallets, {json.dumps(kdf_params)}, {os.cpu_count()} CPUs")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ("serial", "RekeyJob"):
+            configure_db(os.path.join(tmp, f"{label}.db"))
+            init_db()
+            fill(count)
+
+            start = time.perf_counter()
+            if label == "serial":
+                serial(kdf_params)
+            else:
+                RekeyJob(password, kdf_params, memory_budget_kib=memory_budget_kib, batch_size=batch_size).run()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<9}: {elapsed:7.2f} s  {count / elapsed:8.1f} wallets/s")
+            close_db()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallets", type=int, default=500)
+    parser.add_argument("--memory-kib", type=int, default=8192, help="target memory_cost")
+    parser.add_argument("--time-cost", type=int, default=1)
+    parser.add_argument("--budget-kib", type=int, default=4 * 65536, help="RekeyJob memory budget")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    params = {"time_cost": args.time_cost, "memory_cost": args.memory_kib, "parallelism": 1, "hash_len": 32}
+    run(args.wallets, params, args.budget_kib, args.batch_size)
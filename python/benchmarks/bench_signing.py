@@ -0,0 +1,49 @@
+"""
+    ECDSA signing benchmark
+
+    Compares per-call Keys.sign_message, a reusable Signer, and the
+    process-pool mode of Keys.sign_many in signatures per second.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_signing --count 2000 --workers 2 4
+"""
+import argparse
+import time
+
+from python.bitcoin_wallet.utils.crypto.keys import Keys
+
+
+def report(label: str, count: int, elapsed: float, baseline: float=None):
+    line = f"{label:<24}: {count / elapsed:10.0f} sig/s  ({elapsed:.2f}s"
+    if baseline:
+        line += f", speedup x{baseline / elapsed:.2f}"
+    print(line + ")")
+
+
+def run(count: int, workers_list):
+    keys = Keys()
+    messages = [f"payout {i}".encode() for i in range(count)]
+
+    start = time.perf_counter()
+    for message in messages:
+        keys.sign_message(keys.private_key, message)
+    baseline = time.perf_counter() - start
+    report("sign_message", count, baseline)
+
+    start = time.perf_counter()
+    keys.signer(keys.private_key).sign_many(messages)
+    report("Signer.sign_many", count, time.perf_counter() - start, baseline)
+
+    for workers in workers_list:
+        start = time.perf_counter()
+        keys.sign_many(keys.private_key, messages, workers=workers)
+        report(f"sign_many workers={workers}", count, time.perf_counter() - start, baseline)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    run(args.count, args.workers)
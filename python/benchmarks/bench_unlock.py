@@ -0,0 +1,82 @@
+"""
+    Wallet unlock benchmark
+
+    Measures Security.decrypt_mnemonic throughput (unlocks/sec) and peak RSS
+    at several concurrency levels. Every level runs in a fresh process so the
+    reported peak RSS belongs to that level alone.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_unlock --concurrency 1 2 4 8
+        python -m python.benchmarks.bench_unlock --calibrate 250 --max-memory-kib 32768
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from python.bitcoin_wallet.utils.crypto.security import Security, DEFAULT_ARGON2_PARAMS
+
+MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+PASSWORD = "benchmark password"
+
+
+def peak_rss_mib() -> float:
+    # Linux carries ru_maxrss over exec, so a spawned child would report the
+    # parent's peak; VmHWM is reset for the new process image
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def unlock_level(encrypted: dict, concurrency: int, unlocks: int):
+    security = Security()
+    baseline = peak_rss_mib()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: security.decrypt_mnemonic(encrypted, PASSWORD), range(unlocks)))
+    elapsed = time.perf_counter() - start
+
+    return unlocks / elapsed, elapsed / unlocks * concurrency * 1000, baseline, peak_rss_mib()
+
+
+def run(kdf_params: dict, concurrency_levels, unlocks: int):
+    encrypted = Security().encrypt_mnemonic(MNEMONIC, PASSWORD, kdf_params=kdf_params)
+    print(f"kdf_params: {encrypted['kdf_params']}")
+
+    ctx = multiprocessing.get_context("spawn")
+    for concurrency in concurrency_levels:
+        with ctx.Pool(1) as pool:
+            rate, latency, baseline, peak = pool.apply(unlock_level, (encrypted, concurrency, max(unlocks, concurrency)))
+        print(f"concurrency {concurrency:3d}: {rate:8.2f} unlocks/s  ~{latency:8.1f} ms/unlock  "
+              f"peak RSS {peak:8.1f} MiB (+{peak - baseline:.1f} MiB)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--unlocks", type=int, default=16)
+    parser.add_argument("--calibrate", type=float, metavar="TARGET_MS",
+                        help="calibrate Argon2 for this latency instead of using the defaults")
+    parser.add_argument("--max-memory-kib", type=int, default=DEFAULT_ARGON2_PARAMS["memory_cost"])
+    parser.add_argument("--kdf-params", type=json.loads, help="explicit kdf_params JSON")
+    args = parser.parse_args()
+
+    if args.kdf_params:
+        params = args.kdf_params
+    elif args.calibrate:
+        params = Security().calibrate_argon2(target_ms=args.calibrate, max_memory_kib=args.max_memory_kib)
+    else:
+        params = dict(DEFAULT_ARGON2_PARAMS)
+
+    run(params, args.concurrency, args.unlocks)
@@ -0,0 +1,244 @@
+import copy
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from python.bitcoin_wallet.core.chain_client import BLOCKSTREAM_API, RetryPolicy
+
+
+class ChainBackend(ABC):
+    """
+    Interface the wallet uses to read chain state and broadcast transactions.
+    """
+
+    @abstractmethod
+    def get_address_stats(self, address) -> dict:
+        """Returns an Esplora-style /address/<address> document."""
+
+    @abstractmethod
+    def get_utxos(self, address) -> List[dict]:
+        """Returns a list of {'txid', 'vout', 'value'} dicts for address."""
+
+    @abstractmethod
+    def broadcast(self, raw_tx_hex) -> str:
+        """Broadcasts a signed transaction and returns its txid."""
+
+    @abstractmethod
+    def get_fee_estimates(self) -> Dict[int, float]:
+        """Returns {confirmation target in blocks: fee rate in sat/vbyte}."""
+
+    def get_balance(self, address) -> int:
+        """Returns the confirmed balance of address in satoshis."""
+        stats = self.get_address_stats(address)['chain_stats']
+        return stats['funded_txo_sum'] - stats['spent_txo_sum']
+
+    def get_address_stats_many(self, addresses: Iterable[str]) -> List[dict]:
+        """Returns get_address_stats for every address, in input order."""
+        return [self.get_address_stats(address) for address in addresses]
+
+
+class _InFlight:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BlockstreamBackend(ChainBackend):
+    """
+    Blockstream (Esplora) backend over a pooled requests.Session.
+
+    Address and UTXO lookups are cached for cache_ttl seconds, and concurrent
+    callers asking for the same resource share a single HTTP request. Every
+    caller gets its own copy of the result, so mutating it leaves the cache intact.
+    Lookups that hit rate limiting, a transient server error or a connection
+    failure are retried with backoff, under the same RetryPolicy as
+    AsyncChainClient; broadcasts are not retried.
+    """
+
+    def __init__(self, network='bitcoin', base_url=None, session=None, cache_ttl=10.0,
+                 pool_size=16, timeout=10.0, retries=3, backoff=0.25, clock=time.monotonic):
+        """
+        Args:
+            network (str): 'bitcoin' or 'testnet', selects the default API URL.
+            base_url (str, optional): Esplora-compatible API root, overrides network.
+            session (requests.Session, optional): Session to use, one is created if omitted.
+            cache_ttl (float): Seconds a lookup result is served from cache, 0 disables caching.
+            pool_size (int): Keep-alive connections kept per host.
+            timeout (float): Per-request timeout in seconds.
+            retries (int): Retries per lookup after the first attempt.
+            backoff (float): Base retry delay in seconds, doubled on every retry.
+        """
+        self.network = network
+        self.base_url = (base_url or BLOCKSTREAM_API[network]).rstrip('/')
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retry = RetryPolicy(retries, backoff)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._clock = clock
+        self._cache: Dict[str, tuple] = {}
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def invalidate(self, address=None):
+        """Drops cached lookups for address, or everything if address is None."""
+        with self._lock:
+            if address is None:
+                self._cache.clear()
+            else:
+                for path in (f"/address/{address}", f"/address/{address}/utxo"):
+                    self._cache.pop(path, None)
+
+    def _fetch_json(self, path):
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.get(url, timeout=self.timeout)
+                if not self.retry.retry_status(resp.status_code, attempt):
+                    resp.raise_for_status()
+                    return resp.json()
+            except (requests.ConnectionError, requests.Timeout):
+                if not self.retry.retry_error(attempt):
+                    raise
+            time.sleep(self.retry.delay(attempt))
+            attempt += 1
+
+    def _get_json(self, path):
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and self._clock() < cached[1]:
+                return copy.deepcopy(cached[0])
+
+            call = self._in_flight.get(path)
+            leader = call is None
+            if leader:
+                call = _InFlight()
+                self._in_flight[path] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = self._fetch_json(path)
+            if self.cache_ttl > 0:
+                with self._lock:
+                    self._cache[path] = (call.result, self._clock() + self.cache_ttl)
+            return copy.deepcopy(call.result)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(path, None)
+            call.event.set()
+
+    def get_address_stats(self, address) -> dict:
+        return self._get_json(f"/address/{address}")
+
+    def get_utxos(self, address) -> List[dict]:
+        return self._get_json(f"/address/{address}/utxo")
+
+    def get_address_stats_many(self, addresses: Iterable[str]) -> List[dict]:
+        """Looks addresses up concurrently, at most pool_size at a time."""
+        addresses = list(addresses)
+        if len(addresses) <= 1:
+            return [self.get_address_stats(address) for address in addresses]
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(addresses))) as pool:
+            return list(pool.map(self.get_address_stats, addresses))
+
+    def get_fee_estimates(self) -> Dict[int, float]:
+        return {int(target): rate for target, rate in self._get_json("/fee-estimates").items()}
+
+    def broadcast(self, raw_tx_hex) -> str:
+        resp = self.session.post(f"{self.base_url}/tx", data=raw_tx_hex, timeout=self.timeout)
+        if resp.status_code != 200:
+            raise Exception(f"Broadcast failed: {resp.text}")
+        # Spent outputs and balances are stale now
+        self.invalidate()
+        return resp.text
+
+
+_default_backends: Dict[str, BlockstreamBackend] = {}
+_default_backends_lock = threading.Lock()
+
+
+def default_backend(network='bitcoin') -> BlockstreamBackend:
+    """
+    Process-wide BlockstreamBackend for network, created on first use.
+
+    Wallets share it, so they share its connection pool, response cache and
+    coalescing of concurrent lookups.
+    """
+    with _default_backends_lock:
+        backend = _default_backends.get(network)
+        if backend is None:
+            backend = _default_backends[network] = BlockstreamBackend(network)
+        return backend
+
+
+class FakeBackend(ChainBackend):
+    """
+    In-memory backend for tests and benchmarks; no network access.
+
+    Usage:
+        backend = FakeBackend()
+        backend.add_utxo(address, txid, vout, value)
+    """
+
+    def __init__(self, network='testnet'):
+        self.network = network
+        self.utxos: Dict[str, List[dict]] = {}
+        self.broadcasts: List[str] = []
+        self.fee_estimates: Dict[int, float] = {1: 20.0, 3: 12.0, 6: 8.0, 144: 1.0}
+        self.calls = 0
+
+    def add_utxo(self, address, txid, vout, value, confirmed=True):
+        self.utxos.setdefault(address, []).append({
+            'txid': txid,
+            'vout': vout,
+            'value': value,
+            'status': {'confirmed': confirmed},
+        })
+
+    def get_address_stats(self, address) -> dict:
+        self.calls += 1
+        funded = sum(u['value'] for u in self.utxos.get(address, []) if u['status']['confirmed'])
+        used = address in self.utxos
+        return {
+            'address': address,
+            'chain_stats': {'funded_txo_sum': funded, 'spent_txo_sum': 0, 'tx_count': int(used)},
+            'mempool_stats': {'funded_txo_sum': 0, 'spent_txo_sum': 0, 'tx_count': 0},
+        }
+
+    def get_utxos(self, address) -> List[dict]:
+        self.calls += 1
+        return [dict(u) for u in self.utxos.get(address, [])]
+
+    def get_fee_estimates(self) -> Dict[int, float]:
+        self.calls += 1
+        return dict(self.fee_estimates)
+
+    def broadcast(self, raw_tx_hex) -> str:
+        self.calls += 1
+        self.broadcasts.append(raw_tx_hex)
+        return f"{len(self.broadcasts):064x}"
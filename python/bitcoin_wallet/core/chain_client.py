@@ -0,0 +1,157 @@
+import asyncio
+import random
+from typing import Dict, Iterable, List
+
+import httpx
+
+BLOCKSTREAM_API = {
+    'bitcoin': "https://blockstream.info/api",
+    'testnet': "https://blockstream.info/testnet/api",
+}
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """
+    When and how long to retry a chain API request.
+
+    Shared by AsyncChainClient and BlockstreamBackend: a response with a
+    status in RETRY_STATUS or a transport error is retried up to retries
+    times, waiting backoff * 2**attempt seconds with jitter in between.
+    """
+
+    def __init__(self, retries: int=3, backoff: float=0.25):
+        """
+        Args:
+            retries (int): Retries per request after the first attempt.
+            backoff (float): Base delay in seconds, doubled on every retry.
+        """
+        if retries < 0:
+            raise ValueError("retries must not be negative")
+
+        self.retries = retries
+        self.backoff = backoff
+
+    def retry_status(self, status_code: int, attempt: int) -> bool:
+        """True if a response with status_code on attempt (0 based) should be retried."""
+        return status_code in RETRY_STATUS and attempt < self.retries
+
+    def retry_error(self, attempt: int) -> bool:
+        """True if a transport error on attempt (0 based) should be retried."""
+        return attempt < self.retries
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before the retry following attempt."""
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+
+class AsyncChainClient:
+    """
+    Asyncio client for the Blockstream (Esplora) HTTP API.
+
+    A single httpx.AsyncClient keeps connections alive between requests, a
+    semaphore bounds how many requests are in flight, and transient failures
+    are retried with exponential backoff (see RetryPolicy).
+
+    Usage:
+        async with AsyncChainClient(network='testnet', concurrency=16) as client:
+            balances = await client.get_balances(addresses)
+    """
+
+    def __init__(self, network='bitcoin', base_url=None, concurrency=16, retries=3,
+                 backoff=0.25, timeout=10.0):
+        """
+        Args:
+            network (str): 'bitcoin' or 'testnet', selects the default API URL.
+            base_url (str, optional): Esplora-compatible API root, overrides network.
+            concurrency (int): Maximum number of requests in flight.
+            retries (int): Retries per request after the first attempt.
+            backoff (float): Base delay in seconds, doubled on every retry.
+            timeout (float): Per-request timeout in seconds.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        self.base_url = (base_url or BLOCKSTREAM_API[network]).rstrip('/')
+        self.concurrency = concurrency
+        self.retry = RetryPolicy(retries, backoff)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _request(self, method, path, **kwargs):
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    resp = await self._client.request(method, url, **kwargs)
+                if not self.retry.retry_status(resp.status_code, attempt):
+                    resp.raise_for_status()
+                    return resp
+            except httpx.TransportError:
+                if not self.retry.retry_error(attempt):
+                    raise
+            # Back off outside the semaphore so waiting retries don't hold a slot
+            await asyncio.sleep(self.retry.delay(attempt))
+            attempt += 1
+
+    async def get_address_stats(self, address) -> dict:
+        """Returns the raw /address/<address> document."""
+        resp = await self._request("GET", f"/address/{address}")
+        return resp.json()
+
+    async def get_balance(self, address) -> int:
+        """Returns the confirmed balance of one address in satoshis."""
+        stats = (await self.get_address_stats(address))['chain_stats']
+        return stats['funded_txo_sum'] - stats['spent_txo_sum']
+
+    async def get_utxos(self, address) -> List[dict]:
+        """Returns the /address/<address>/utxo list."""
+        resp = await self._request("GET", f"/address/{address}/utxo")
+        return resp.json()
+
+    async def get_balances(self, addresses: Iterable[str]) -> Dict[str, int]:
+        """Fetches confirmed balances for many addresses concurrently."""
+        addresses = list(dict.fromkeys(addresses))
+        results = await asyncio.gather(*(self.get_balance(a) for a in addresses))
+        return dict(zip(addresses, results))
+
+    async def get_utxos_many(self, addresses: Iterable[str]) -> Dict[str, List[dict]]:
+        """Fetches UTXO lists for many addresses concurrently."""
+        addresses = list(dict.fromkeys(addresses))
+        results = await asyncio.gather(*(self.get_utxos(a) for a in addresses))
+        return dict(zip(addresses, results))
+
+
+def fetch_balances(addresses, network='bitcoin', **client_kwargs) -> Dict[str, int]:
+    """Blocking helper around AsyncChainClient.get_balances for synchronous callers."""
+
+    async def run():
+        async with AsyncChainClient(network=network, **client_kwargs) as client:
+            return await client.get_balances(addresses)
+
+    return asyncio.run(run())
+
+
+def fetch_utxos(addresses, network='bitcoin', **client_kwargs) -> Dict[str, List[dict]]:
+    """Blocking helper around AsyncChainClient.get_utxos_many for synchronous callers."""
+
+    async def run():
+        async with AsyncChainClient(network=network, **client_kwargs) as client:
+            return await client.get_utxos_many(addresses)
+
+    return asyncio.run(run())
@@ -0,0 +1,359 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from math import ceil
+from operator import itemgetter
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+# Virtual size of one input / output by script type. p2sh is assumed to wrap
+# p2wpkh (BIP49), the only p2sh spend this wallet produces.
+INPUT_VBYTES = {
+    'p2pkh': 148,
+    'p2sh': 91,
+    'p2wpkh': 68,
+    'p2tr': 57.5,
+}
+OUTPUT_VBYTES = {
+    'p2pkh': 34,
+    'p2sh': 32,
+    'p2wpkh': 31,
+    'p2wsh': 43,
+    'p2tr': 43,
+}
+# version, locktime and the input/output counts
+TX_OVERHEAD_VBYTES = 10
+# segwit marker and flag bytes, only present when an input has a witness
+SEGWIT_OVERHEAD_VBYTES = 0.5
+SEGWIT_INPUTS = {'p2sh', 'p2wpkh', 'p2tr'}
+
+DUST_LIMIT = {
+    'p2pkh': 546,
+    'p2sh': 540,
+    'p2wpkh': 294,
+    'p2wsh': 330,
+    'p2tr': 330,
+}
+
+# Bitcoin Core's SelectCoinsBnB allows 100k tries; a try costs about half a
+# microsecond here, so the budget is 100x smaller to keep a selection over
+# prepared Candidates below a millisecond. Pass a larger max_tries to trade
+# time for less waste.
+BNB_MAX_TRIES = 1_000
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+class Selection(NamedTuple):
+    """
+    Result of a coin selection.
+
+    inputs: the selected UTXOs, as passed in
+    fee: absolute fee in satoshis, including any excess dropped into it
+    change: change output value, 0 if the transaction has no change
+    waste: Bitcoin Core waste metric, lower is better
+    algorithm: 'bnb', 'knapsack' or 'largest_first'
+    """
+    inputs: list
+    fee: int
+    change: int
+    waste: int
+    algorithm: str
+
+
+class Candidates:
+    """
+    UTXOs prepared for selection by one CoinSelector.
+
+    Holds the UTXOs sorted by value (largest first) with their effective
+    values, an ascending copy for bisecting and prefix sums, so repeated
+    selections over the same set skip the sort and array rebuilding. Only
+    UTXOs with a positive effective value are kept.
+    """
+    __slots__ = ('utxos', 'values', 'ascending', 'prefix', 'input_fee')
+
+    def __init__(self, utxos: list, values: List[int], input_fee: int):
+        self.utxos = utxos
+        self.values = values
+        self.ascending = values[::-1]
+        # prefix[i] - prefix[j] is the sum of values[j:i]
+        self.prefix = list(accumulate(values, initial=0))
+        self.input_fee = input_fee
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def total(self) -> int:
+        return self.prefix[-1]
+
+
+def tx_vsize(input_types: Sequence[str], output_types: Sequence[str]) -> int:
+    """Virtual size in vbytes of a transaction with the given input and output script types."""
+    overhead = TX_OVERHEAD_VBYTES
+    if any(t in SEGWIT_INPUTS for t in input_types):
+        overhead += SEGWIT_OVERHEAD_VBYTES
+    return ceil(
+        overhead
+        + sum(INPUT_VBYTES[t] for t in input_types)
+        + sum(OUTPUT_VBYTES[t] for t in output_types)
+    )
+
+
+class CoinSelector:
+    """
+    Coin selection over a fixed fee model.
+
+    Branch-and-bound looks for an input set that pays amount + fee with less
+    excess than a change output would cost, so no change is created. A knapsack
+    pass and a largest-first pass pick inputs with a change output, and the
+    result with the lowest waste is returned.
+
+    Every fee is computed from the vbyte tables above and rounded up per
+    component, so the resulting fee never drops below fee_rate * vsize.
+
+    Usage:
+        selector = CoinSelector(fee_rate=5.0, output_types=['p2wpkh'])
+        selection = selector.select(utxos, 120_000)
+    """
+
+    def __init__(self, fee_rate: float, input_type: str='p2wpkh',
+                 output_types: Sequence[str]=('p2wpkh',), change_type: Optional[str]=None,
+                 long_term_fee_rate: Optional[float]=None, max_tries: int=BNB_MAX_TRIES,
+                 value: Callable=itemgetter('value')):
+        """
+        Args:
+            fee_rate (float): Fee rate in sat/vbyte.
+            input_type (str): Script type of the wallet's UTXOs.
+            output_types (list[str]): Script types of the payment outputs.
+            change_type (str, optional): Script type of the change output, defaults to input_type.
+            long_term_fee_rate (float, optional): Expected future fee rate, used to
+                price spending change later. Defaults to fee_rate.
+            max_tries (int): Branch-and-bound search budget.
+            value (callable): Returns the value in satoshis of a UTXO, defaults to utxo['value'].
+        """
+        if fee_rate < 0:
+            raise ValueError("fee_rate must not be negative")
+
+        self.fee_rate = fee_rate
+        self.input_type = input_type
+        self.output_types = list(output_types)
+        self.change_type = change_type or input_type
+        self.long_term_fee_rate = fee_rate if long_term_fee_rate is None else long_term_fee_rate
+        self.max_tries = max_tries
+        self.value = value
+
+        # vsize is rounded up to whole vbytes, so round every component up as well
+        # before pricing it, otherwise the fractional segwit overhead can leave
+        # the fee a vbyte short
+        overhead = TX_OVERHEAD_VBYTES + (SEGWIT_OVERHEAD_VBYTES if input_type in SEGWIT_INPUTS else 0)
+        self.input_fee = ceil(fee_rate * ceil(INPUT_VBYTES[input_type]))
+        self.base_fee = ceil(fee_rate * ceil(overhead + sum(OUTPUT_VBYTES[t] for t in self.output_types)))
+        self.change_fee = ceil(fee_rate * OUTPUT_VBYTES[self.change_type])
+        # Creating a change output now plus spending it later
+        self.cost_of_change = self.change_fee + ceil(self.long_term_fee_rate * INPUT_VBYTES[self.change_type])
+        self.dust_limit = DUST_LIMIT[self.change_type]
+        # Waste of one input: paying for it now instead of at the long-term rate
+        self.input_waste = self.input_fee - ceil(self.long_term_fee_rate * INPUT_VBYTES[input_type])
+
+    def prepare(self, utxos: Sequence, presorted: bool=False) -> Candidates:
+        """
+        Prepare UTXOs once for several select() calls.
+
+        Args:
+            utxos (list): UTXOs to choose from.
+            presorted (bool): The UTXOs are already ordered by value, largest
+                first (as UtxoDB.select_candidates returns them), skip sorting.
+
+        Returns:
+            Candidates: Pass to select() instead of the UTXO list.
+        """
+        input_fee = self.input_fee
+        if presorted:
+            pool = list(utxos)
+        else:
+            pool = sorted(utxos, key=self.value, reverse=True)
+        # Effective value: what an input contributes after paying for itself.
+        # All inputs share one script type, so ordering by value is enough.
+        values = [value - input_fee for value in map(self.value, pool)]
+        # Drop the uneconomic tail, inputs that cost more than they are worth
+        keep = len(values) - bisect_right(values[::-1], 0)
+        return Candidates(pool[:keep], values[:keep], input_fee)
+
+    def select(self, utxos, amount: int, presorted: bool=False) -> Selection:
+        """
+        Select inputs paying amount plus fee.
+
+        Args:
+            utxos (list | Candidates): UTXOs, or Candidates from prepare() to
+                reuse the sorted arrays across calls.
+            amount (int): Amount to pay in satoshis.
+            presorted (bool): utxos is a list already ordered by value, largest first.
+
+        Returns:
+            Selection: selected inputs, fee, change and waste.
+
+        Raises:
+            InsufficientFunds: If the UTXOs cannot cover amount plus fee.
+        """
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+
+        if isinstance(utxos, Candidates):
+            if utxos.input_fee != self.input_fee:
+                raise ValueError("Candidates were prepared by a selector with another fee model")
+            candidates = utxos
+        else:
+            candidates = self.prepare(utxos, presorted)
+        pool = candidates.utxos
+
+        target = amount + self.base_fee
+        if candidates.total < target:
+            raise InsufficientFunds("Insufficient funds.")
+
+        chosen = self._knapsack(candidates, target + self.cost_of_change)
+        if chosen is None:
+            # Only enough for a changeless transaction with some excess
+            chosen = self._largest_first(candidates.values, target)
+        best = self._selection([pool[i] for i in chosen], amount, 'knapsack')
+
+        # Like Bitcoin Core, keep whichever result wastes least; on a tie the
+        # smaller-input knapsack result wins over largest-first, and a changeless
+        # result wins over both
+        chosen = self._largest_first(candidates.values, target)
+        candidate = self._selection([pool[i] for i in chosen], amount, 'largest_first')
+        if candidate.waste < best.waste:
+            best = candidate
+
+        chosen = self._bnb(candidates, target, best.waste)
+        if chosen is not None:
+            candidate = self._selection([pool[i] for i in chosen], amount, 'bnb')
+            if candidate.waste <= best.waste:
+                best = candidate
+        return best
+
+    def select_largest_first(self, utxos: Sequence, amount: int) -> Selection:
+        """Baseline strategy: spend the biggest UTXOs until amount plus fee is covered."""
+        pool = sorted(utxos, key=self.value, reverse=True)
+        effective_values = [self.value(utxo) - self.input_fee for utxo in pool]
+        chosen = self._largest_first(effective_values, amount + self.base_fee)
+        if chosen is None:
+            raise InsufficientFunds("Insufficient funds.")
+        return self._selection([pool[i] for i in chosen], amount, 'largest_first')
+
+    def _bnb(self, candidates: Candidates, target: int, waste_bound: Optional[int]=None) -> Optional[List[int]]:
+        """
+        Depth-first search for an input set with target <= sum <= target + cost_of_change.
+
+        Branches that cannot get below waste_bound (the waste of an already
+        known selection) are pruned. Returns indexes into candidates, or None
+        if no changeless solution at or below waste_bound was found within max_tries.
+        """
+        upper = target + self.cost_of_change
+        values, ascending, prefix = candidates.values, candidates.ascending, candidates.prefix
+        size = len(values)
+
+        # Single input fast path, the common case for large UTXO sets
+        pos = bisect_left(ascending, target)
+        if pos < size and ascending[pos] <= upper:
+            return [size - 1 - pos]
+
+        total = prefix[-1]
+        input_waste = self.input_waste
+        selection = []
+        value = 0
+        waste = 0
+        best = None
+        best_waste = waste_bound
+        # Anything above upper overshoots on its own, start the search below it
+        index = size - bisect_right(ascending, upper)
+
+        for _ in range(self.max_tries):
+            backtrack = False
+            if value + total - prefix[index] < target or value > upper:
+                backtrack = True
+            elif best_waste is not None and input_waste > 0 and value < target:
+                # Each further input adds input_waste, so at most `room` more fit under
+                # best_waste, and the next `room` values are the largest left
+                room = (best_waste - waste) // input_waste
+                reach = index + room if index + room < size else size
+                if room <= 0 or value + prefix[reach] - prefix[index] < target:
+                    backtrack = True
+            elif value >= target:
+                candidate_waste = waste + value - target
+                if best_waste is None or candidate_waste <= best_waste:
+                    best = list(selection)
+                    best_waste = candidate_waste
+                    if candidate_waste == 0 and input_waste == 0:
+                        break
+                backtrack = True
+
+            if backtrack:
+                if not selection:
+                    break
+                # Try the branch that leaves the last included value out
+                index = selection.pop()
+                value -= values[index]
+                waste -= input_waste
+            elif not selection or index - 1 == selection[-1] or values[index] != values[index - 1]:
+                # Skip an equal value whose twin was just left out, that branch was already tried
+                selection.append(index)
+                value += values[index]
+                waste += input_waste
+            index += 1
+
+        return best
+
+    @staticmethod
+    def _knapsack(candidates: Candidates, target: int) -> Optional[List[int]]:
+        """
+        Inputs covering target (amount, fee and a change output).
+
+        Compares the smallest single value above target with a greedy fill from
+        the values below it and keeps whichever overshoots less.
+        """
+        values, ascending, prefix = candidates.values, candidates.ascending, candidates.prefix
+        size = len(values)
+        pos = bisect_left(ascending, target)
+        lowest_larger = size - 1 - pos if pos < size else None
+
+        # Values below target, largest first, until they cover it
+        start = size - pos
+        end = bisect_left(prefix, prefix[start] + target, start)
+        if end <= size:
+            if lowest_larger is None or prefix[end] - prefix[start] <= values[lowest_larger]:
+                return list(range(start, end))
+        return None if lowest_larger is None else [lowest_larger]
+
+    @staticmethod
+    def _largest_first(values: List[int], target: int) -> Optional[List[int]]:
+        total = 0
+        for i, value in enumerate(values):
+            if value <= 0:
+                break
+            total += value
+            if total >= target:
+                return list(range(i + 1))
+        return None
+
+    def _selection(self, inputs: list, amount: int, algorithm: str) -> Selection:
+        total_in = sum(self.value(utxo) for utxo in inputs)
+        fee = self.base_fee + self.input_fee * len(inputs)
+        excess = total_in - amount - fee
+        change = excess - self.change_fee
+
+        waste = self.input_waste * len(inputs)
+        if excess > self.cost_of_change and change >= self.dust_limit:
+            fee += self.change_fee
+            waste += self.cost_of_change
+        else:
+            change = 0
+            fee += excess
+            waste += excess
+
+        return Selection(inputs, fee, change, waste, algorithm)
+
+
+def select_coins(utxos: Sequence, amount: int, fee_rate: float, **kwargs) -> Selection:
+    """Shortcut for CoinSelector(fee_rate, **kwargs).select(utxos, amount)."""
+    return CoinSelector(fee_rate, **kwargs).select(utxos, amount)
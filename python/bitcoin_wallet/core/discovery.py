@@ -0,0 +1,129 @@
+from typing import Callable, List, NamedTuple, Optional
+
+from python.bitcoin_wallet.core.backend import ChainBackend
+from python.bitcoin_wallet.database.models import AddressDB
+from python.bitcoin_wallet.utils.crypto.keys import DerivedAddress, HDKeys
+
+DEFAULT_GAP_LIMIT = 20
+
+# derive(change, start, count) -> addresses start..start+count-1 of a chain
+Deriver = Callable[[bool, int, int], List[DerivedAddress]]
+
+
+class ChainScan(NamedTuple):
+    """Outcome of scanning one chain (external or change)"""
+    change: bool
+    last_used: Optional[int]
+    scanned: int
+    found: int
+
+
+class DiscoveryResult(NamedTuple):
+    external: ChainScan
+    change: ChainScan
+
+
+def _is_used(stats: dict) -> bool:
+    return stats['chain_stats']['tx_count'] + stats['mempool_stats']['tx_count'] > 0
+
+
+class AccountDiscovery:
+    """
+    BIP44 gap-limit discovery for one account.
+
+    Each chain is walked until gap_limit consecutive addresses have no history.
+    Addresses are derived and looked up in batches, and every scanned address is
+    stored in AddressDB with its is_used flag. A rescan starts right after the
+    highest used index already stored, so a refresh only touches the frontier.
+
+    Usage:
+        discovery = AccountDiscovery.from_seed(wallet_id, seed, backend, testnet=True)
+        result = discovery.run()
+    """
+
+    def __init__(self, wallet_id: int, derive: Deriver, backend: ChainBackend,
+                 gap_limit: int=DEFAULT_GAP_LIMIT, address_type: str='p2pkh',
+                 address_db: Optional[AddressDB]=None):
+        """
+        Args:
+            wallet_id (int): Wallet row the addresses belong to.
+            derive (callable): derive(change, start, count) returning DerivedAddress lists.
+            backend (ChainBackend): Source of address history.
+            gap_limit (int): Consecutive unused addresses that end a chain.
+            address_type (str): address_type stored with every address.
+            address_db (AddressDB, optional): Address store, defaults to AddressDB().
+        """
+        if gap_limit < 1:
+            raise ValueError("gap_limit must be at least 1")
+
+        self.wallet_id = wallet_id
+        self.derive = derive
+        self.backend = backend
+        self.gap_limit = gap_limit
+        self.address_type = address_type
+        self.address_db = address_db or AddressDB()
+
+    @classmethod
+    def from_seed(cls, wallet_id: int, seed: bytes, backend: ChainBackend, account_idx: int=0,
+                  testnet: bool=True, **kwargs) -> "AccountDiscovery":
+        """Discovery over m/44'/coin'/account_idx' derived from a BIP39 seed"""
+        keys = HDKeys(seed)
+
+        def derive(change, start, count):
+            return keys.derive_range(seed, account_idx, change, start, count, testnet=testnet)
+
+        return cls(wallet_id, derive, backend, **kwargs)
+
+    @classmethod
+    def from_xpub(cls, wallet_id: int, xpub: str, backend: ChainBackend, testnet: bool=True,
+                  account_path: str="M", **kwargs) -> "AccountDiscovery":
+        """Watch-only discovery from an account-level extended public key"""
+        keys = HDKeys.from_xpub(xpub, testnet=testnet, account_path=account_path)
+        return cls(wallet_id, keys.derive_public_range, backend, **kwargs)
+
+    def scan_chain(self, change: bool, full: bool=False) -> ChainScan:
+        """
+        Scan one chain up to the gap limit.
+
+        Args:
+            change (bool): Scan the change chain instead of the external one.
+            full (bool): Start at index 0 instead of after the highest stored used index.
+
+        Returns:
+            ChainScan: highest used index, number of addresses looked up and
+            number of used addresses among them.
+        """
+        last_used = None if full else self.address_db.max_used_index(self.wallet_id, change)
+        start = 0 if last_used is None else last_used + 1
+        next_index = start
+        gap = 0
+        found = 0
+
+        while gap < self.gap_limit:
+            # Only derive as many addresses as could still close the gap
+            batch = self.derive(change, next_index, self.gap_limit - gap)
+            stats = self.backend.get_address_stats_many(derived.address for derived in batch)
+
+            rows = []
+            for derived, address_stats in zip(batch, stats):
+                used = _is_used(address_stats)
+                rows.append((self.wallet_id, derived.address, self.address_type, derived.index,
+                             derived.path, used, change))
+                if used:
+                    last_used = derived.index if last_used is None else max(last_used, derived.index)
+                    found += 1
+                    gap = 0
+                else:
+                    gap += 1
+
+            self.address_db.upsert_addresses(rows)
+            next_index += len(batch)
+
+        return ChainScan(change, last_used, next_index - start, found)
+
+    def run(self, full: bool=False) -> DiscoveryResult:
+        """Scan the external and the change chain"""
+        return DiscoveryResult(
+            external=self.scan_chain(False, full),
+            change=self.scan_chain(True, full),
+        )
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from bisect import bisect_right
+from typing import Callable, Dict, Union
+
+from python.bitcoin_wallet.core.backend import ChainBackend, default_backend
+
+logger = logging.getLogger(__name__)
+
+# Named confirmation targets, in blocks
+TARGETS = {
+    'next_block': 1,
+    'six_blocks': 6,
+    'economy': 144,
+}
+
+MIN_RELAY_FEE_RATE = 1.0
+
+
+class FeeEstimator:
+    """
+    Fee-rate quotes from the chain backend's fee estimates, cached for ttl seconds.
+
+    Quotes are answered from an immutable snapshot of the last estimates, so
+    the common path is a clock read and a bisect; only one caller refreshes the
+    snapshot when it expires. If a refresh fails, the previous snapshot keeps
+    being served until max_stale seconds past its expiry, and the backend is
+    retried at most every retry_after seconds meanwhile.
+
+    Usage:
+        estimator = FeeEstimator(backend, ttl=60)
+        fee_rate = estimator.fee_rate('six_blocks')
+    """
+
+    def __init__(self, backend: ChainBackend, ttl: float=60.0, max_stale: float=600.0,
+                 min_fee_rate: float=MIN_RELAY_FEE_RATE, retry_after: float=10.0,
+                 clock: Callable[[], float]=time.monotonic):
+        """
+        Args:
+            backend (ChainBackend): Source of fee estimates.
+            ttl (float): Seconds a set of estimates is served before refreshing.
+            max_stale (float): Seconds past ttl an old set is still served if refreshing fails.
+            min_fee_rate (float): Floor for every quote, in sat/vbyte.
+            retry_after (float): Seconds between refresh attempts while a stale set is served.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.min_fee_rate = min_fee_rate
+        self.retry_after = retry_after
+        self._clock = clock
+        # (expires_at, sorted targets, rates in the same order, served until if refreshing fails)
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+
+    def _load(self):
+        estimates = self.backend.get_fee_estimates()
+        if not estimates:
+            raise ValueError("Backend returned no fee estimates.")
+        targets = sorted(estimates)
+        rates = [max(float(estimates[target]), self.min_fee_rate) for target in targets]
+        expires_at = self._clock() + self.ttl
+        return expires_at, targets, rates, expires_at + self.max_stale
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is not None and self._clock() < snapshot[0]:
+            return snapshot
+
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is not None and self._clock() < snapshot[0]:
+                return snapshot
+            try:
+                self._snapshot = self._load()
+            except Exception:
+                now = self._clock()
+                if snapshot is None or now >= snapshot[3]:
+                    raise
+                logger.warning("Fee estimate refresh failed, serving cached estimates", exc_info=True)
+                # Back off instead of hitting the failing backend on every quote
+                retry_at = min(now + min(self.ttl, self.retry_after), snapshot[3])
+                self._snapshot = snapshot = (retry_at,) + snapshot[1:]
+                return snapshot
+            return self._snapshot
+
+    def fee_rate(self, target: Union[str, int]='six_blocks') -> float:
+        """
+        Returns the fee rate in sat/vbyte for a confirmation target.
+
+        Args:
+            target (str | int): A name from TARGETS or a number of blocks. A block
+                count without its own estimate uses the closest shorter target,
+                which is the higher, safer rate.
+        """
+        blocks = TARGETS[target] if isinstance(target, str) else int(target)
+        if blocks < 1:
+            raise ValueError("target must be at least 1 block")
+
+        _, targets, rates, _ = self._current()
+        pos = bisect_right(targets, blocks)
+        return rates[pos - 1] if pos else rates[0]
+
+    def quotes(self) -> Dict[str, float]:
+        """Returns the fee rate for every named target."""
+        return {name: self.fee_rate(blocks) for name, blocks in TARGETS.items()}
+
+    def estimates(self) -> Dict[int, float]:
+        """Returns the cached {blocks: sat/vbyte} estimates."""
+        _, targets, rates, _ = self._current()
+        return dict(zip(targets, rates))
+
+    def invalidate(self):
+        """Forces the next quote to refresh from the backend."""
+        self._snapshot = None
+
+
+_default_estimators: Dict[str, FeeEstimator] = {}
+_default_estimators_lock = threading.Lock()
+
+
+def default_fee_estimator(network='bitcoin') -> FeeEstimator:
+    """Process-wide FeeEstimator over default_backend(network), created on first use."""
+    with _default_estimators_lock:
+        estimator = _default_estimators.get(network)
+        if estimator is None:
+            estimator = _default_estimators[network] = FeeEstimator(default_backend(network))
+        return estimator
@@ -0,0 +1,242 @@
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, List, NamedTuple, Optional, Union
+
+from python.bitcoin_wallet.database.models import DEFAULT_PAGE_SIZE, RekeyCheckpoint, WalletDB, stored_ciphertext
+from python.bitcoin_wallet.utils.crypto.security import (
+    DEFAULT_ARGON2_PARAMS, DEFAULT_UNLOCK_MEMORY_BUDGET_KIB, Security, kdf_memory_kib, unpack_envelope,
+)
+
+logger = logging.getLogger(__name__)
+
+# Returns the password of a wallet, or None to leave that wallet alone
+PasswordProvider = Callable[[int], Optional[str]]
+
+
+class RekeyResult(NamedTuple):
+    """
+    Outcome of one RekeyJob.run call.
+
+    rekeyed / failed: totals for the job, including earlier interrupted runs
+    skipped: wallets already on the target parameters, without a password, or changed
+             by someone else meanwhile, in this run
+    failed_ids: wallets that could not be re-keyed in this run
+    """
+    rekeyed: int
+    skipped: int
+    failed: int
+    failed_ids: List[int]
+    last_wallet_id: int
+    elapsed: float
+
+
+def _rekey(encrypted_blob: Union[bytes, dict], password: str, kdf_params: dict) -> bytes:
+    # Runs in a worker process, module level so it can be pickled
+    security = Security()
+    mnemonic = security.decrypt_mnemonic(encrypted_blob, password)
+    return security.encrypt_mnemonic_envelope(mnemonic, password, kdf_params=kdf_params)
+
+
+class RekeyJob:
+    """
+    Re-encrypts every stored mnemonic under new Argon2 parameters.
+
+    Wallet rows are streamed in id order with keyset pagination. Each row is
+    decrypted and re-encrypted as a version 2 envelope in a process pool.
+    Submissions are weighted by the larger of the old and new memory_cost
+    and bounded by memory_budget_kib. Results are written back in order in
+    batched transactions. Every batch also saves a checkpoint, so an
+    interrupted job resumes after the last written wallet. Wallets that
+    already use the target parameters are skipped, and so are wallets whose
+    mnemonic was changed by someone else while the job worked on them.
+
+    Usage:
+        job = RekeyJob(lambda wallet_id: vault.password(wallet_id), {"memory_cost": 2**17})
+        result = job.run()
+    """
+
+    def __init__(self, passwords: PasswordProvider, kdf_params: dict=None, job: str="rekey",
+                 memory_budget_kib: int=DEFAULT_UNLOCK_MEMORY_BUDGET_KIB, max_workers: int=None,
+                 batch_size: int=100, page_size: int=DEFAULT_PAGE_SIZE, executor: Executor=None,
+                 wallet_db: WalletDB=None):
+        """
+        Args:
+            passwords (callable): passwords(wallet_id) returns the wallet's password,
+                or None to skip it. Called in this process only.
+            kdf_params (dict): Target Argon2 parameters, missing keys fall back
+                to DEFAULT_ARGON2_PARAMS.
+            job (str): Checkpoint name, reusing it resumes the job.
+            memory_budget_kib (int): Argon2 memory in flight across all workers.
+            max_workers (int, optional): Worker processes, defaults to the CPU
+                count capped by what the budget allows.
+            batch_size (int): Wallets written per transaction.
+            page_size (int): Wallet rows read per query.
+            executor (Executor, optional): Pool to run the KDF work on instead of
+                a private ProcessPoolExecutor.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        self.passwords = passwords
+        self.kdf_params = {**DEFAULT_ARGON2_PARAMS, **(kdf_params or {})}
+        self.job = job
+        self.memory_budget_kib = memory_budget_kib
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.wallet_db = wallet_db or WalletDB()
+        self._executor = executor
+        if max_workers is None:
+            max_workers = max(1, min(os.cpu_count() or 1, memory_budget_kib // self.kdf_params["memory_cost"]))
+        self.max_workers = max_workers
+
+    def _is_current(self, encrypted_blob: Union[bytes, dict]) -> bool:
+        return not isinstance(encrypted_blob, dict) and unpack_envelope(encrypted_blob).kdf_params == self.kdf_params
+
+    def reset(self):
+        """Forgets the checkpoint, the next run starts from the first wallet"""
+        self.wallet_db.delete_rekey_checkpoint(self.job)
+
+    def run(self) -> RekeyResult:
+        """
+        Re-keys every wallet after the checkpoint.
+
+        Returns:
+            RekeyResult: Totals and the wallets that failed.
+
+        Raises:
+            ValueError: If the job's checkpoint was written for other kdf_params.
+        """
+        params_json = json.dumps(self.kdf_params, sort_keys=True)
+        checkpoint = self.wallet_db.get_rekey_checkpoint(self.job)
+        if checkpoint is None:
+            checkpoint = RekeyCheckpoint(self.job, params_json)
+        elif checkpoint.kdf_params != params_json:
+            raise ValueError(f"Checkpoint of job {self.job!r} targets other kdf_params, reset() it first.")
+
+        executor = self._executor or ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        state = _RunState(checkpoint)
+        start = time.perf_counter()
+        try:
+            self._pipeline(executor, state)
+        except BaseException:
+            # Keep whatever finished in order before the interruption
+            for future in state.running:
+                future.cancel()
+            wait(state.running)
+            self._drain(state)
+            self._flush(state)
+            raise
+        finally:
+            if self._executor is None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.perf_counter() - start
+        checkpoint = state.checkpoint
+        logger.info("Re-key job %s: %d re-keyed, %d skipped, %d failed in %.1fs",
+                    self.job, checkpoint.rekeyed, state.skipped, checkpoint.failed, elapsed)
+        return RekeyResult(checkpoint.rekeyed, state.skipped, checkpoint.failed,
+                           state.failed_ids, checkpoint.last_wallet_id, elapsed)
+
+    def _pipeline(self, executor: Executor, state: "_RunState"):
+        rows = self.wallet_db.iter_encrypted_mnemonics(state.checkpoint.last_wallet_id, self.page_size)
+        for wallet_id, encrypted_blob in rows:
+            try:
+                current = self._is_current(encrypted_blob)
+                memory_kib = kdf_memory_kib(encrypted_blob)
+            except Exception:
+                # A corrupt envelope or bad kdf_params fails this wallet, not the job
+                logger.warning("Wallet %d has an unreadable encrypted mnemonic", wallet_id, exc_info=True)
+                state.failed_ids.append(wallet_id)
+                state.pending.append((wallet_id, None, None))
+                self._drain(state)
+                continue
+
+            password = None if current else self.passwords(wallet_id)
+            if password is None:
+                state.skipped += 1
+                state.pending.append((wallet_id, None, None))
+            else:
+                # Decrypting and re-encrypting run one after the other, the larger cost is the peak
+                weight = min(max(memory_kib, self.kdf_params["memory_cost"]), self.memory_budget_kib)
+                while state.in_flight and state.in_flight + weight > self.memory_budget_kib:
+                    self._wait(state)
+                future = executor.submit(_rekey, encrypted_blob, password, self.kdf_params)
+                state.running[future] = weight
+                state.in_flight += weight
+                state.pending.append((wallet_id, future, stored_ciphertext(encrypted_blob)))
+            self._drain(state)
+
+        while state.running:
+            self._wait(state)
+        self._drain(state)
+        self._flush(state)
+
+    def _wait(self, state: "_RunState"):
+        done, _ = wait(state.running, return_when=FIRST_COMPLETED)
+        for future in done:
+            state.in_flight -= state.running.pop(future)
+        self._drain(state)
+
+    def _drain(self, state: "_RunState"):
+        # Results are taken in wallet id order, so the checkpoint never passes
+        # a wallet that is still being worked on
+        pending = state.pending
+        while pending and (pending[0][1] is None or pending[0][1].done()):
+            wallet_id, future, previous = pending.popleft()
+            if future is not None:
+                if future.cancelled():
+                    pending.appendleft((wallet_id, future, previous))
+                    return
+                if future in state.running:
+                    state.in_flight -= state.running.pop(future)
+                try:
+                    state.batch.append((future.result(), wallet_id, previous))
+                except Exception:
+                    logger.warning("Re-key of wallet %d failed", wallet_id, exc_info=True)
+                    state.failed_ids.append(wallet_id)
+            state.last_wallet_id = wallet_id
+            if len(state.batch) >= self.batch_size:
+                self._flush(state)
+
+    def _flush(self, state: "_RunState"):
+        checkpoint = state.checkpoint
+        failed = len(state.failed_ids) - state.failed_saved
+        if state.last_wallet_id == checkpoint.last_wallet_id:
+            return
+        checkpoint = checkpoint._replace(
+            last_wallet_id=state.last_wallet_id,
+            rekeyed=checkpoint.rekeyed + len(state.batch),
+            failed=checkpoint.failed + failed,
+        )
+        stale = self.wallet_db.store_envelopes(state.batch, checkpoint)
+        if stale:
+            logger.info("Wallets %s changed during the re-key job, left as they are", stale)
+        state.checkpoint = checkpoint._replace(rekeyed=checkpoint.rekeyed - len(stale))
+        state.skipped += len(stale)
+        state.batch = []
+        state.failed_saved = len(state.failed_ids)
+
+
+class _RunState:
+    __slots__ = ("checkpoint", "pending", "running", "in_flight", "batch",
+                 "last_wallet_id", "skipped", "failed_ids", "failed_saved")
+
+    def __init__(self, checkpoint: RekeyCheckpoint):
+        self.checkpoint = checkpoint
+        # (wallet_id, future, ciphertext read) in id order, future None for wallets needing no work
+        self.pending = deque()
+        # future -> memory weight of the submitted work
+        self.running = {}
+        self.in_flight = 0
+        self.batch = []
+        self.last_wallet_id = checkpoint.last_wallet_id
+        self.skipped = 0
+        self.failed_ids = []
+        self.failed_saved = 0
@@ -1,9 +1,31 @@
-import requests
-from bitcoinlib.keys import HDKey
+from bitcoinlib.keys import HDKey, Address
 from bitcoinlib.mnemonic import Mnemonic
+from bitcoinlib.scripts import Script
 from bitcoinlib.transactions import Transaction
 import qrcode
 
+from python.bitcoin_wallet.core.backend import default_backend
+from python.bitcoin_wallet.core.coin_selection import CoinSelector, DUST_LIMIT
+from python.bitcoin_wallet.core.discovery import AccountDiscovery, DEFAULT_GAP_LIMIT
+from python.bitcoin_wallet.core.fees import FeeEstimator, default_fee_estimator
+from python.bitcoin_wallet.database.models import AddressDB, TransactionDB, UtxoDB
+from python.bitcoin_wallet.utils.db.db_op import get_db_cursor
+from python.bitcoin_wallet.utils.crypto.keys import DerivedAddress, SEED_CACHE
+
+
+# BIP44 / BIP49 / BIP84 purpose of the account node for each witness type
+PURPOSES = {
+    'legacy': 44,
+    'p2sh-segwit': 49,
+    'segwit': 84,
+}
+
+
+def script_pubkey(address):
+    """Returns the locking script (scriptPubKey) bytes for an address."""
+    parsed = Address.parse(address)
+    return Script(script_types=[parsed.script_type], public_hash=parsed.hash_bytes).serialize()
+
 
 class BitcoinWallet:
     """
@@ -14,7 +36,7 @@ class BitcoinWallet:
     any data on the filesystem.
     """
 
-    def __init__(self, mnemonic=None, network='bitcoin'):
+    def __init__(self, mnemonic=None, network='bitcoin', backend=None):
         """
         Initializes the wallet from a mnemonic phrase.
 
@@ -25,6 +47,8 @@ class BitcoinWallet:
                                       Defaults to None, which triggers generation.
             network (str): The network to use ('bitcoin' or 'testnet').
                            Defaults to 'testnet'.
+            backend (ChainBackend, optional): Chain data source. Defaults to the
+                                              shared BlockstreamBackend for the network.
         """
         if mnemonic:
             self.mnemonic = mnemonic
@@ -32,8 +56,79 @@ class BitcoinWallet:
             # Generate a new 12-word mnemonic
             self.mnemonic = Mnemonic().generate()
 
-        # Create a master Hierarchical Deterministic (HD) key from the mnemonic
-        self.master_key = HDKey.from_passphrase(self.mnemonic, network=network)
+        # Create a master Hierarchical Deterministic (HD) key from the mnemonic.
+        # The BIP39 seed stretch is cached, re-opening the same wallet skips it.
+        self._init_keys(SEED_CACHE.get_or_generate(self.mnemonic), network, backend)
+
+    def _init_keys(self, seed, network, backend):
+        self.master_key = HDKey.from_seed(seed, network=network)
+        purpose = PURPOSES[self.master_key.witness_type]
+        coin_type = self.master_key.network.bip44_cointype
+        self.account_path = f"m/{purpose}'/{coin_type}'/0'"
+        self.account_key = (self.master_key
+                            .child_private(purpose, hardened=True)
+                            .child_private(coin_type, hardened=True)
+                            .child_private(0, hardened=True))
+        self._chain_keys = {}
+        self.backend = backend or default_backend(network)
+        self.fee_estimator = default_fee_estimator(network) if backend is None else FeeEstimator(backend)
+
+    @classmethod
+    def watch_only(cls, xpub, network='bitcoin', backend=None):
+        """
+        Creates a watch-only wallet from an extended public key.
+
+        The wallet holds no mnemonic or private key. Addresses are derived with
+        public (non-hardened) child key derivation only, so it is safe to use in
+        address-issuing frontends.
+
+        Args:
+            xpub (str): An account-level extended public key (xpub/tpub/vpub/...).
+            network (str): The network to use ('bitcoin' or 'testnet').
+            backend (ChainBackend, optional): Chain data source.
+
+        Returns:
+            BitcoinWallet: A watch-only wallet instance.
+        """
+        wallet = cls.__new__(cls)
+        wallet.mnemonic = None
+        wallet.master_key = HDKey(xpub, network=network)
+        # The xpub is the account node itself
+        wallet.account_key = wallet.master_key
+        wallet.account_path = "M"
+        wallet._chain_keys = {}
+        wallet.backend = backend or default_backend(network)
+        wallet.fee_estimator = default_fee_estimator(network) if backend is None else FeeEstimator(backend)
+        return wallet
+
+    @classmethod
+    def from_session(cls, session, network='bitcoin', backend=None):
+        """
+        Opens the wallet held by an unlock session without re-entering the password.
+
+        Keys come from the seed the session holds, nothing is added to
+        SEED_CACHE, so locking the session leaves no copy of the seed behind.
+
+        Args:
+            session (UnlockSession): An unlocked session from a SessionManager.
+            network (str): The network to use ('bitcoin' or 'testnet').
+            backend (ChainBackend, optional): Chain data source.
+
+        Returns:
+            BitcoinWallet: The wallet for the session's mnemonic.
+
+        Raises:
+            SessionLocked: If the session was locked or has expired.
+        """
+        wallet = cls.__new__(cls)
+        wallet.mnemonic = session.mnemonic()
+        wallet._init_keys(session.seed(), network, backend)
+        return wallet
+
+    @property
+    def is_watch_only(self):
+        """True if the wallet was created from an extended public key."""
+        return not self.master_key.is_private
 
     def get_mnemonic(self):
         """
@@ -54,12 +149,29 @@ class BitcoinWallet:
 
         Returns:
             str: The master private key.
+
+        Raises:
+            ValueError: If the wallet is watch-only.
         """
+        if self.is_watch_only:
+            raise ValueError("Watch-only wallet has no private key.")
         if wif:
             return self.master_key.wif()
         else:
             return self.master_key.private_hex
 
+    def get_account_xpub(self):
+        """
+        Returns the extended public key of the wallet's account node.
+
+        BitcoinWallet.watch_only(xpub) derives the same receive and change
+        addresses as this wallet.
+
+        Returns:
+            str: The account xpub (tpub/vpub/... depending on network and witness type).
+        """
+        return self.account_key.wif_public()
+
     def get_master_public_key(self):
         """
         Returns the master public key.
@@ -77,6 +189,83 @@ class BitcoinWallet:
             str: The bech32 address (starts with "bc1" for mainnet and "tb1" for testnet).
         """
         return self.master_key.address()
+
+    def derive_address(self, index, change=False):
+        """
+        Derive a receive (or change) address of the wallet's account.
+
+        Full wallets derive below their BIP44/49/84 account node
+        (m/purpose'/coin'/0'), watch-only wallets below the account xpub, so
+        both produce the same addresses. The chain key (<account>/0 or
+        <account>/1) is derived once and cached, so every call only costs one
+        public child derivation.
+
+        Args:
+            index (int): Address index on the chain.
+            change (bool): If True, derive from the change chain.
+
+        Returns:
+            str: The derived address.
+        """
+        return self._chain_key(change).child_public(index).address()
+
+    def _chain_key(self, change):
+        chain_idx = 1 if change else 0
+        chain_key = self._chain_keys.get(chain_idx)
+        if chain_key is None:
+            chain_key = self.account_key.child_public(chain_idx)
+            self._chain_keys[chain_idx] = chain_key
+        return chain_key
+
+    def derive_range(self, start, count, change=False):
+        """
+        Derive count consecutive addresses of the receive (or change) chain.
+
+        Args:
+            start (int): First address index.
+            count (int): Number of addresses.
+            change (bool): If True, derive from the change chain.
+
+        Returns:
+            list[DerivedAddress]: Addresses ordered by index.
+        """
+        chain_key = self._chain_key(change)
+        chain_idx = 1 if change else 0
+        derived = []
+        for index in range(start, start + count):
+            key = chain_key.child_public(index)
+            derived.append(DerivedAddress(index, f"{self.account_path}/{chain_idx}/{index}",
+                                          key.address(), key.public_byte))
+        return derived
+
+    def discover_addresses(self, wallet_id, gap_limit=DEFAULT_GAP_LIMIT, full=False, address_db=None):
+        """
+        Find the used receive and change addresses of the wallet's account with a gap-limit scan.
+
+        Scans the external (<account>/0/i) and internal (<account>/1/i) chains
+        of the BIP44/49/84 account node, the addresses derive_address returns.
+
+        Every scanned address is stored in AddressDB with its is_used flag. Later
+        calls resume after the highest used index unless full is True.
+
+        Args:
+            wallet_id (int): Wallet row the addresses belong to.
+            gap_limit (int): Consecutive unused addresses that end a chain.
+            full (bool): Rescan both chains from index 0.
+            address_db (AddressDB, optional): Address store, defaults to AddressDB().
+
+        Returns:
+            DiscoveryResult: Per-chain scan results.
+        """
+        discovery = AccountDiscovery(
+            wallet_id,
+            lambda change, start, count: self.derive_range(start, count, change),
+            self.backend,
+            gap_limit=gap_limit,
+            address_type=Address.parse(self.get_address()).script_type,
+            address_db=address_db,
+        )
+        return discovery.run(full=full)
     
     def generate_qr_code(self, filename=None):
         """
@@ -104,39 +293,97 @@ class BitcoinWallet:
         img.save(filename)
         return filename
     
-    def get_balance(self):
+    def sync_utxos(self, wallet_id, utxo_db=None, address_db=None):
         """
-        Fetch the confirmed balance (in satoshis) for the wallet's address using Blockstream API.
+        Refresh the local UTXO set from the chain backend.
+
+        Covers the wallet's address and every address marked used by
+        discover_addresses. Outputs returned by the backend are upserted; local
+        unspent outputs that the backend no longer lists are marked spent.
+
+        Args:
+            wallet_id (int): Wallet row the outputs belong to.
+            utxo_db (UtxoDB, optional): UTXO store, defaults to UtxoDB().
+            address_db (AddressDB, optional): Address store, defaults to AddressDB().
+
+        Returns:
+            int: Number of unspent outputs across the synced addresses.
+        """
+        utxo_db = utxo_db or UtxoDB()
+        address_db = address_db or AddressDB()
+        addresses = dict.fromkeys([self.get_address()] + address_db.used_addresses(wallet_id))
+
+        count = 0
+        for address in addresses:
+            utxos = self.backend.get_utxos(address)
+            script = script_pubkey(address)
+            utxo_db.upsert_utxos(
+                (utxo['txid'], utxo['vout'], wallet_id, address, utxo['value'], script)
+                for utxo in utxos
+            )
+            live = {(utxo['txid'], utxo['vout']) for utxo in utxos}
+            utxo_db.mark_spent(
+                (row.txid, row.vout) for row in utxo_db.unspent_for_address(address)
+                if (row.txid, row.vout) not in live
+            )
+            count += len(utxos)
+        return count
+
+    def get_balance(self, wallet_id=None):
+        """
+        Fetch the confirmed balance (in satoshis) for the wallet's address from the chain backend.
+
+        Args:
+            wallet_id (int, optional): If given, the balance is read from the
+                local UTXO set (see sync_utxos) instead of the network.
 
         Returns:
             int: The confirmed balance in satoshis.
         Raises:
             Exception: If the API call fails.
         """
-        address = self.get_address()
-        if self.master_key.network.name == 'testnet':
-            api_url = f"https://blockstream.info/testnet/api/address/{address}"
-        else:
-            api_url = f"https://blockstream.info/api/address/{address}"
+        if wallet_id is not None:
+            return UtxoDB().balance(wallet_id)
 
         try:
-            resp = requests.get(api_url)
-            resp.raise_for_status()
-            data = resp.json()
-            # 'chain_stats' contains confirmed transactions
-            return data['chain_stats']['funded_txo_sum'] - data['chain_stats']['spent_txo_sum']
+            return self.backend.get_balance(self.get_address())
         except Exception as e:
             raise Exception(f"Failed to fetch balance: {e}")
 
-    def send_bitcoin(self, to_address, amount_sats, fee_rate=1.0, network=None):
+    def _signing_keys(self, wallet_id, addresses):
+        """
+        Private keys for the given addresses: the wallet address itself and
+        every stored address of the account's receive and change chains.
+
+        Returns:
+            dict[str, HDKey]: Address to key, addresses without a key are left out.
+        """
+        keys = {}
+        own = self.get_address()
+        if own in addresses:
+            keys[own] = self.master_key
+        for row in AddressDB().get_addresses(wallet_id, addresses):
+            key = self.account_key.child_private(1 if row.is_change else 0).child_private(row.index_num)
+            # Rows written by an older derivation scheme do not match, never sign for them
+            if key.address() == row.address:
+                keys[row.address] = key
+        return keys
+
+    def send_bitcoin(self, to_address, amount_sats, fee_rate=None, network=None, wallet_id=None,
+                     fee_target='six_blocks'):
         """
         Build, sign, and broadcast a Bitcoin transaction.
 
         Args:
             to_address (str): Recipient's Bitcoin address.
             amount_sats (int): Amount to send in satoshis.
-            fee_rate (float): Fee rate in sat/vbyte (default: 1.0).
+            fee_rate (float, optional): Fee rate in sat/vbyte. Estimated for
+                fee_target if not given.
             network (str, optional): 'bitcoin' or 'testnet'. Uses wallet's network if not specified.
+            wallet_id (int, optional): If given, UTXOs are selected from the local
+                UTXO set and the set is updated after broadcast.
+            fee_target (str | int): Confirmation target passed to the fee
+                estimator, a name from fees.TARGETS or a number of blocks.
 
         Returns:
             str: Transaction ID if broadcast is successful.
@@ -144,57 +391,124 @@ class BitcoinWallet:
         Raises:
             Exception: If transaction fails.
         """
-        # 1. Fetch UTXOs for this address
-        # For HD wallets, you might need an API to fetch all UXTOs for derived addresses.
-        # Also validate the returned address format (library/address validator) before using it in URLs.
+        txid, _ = self.send_many([(to_address, amount_sats)], fee_rate=fee_rate, network=network,
+                                 wallet_id=wallet_id, fee_target=fee_target)
+        return txid
+
+    def send_many(self, payments, fee_rate=None, network=None, wallet_id=None, fee_target='six_blocks'):
+        """
+        Pay several recipients with a single transaction.
+
+        All payments share one coin selection, one change output and one fee
+        for the transaction overhead. Each input is signed with the key of the
+        address it spends from.
+
+        Args:
+            payments (list[tuple[str, int]]): (address, amount in satoshis) pairs.
+                Payments to the same address are merged into one output.
+            fee_rate (float, optional): Fee rate in sat/vbyte. Estimated for
+                fee_target if not given.
+            network (str, optional): 'bitcoin' or 'testnet'. Uses wallet's network if not specified.
+            wallet_id (int, optional): If given, UTXOs are selected from the local
+                UTXO set across the wallet address and every discovered address,
+                the set is updated after broadcast and the transaction is
+                recorded in TransactionDB. Otherwise only the wallet address's
+                UTXOs are fetched from the backend.
+            fee_target (str | int): Confirmation target passed to the fee
+                estimator, a name from fees.TARGETS or a number of blocks.
+
+        Returns:
+            tuple[str, dict[str, int]]: Transaction ID and the output index (vout)
+            paying each recipient address. Outputs follow the order in which
+            each address first appears in payments.
+
+        Raises:
+            ValueError: If the wallet is watch-only or a payment is invalid.
+            Exception: If transaction fails.
+        """
+        if self.is_watch_only:
+            raise ValueError("Watch-only wallet cannot sign transactions.")
+
+        merged = {}
+        for to_address, amount in payments:
+            if isinstance(amount, bool) or not isinstance(amount, int) or amount <= 0:
+                raise ValueError(f"Payment to {to_address} must be a positive number of sats, got {amount!r}.")
+            merged[to_address] = merged.get(to_address, 0) + amount
+        if not merged:
+            raise ValueError("No payments given.")
+        payments = list(merged.items())
+        recipients = list(merged)
+        output_types = [Address.parse(to_address).script_type for to_address in recipients]
+        for (to_address, amount), output_type in zip(payments, output_types):
+            if output_type not in DUST_LIMIT:
+                raise ValueError(f"Unsupported output type {output_type!r} for {to_address}.")
+            if amount < DUST_LIMIT[output_type]:
+                raise ValueError(f"Payment of {amount} sats to {to_address} is below the dust limit.")
+
+        # 1. Fetch UTXOs, from every address with a known key when the local set is used
         address = self.get_address()
 
         # Safer to normalize the string and detect testnet via substring
         net = network or self.master_key.network.name
-        if net == 'testnet':
-            utxo_url = f"https://blockstream.info/testnet/api/address/{address}/utxo"
-            push_url = "https://blockstream.info/testnet/api/tx"
+        backend = self.backend if net == self.master_key.network.name else default_backend(net)
+        if fee_rate is None:
+            estimator = self.fee_estimator if backend is self.backend else default_fee_estimator(net)
+            fee_rate = estimator.fee_rate(fee_target)
+
+        if wallet_id is not None:
+            utxo_db = UtxoDB()
+            candidates = utxo_db.select_candidates(wallet_id)
+            keys = self._signing_keys(wallet_id, {row.address for row in candidates})
+            utxos = [
+                {'txid': row.txid, 'vout': row.vout, 'value': row.amount_sat, 'address': row.address}
+                for row in candidates if row.address in keys
+            ]
         else:
-            utxo_url = f"https://blockstream.info/api/address/{address}/utxo"
-            push_url = "https://blockstream.info/api/tx"
-
-        utxos = requests.get(utxo_url).json()
+            keys = {address: self.master_key}
+            utxos = [dict(utxo, address=address) for utxo in backend.get_utxos(address)]
         if not utxos:
             raise Exception("No UTXOs available to spend.")
 
-        # 2. Select UTXOs to cover amount + fee (simple greedy selection)
-        selected = []
-        total = 0
-        for utxo in utxos:
-            selected.append(utxo)
-            total += utxo['value']
-            if total >= amount_sats:
-                break
-        if total < amount_sats:
-            raise Exception("Insufficient funds.")
-
-        # 3. Build transaction
-        tx = Transaction(network=net)
+        # 2. Select UTXOs covering every payment + fee, preferring a changeless set
+        own_type = Address.parse(address).script_type
+        selector = CoinSelector(
+            fee_rate,
+            input_type=own_type,
+            output_types=output_types,
+            change_type=own_type,
+        )
+        # select_candidates returns them largest first, skip re-sorting
+        selection = selector.select(utxos, sum(amount for _, amount in payments), presorted=wallet_id is not None)
+        selected, change = selection.inputs, selection.change
+
+        # 3. Build transaction, payments first in the given order
+        tx = Transaction(network=net, witness_type=self.master_key.witness_type)
         for utxo in selected:
-            tx.add_input(prev_txid=utxo['txid'], output_n=utxo['vout'], value=utxo['value'], address=address)
-        tx.add_output(address=to_address, value=amount_sats)
+            key = keys[utxo['address']]
+            tx.add_input(prev_txid=utxo['txid'], output_n=utxo['vout'], value=utxo['value'],
+                         address=utxo['address'], keys=key.public())
+        for to_address, amount in payments:
+            tx.add_output(address=to_address, value=amount)
 
-        # 4. Estimate fee and add change output if needed
-        tx_size = tx.size()
-        fee = int(fee_rate * tx_size)
-        change = total - amount_sats - fee
+        # 4. Add change output if the selection left one
         if change > 0:
             tx.add_output(address=address, value=change)
 
-        # 5. Sign transaction
-        tx.sign(self.master_key)
+        # 5. Sign every input with the key of the address it spends from
+        for index_n, utxo in enumerate(selected):
+            tx.sign(keys[utxo['address']], index_n=index_n)
 
         # 6. Broadcast transaction
-        rawtx = tx.raw_hex()
-        resp = requests.post(push_url, data=rawtx)
-        if resp.status_code != 200:
-            raise Exception(f"Broadcast failed: {resp.text}")
-        return resp.text  # txid
+        raw_tx = tx.raw()
+        txid = backend.broadcast(raw_tx.hex())
+        if wallet_id is not None:
+            # One transaction, so the UTXO set and the history can't disagree
+            with get_db_cursor():
+                utxo_db.mark_spent((utxo['txid'], utxo['vout']) for utxo in selected)
+                if change > 0:
+                    utxo_db.upsert_utxos([(txid, len(payments), wallet_id, address, change, script_pubkey(address))])
+                TransactionDB().add_transaction(wallet_id, txid, raw_tx)
+        return txid, {to_address: vout for vout, to_address in enumerate(recipients)}
 
 if __name__ == '__main__':
     print("--- Simple Wallet Generation Example ---")
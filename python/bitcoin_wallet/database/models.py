@@ -1,5 +1,10 @@
+import base64
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from python.bitcoin_wallet.utils.crypto.security import ENVELOPE_VERSION
 from python.bitcoin_wallet.utils.db.db_op import get_db_cursor
 from python.bitcoin_wallet.utils.db.schema_init import init_db
+from python.bitcoin_wallet.utils.iterutils import chunked
 
 # Initialize and create the database with the complete table
 # TODO: Maybe change it to a better one
@@ -8,6 +13,88 @@ from python.bitcoin_wallet.utils.db.schema_init import init_db
 
 # TODO: Change the data types of the parameters
 
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_PAGE_SIZE = 500
+
+class AddressRow(NamedTuple):
+    id: int
+    wallet_id: int
+    address: str
+    address_type: str
+    index_num: int
+    derivation_path: str
+    is_change: bool
+    is_used: bool
+
+class TransactionRow(NamedTuple):
+    """Transaction listing row, raw_tx is only filled when asked for"""
+    id: int
+    wallet_id: int
+    txid: str
+    status: str
+    created_at: str
+    raw_tx: Optional[bytes] = None
+
+class RekeyCheckpoint(NamedTuple):
+    """Progress of a re-key job: every wallet up to last_wallet_id has been handled"""
+    job: str
+    kdf_params: str
+    last_wallet_id: int = 0
+    rekeyed: int = 0
+    failed: int = 0
+
+class UtxoRow(NamedTuple):
+    txid: str
+    vout: int
+    wallet_id: int
+    address: str
+    amount_sat: int
+    script_pubkey: bytes
+    spent: bool
+
+_ADDRESS_COLUMNS = "id, wallet_id, address, address_type, index_num, derivation_path, is_change, is_used"
+_TRANSACTION_COLUMNS = "id, wallet_id, txid, status, created_at"
+_UTXO_COLUMNS = "txid, vout, wallet_id, address, amount_sat, script_pubkey, spent"
+
+def _address_row(row: Sequence) -> tuple:
+    row = tuple(row)
+    if not 5 <= len(row) <= 7:
+        raise ValueError("Address rows need 5 to 7 fields")
+    # Pad is_used / is_change with the create_address defaults
+    return row + (False, False)[len(row) - 5:]
+
+def _utxo_row(row: Sequence) -> tuple:
+    row = tuple(row)
+    if not 6 <= len(row) <= 7:
+        raise ValueError("UTXO rows need 6 or 7 fields")
+    return row if len(row) == 7 else row + (False,)
+
+def _transaction_row(row: Sequence) -> tuple:
+    row = tuple(row)
+    if not 3 <= len(row) <= 4:
+        raise ValueError("Transaction rows need 3 or 4 fields")
+    return row if len(row) == 4 else row + ("pending",)
+
+def _encrypted_mnemonic(row: Sequence) -> Union[bytes, dict]:
+    """Envelope bytes for version 2 rows, the version 1 dict (base64 fields) otherwise"""
+    encrypted_mnemonic, kdf, kdf_salt, kdf_params, enc_nonce, version = row
+    if version == ENVELOPE_VERSION:
+        return encrypted_mnemonic
+    return {
+        "kdf": kdf,
+        "kdf_salt": base64.b64encode(kdf_salt).decode(),
+        "kdf_params": kdf_params,
+        "enc_nonce": base64.b64encode(enc_nonce).decode(),
+        "encrypted_mnemonic": base64.b64encode(encrypted_mnemonic).decode(),
+        "version": version
+    }
+
+def stored_ciphertext(encrypted_blob: Union[bytes, dict]) -> bytes:
+    """encrypted_mnemonic column value of an encrypted mnemonic read from the wallets table"""
+    if isinstance(encrypted_blob, dict):
+        return base64.b64decode(encrypted_blob["encrypted_mnemonic"])
+    return encrypted_blob
+
 class WalletDB:
     """Sqlite object to handle wallet operations"""
 
@@ -23,6 +110,100 @@ class WalletDB:
             )
             return cur.lastrowid
 
+    def create_wallet_envelope(self, name: str, envelope: bytes, kdf: str="argon2id"):
+        """Insert a wallet whose mnemonic is a version 2 envelope
+
+        The envelope carries its own salt, nonce and KDF parameters, so it is
+        stored whole in encrypted_mnemonic and the legacy columns stay empty.
+        """
+        return self.create_wallet(name, envelope, kdf, b"", "", b"", ENVELOPE_VERSION)
+
+    def get_encrypted_mnemonic(self, wallet_id: int) -> Optional[Union[bytes, dict]]:
+        """Encrypted mnemonic of a wallet, ready for Security.decrypt_mnemonic
+
+        Returns: envelope bytes for version 2 rows, the version 1 dict
+                 (base64 fields) for legacy rows, None if the wallet is missing
+        """
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT encrypted_mnemonic, kdf, kdf_salt, kdf_params, enc_nonce, version FROM wallets WHERE id = ?",
+                (wallet_id,)
+            )
+            row = cur.fetchone()
+
+        return None if row is None else _encrypted_mnemonic(row)
+
+    def page_encrypted_mnemonics(self, after_id: int=0, limit: int=DEFAULT_PAGE_SIZE) -> List[Tuple[int, Union[bytes, dict]]]:
+        """Keyset-paginated (wallet_id, encrypted mnemonic) pairs in id order
+
+        Pass the id of the last pair of a page as after_id to get the next one.
+        """
+        with get_db_cursor() as cur:
+            cur.execute(
+                """SELECT id, encrypted_mnemonic, kdf, kdf_salt, kdf_params, enc_nonce, version
+                   FROM wallets WHERE id > ? ORDER BY id LIMIT ?""",
+                (after_id, limit)
+            )
+            return [(row[0], _encrypted_mnemonic(row[1:])) for row in cur.fetchall()]
+
+    def iter_encrypted_mnemonics(self, after_id: int=0, page_size: int=DEFAULT_PAGE_SIZE) -> Iterator[Tuple[int, Union[bytes, dict]]]:
+        """Stream every wallet's encrypted mnemonic, holding at most one page in memory"""
+        while True:
+            page = self.page_encrypted_mnemonics(after_id, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1][0]
+
+    def store_envelopes(self, rows: Iterable[Tuple[bytes, int, bytes]], checkpoint: Optional[RekeyCheckpoint]=None,
+                        kdf: str="argon2id") -> List[int]:
+        """Replace encrypted mnemonics with version 2 envelopes in one transaction
+
+        rows: (envelope, wallet_id, previous) triples, previous being the
+              encrypted_mnemonic the envelope was made from (see stored_ciphertext).
+              A wallet whose encrypted_mnemonic changed since is left alone.
+        checkpoint: saved in the same transaction, so progress and data never
+                    disagree; wallets left alone are not counted as rekeyed
+
+        Returns: ids of the wallets left alone
+        """
+        stale = []
+        with get_db_cursor() as cur:
+            for envelope, wallet_id, previous in rows:
+                cur.execute(
+                    """UPDATE wallets SET encrypted_mnemonic = ?, kdf = ?, kdf_salt = x'', kdf_params = '',
+                       enc_nonce = x'', version = ? WHERE id = ? AND encrypted_mnemonic = ?""",
+                    (envelope, kdf, ENVELOPE_VERSION, wallet_id, previous)
+                )
+                if cur.rowcount == 0:
+                    stale.append(wallet_id)
+            if checkpoint is not None:
+                cur.execute(
+                    """INSERT INTO rekey_checkpoints (job, kdf_params, last_wallet_id, rekeyed, failed)
+                       VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT(job) DO UPDATE SET
+                           kdf_params = excluded.kdf_params,
+                           last_wallet_id = excluded.last_wallet_id,
+                           rekeyed = excluded.rekeyed,
+                           failed = excluded.failed,
+                           updated_at = CURRENT_TIMESTAMP""",
+                    checkpoint._replace(rekeyed=checkpoint.rekeyed - len(stale))
+                )
+            return stale
+
+    def get_rekey_checkpoint(self, job: str) -> Optional[RekeyCheckpoint]:
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT job, kdf_params, last_wallet_id, rekeyed, failed FROM rekey_checkpoints WHERE job = ?",
+                (job,)
+            )
+            row = cur.fetchone()
+            return None if row is None else RekeyCheckpoint(*row)
+
+    def delete_rekey_checkpoint(self, job: str):
+        with get_db_cursor() as cur:
+            cur.execute("DELETE FROM rekey_checkpoints WHERE job = ?", (job,))
+
     def delete_wallet(self, wallet_id: int):
         with get_db_cursor() as cur:
             cur.execute(
@@ -57,6 +238,59 @@ class AddressDB:
             )
             return cur.lastrowid
 
+    def create_addresses(self, rows: Iterable[Sequence], chunk_size: int=DEFAULT_CHUNK_SIZE) -> int:
+        """Insert many addresses in one transaction
+
+        rows: tuples in create_address argument order
+              (wallet_id, address, address_type, index_num, derivation_path[, is_used[, is_change]]),
+              any iterable including generators is consumed chunk by chunk.
+
+        Returns: number of inserted rows
+        """
+        inserted = 0
+        with get_db_cursor() as cur:
+            for chunk in chunked(rows, chunk_size):
+                cur.executemany(
+                    """
+                    INSERT INTO addresses (wallet_id, address, address_type, index_num, derivation_path, is_used, is_change)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [_address_row(row) for row in chunk]
+                )
+                inserted += cur.rowcount
+        return inserted
+
+    def upsert_addresses(self, rows: Iterable[Sequence], chunk_size: int=DEFAULT_CHUNK_SIZE) -> int:
+        """Insert many addresses, refreshing is_used on addresses already stored
+
+        rows: same layout as create_addresses, an address once marked used stays used.
+
+        Returns: number of inserted or updated rows
+        """
+        written = 0
+        with get_db_cursor() as cur:
+            for chunk in chunked(rows, chunk_size):
+                cur.executemany(
+                    """
+                    INSERT INTO addresses (wallet_id, address, address_type, index_num, derivation_path, is_used, is_change)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(address) DO UPDATE SET
+                        is_used = MAX(addresses.is_used, excluded.is_used)
+                    """,
+                    [_address_row(row) for row in chunk]
+                )
+                written += cur.rowcount
+        return written
+
+    def max_used_index(self, wallet_id: int, is_change: bool=False) -> Optional[int]:
+        """Highest index_num marked used on a chain, None if nothing is used yet"""
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT MAX(index_num) FROM addresses WHERE wallet_id = ? AND is_change = ? AND is_used = 1",
+                (wallet_id, is_change)
+            )
+            return cur.fetchone()[0]
+
     def delete_address(self, address):
         with get_db_cursor() as cur:
             cur.execute(
@@ -72,6 +306,69 @@ class AddressDB:
             )
             return cur.fetchall()
 
+    def page_addresses(self, wallet_id: int, after_id: int=0, limit: int=DEFAULT_PAGE_SIZE) -> List[AddressRow]:
+        """Keyset-paginated address listing
+
+        Pass the id of the last row of a page as after_id to get the next one.
+        """
+        with get_db_cursor() as cur:
+            cur.execute(
+                f"""SELECT {_ADDRESS_COLUMNS} FROM addresses
+                    WHERE wallet_id = ? AND id > ? ORDER BY id LIMIT ?""",
+                (wallet_id, after_id, limit)
+            )
+            return [AddressRow(*row) for row in cur.fetchall()]
+
+    def iter_addresses(self, wallet_id: int, page_size: int=DEFAULT_PAGE_SIZE) -> Iterator[AddressRow]:
+        """Stream every address of a wallet, holding at most one page in memory"""
+        after_id = 0
+        while True:
+            page = self.page_addresses(wallet_id, after_id, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
+    def address_list(self, wallet_id: int, is_change: bool=None):
+        """Returns only the address strings of a wallet, answered from idx_addresses_wallet alone"""
+        with get_db_cursor() as cur:
+            if is_change is None:
+                cur.execute(
+                    "SELECT address FROM addresses WHERE wallet_id = ?",
+                    (wallet_id,)
+                )
+            else:
+                cur.execute(
+                    "SELECT address FROM addresses WHERE wallet_id = ? AND is_change = ? ORDER BY index_num",
+                    (wallet_id, is_change)
+                )
+            return [row[0] for row in cur.fetchall()]
+
+    def used_addresses(self, wallet_id: int) -> List[str]:
+        """Address strings marked used, receive chain first, in index order"""
+        with get_db_cursor() as cur:
+            cur.execute(
+                """SELECT address FROM addresses WHERE wallet_id = ? AND is_used = 1
+                    ORDER BY is_change, index_num""",
+                (wallet_id,)
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def get_addresses(self, wallet_id: int, addresses: Iterable[str]) -> List[AddressRow]:
+        """Stored rows for the given address strings of a wallet, unknown addresses are left out"""
+        addresses = list(dict.fromkeys(addresses))
+        rows = []
+        with get_db_cursor() as cur:
+            # Stay below SQLite's bound parameter limit
+            for chunk in chunked(addresses, 500):
+                cur.execute(
+                    f"""SELECT {_ADDRESS_COLUMNS} FROM addresses
+                        WHERE wallet_id = ? AND address IN ({', '.join('?' * len(chunk))})""",
+                    (wallet_id, *chunk)
+                )
+                rows.extend(AddressRow(*row) for row in cur.fetchall())
+        return rows
+
 class TransactionDB:
     """Stores all wallet transaction activity"""
     
@@ -86,6 +383,60 @@ class TransactionDB:
             )
             return cur.lastrowid
 
+    def add_transactions(self, rows: Iterable[Sequence], chunk_size: int=DEFAULT_CHUNK_SIZE) -> int:
+        """Insert many transactions in one transaction, already known txids are ignored
+
+        rows: tuples of (wallet_id, txid, raw_tx[, status]), status defaults to "pending",
+              any iterable including generators is consumed chunk by chunk.
+
+        Returns: number of inserted rows
+        """
+        inserted = 0
+        with get_db_cursor() as cur:
+            for chunk in chunked(rows, chunk_size):
+                cur.executemany(
+                    """INSERT OR IGNORE INTO transactions (wallet_id, txid, raw_tx, status) VALUES(?, ?, ?, ?)""",
+                    [_transaction_row(row) for row in chunk]
+                )
+                inserted += cur.rowcount
+        return inserted
+
+    def page_transactions(self, wallet_id: int, after_id: int=0, limit: int=DEFAULT_PAGE_SIZE,
+                          include_raw: bool=False) -> List[TransactionRow]:
+        """Keyset-paginated transaction history
+
+        raw_tx is left out unless include_raw is True, use get_raw_tx to fetch
+        it for a single transaction when it is actually needed.
+        """
+        columns = _TRANSACTION_COLUMNS + (", raw_tx" if include_raw else "")
+        with get_db_cursor() as cur:
+            cur.execute(
+                f"""SELECT {columns} FROM transactions
+                    WHERE wallet_id = ? AND id > ? ORDER BY id LIMIT ?""",
+                (wallet_id, after_id, limit)
+            )
+            return [TransactionRow(*row) for row in cur.fetchall()]
+
+    def iter_transactions(self, wallet_id: int, page_size: int=DEFAULT_PAGE_SIZE,
+                          include_raw: bool=False) -> Iterator[TransactionRow]:
+        """Stream a wallet's history, holding at most one page in memory"""
+        after_id = 0
+        while True:
+            page = self.page_transactions(wallet_id, after_id, page_size, include_raw)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
+    def get_raw_tx(self, txid: str) -> Optional[bytes]:
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT raw_tx FROM transactions WHERE txid = ?",
+                (txid,)
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+
     def all_transactions(self, wallet_id: int):
         with get_db_cursor() as cur:
             cur.execute(
@@ -93,4 +444,93 @@ class TransactionDB:
                 (wallet_id,)
             )
             return cur.fetchall()
-        
\ No newline at end of file
+
+class UtxoDB:
+    """Local UTXO set backed by the utxos table
+
+    The per-wallet unspent total is kept in wallet_balances by triggers, so
+    balance() is a primary key lookup and candidate selection walks the
+    partial idx_utxos_unspent index instead of calling the chain API.
+    """
+
+    def __init__(self):
+        ...
+
+    def upsert_utxos(self, rows: Iterable[Sequence], chunk_size: int=DEFAULT_CHUNK_SIZE) -> int:
+        """Insert or refresh many outputs in one transaction
+
+        rows: tuples of (txid, vout, wallet_id, address, amount_sat, script_pubkey[, spent]),
+              an output already marked spent locally stays spent.
+
+        Returns: number of inserted or updated rows
+        """
+        written = 0
+        with get_db_cursor() as cur:
+            for chunk in chunked(rows, chunk_size):
+                cur.executemany(
+                    """
+                    INSERT INTO utxos (txid, vout, wallet_id, address, amount_sat, script_pubkey, spent)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(txid, vout) DO UPDATE SET
+                        wallet_id = excluded.wallet_id,
+                        address = excluded.address,
+                        amount_sat = excluded.amount_sat,
+                        script_pubkey = excluded.script_pubkey,
+                        spent = MAX(utxos.spent, excluded.spent)
+                    """,
+                    [_utxo_row(row) for row in chunk]
+                )
+                written += cur.rowcount
+        return written
+
+    def mark_spent(self, outpoints: Iterable[Sequence], chunk_size: int=DEFAULT_CHUNK_SIZE) -> int:
+        """Mark (txid, vout) outpoints as spent
+
+        Returns: number of outputs that were unspent before
+        """
+        updated = 0
+        with get_db_cursor() as cur:
+            for chunk in chunked(outpoints, chunk_size):
+                cur.executemany(
+                    "UPDATE utxos SET spent = 1 WHERE txid = ? AND vout = ? AND spent = 0",
+                    [tuple(outpoint) for outpoint in chunk]
+                )
+                updated += cur.rowcount
+        return updated
+
+    def balance(self, wallet_id: int) -> int:
+        """Unspent total in satoshis, read from the wallet_balances aggregate"""
+        with get_db_cursor() as cur:
+            cur.execute(
+                "SELECT unspent_sat FROM wallet_balances WHERE wallet_id = ?",
+                (wallet_id,)
+            )
+            row = cur.fetchone()
+            return row[0] if row else 0
+
+    def select_candidates(self, wallet_id: int, limit: int=None, min_amount: int=0,
+                          largest_first: bool=True, address: str=None) -> List[UtxoRow]:
+        """Unspent outputs of a wallet ordered by value, for coin selection
+
+        address optionally restricts the candidates to outputs of one address.
+        """
+        order = "DESC" if largest_first else "ASC"
+        address_filter = "" if address is None else "AND address = ?"
+        params = (wallet_id, min_amount) + (() if address is None else (address,))
+        with get_db_cursor() as cur:
+            cur.execute(
+                f"""SELECT {_UTXO_COLUMNS} FROM utxos
+                    WHERE wallet_id = ? AND spent = 0 AND amount_sat >= ? {address_filter}
+                    ORDER BY amount_sat {order} LIMIT ?""",
+                params + (-1 if limit is None else limit,)
+            )
+            return [UtxoRow(*row) for row in cur.fetchall()]
+
+    def unspent_for_address(self, address: str) -> List[UtxoRow]:
+        with get_db_cursor() as cur:
+            cur.execute(
+                f"SELECT {_UTXO_COLUMNS} FROM utxos WHERE address = ? AND spent = 0",
+                (address,)
+            )
+            return [UtxoRow(*row) for row in cur.fetchall()]
+
@@ -0,0 +1,247 @@
+import os
+import hmac
+import time
+import threading
+from hashlib import sha256
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from bip_utils import Bip32PathParser, Bip32Slip10Secp256k1, Bip39SeedGenerator
+
+from python.bitcoin_wallet.utils.metrics import metrics
+
+
+class NodeCache:
+    """
+        Bounded LRU cache of BIP32 nodes keyed by seed and path prefix
+
+        Every intermediate node of a derived path is kept, so a request for
+        m/44'/1'/0'/0/57 resumes from the cached m/44'/1'/0'/0 node and the
+        master key is only created once per seed.
+
+        Usage:
+            cache = NodeCache(maxsize=256)
+            node = cache.derive(seed, "m/44'/1'/0'/0/57")
+            cache.clear()
+    """
+
+    def __init__(self, maxsize: int=256):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._nodes = OrderedDict()
+        self._lock = threading.Lock()
+        self._id_key = os.urandom(32)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _seed_id(self, seed: bytes) -> bytes:
+        # Seeds are never stored as dict keys, only a keyed digest of them
+        return hmac.new(self._id_key, seed, sha256).digest()
+
+    def _put(self, key: Tuple[bytes, Tuple[int, ...]], node: Bip32Slip10Secp256k1):
+        self._nodes[key] = node
+        self._nodes.move_to_end(key)
+        while len(self._nodes) > self.maxsize:
+            self._nodes.popitem(last=False)
+
+    def master(self, seed: bytes) -> Bip32Slip10Secp256k1:
+        """Returns the (cached) master node for seed"""
+
+        return self.derive(seed, "m")
+
+    def derive(self, seed: bytes, derivation_path: str) -> Bip32Slip10Secp256k1:
+        """
+        Derive the node at derivation_path, resuming from the deepest cached prefix
+
+        Returns: Node context.
+        """
+        indexes = tuple(Bip32PathParser.Parse(derivation_path.strip()).ToList())
+        seed_id = self._seed_id(seed)
+
+        with self._lock:
+            depth = len(indexes)
+            while depth >= 0:
+                node = self._nodes.get((seed_id, indexes[:depth]))
+                if node is not None:
+                    self._nodes.move_to_end((seed_id, indexes[:depth]))
+                    self.hits += 1
+                    break
+                depth -= 1
+            else:
+                node = None
+                self.misses += 1
+
+        new_nodes = []
+        with metrics.timed("node_derivation"):
+            if node is None:
+                node = Bip32Slip10Secp256k1.FromSeed(seed)
+                depth = 0
+                new_nodes.append((indexes[:0], node))
+
+            for i in range(depth, len(indexes)):
+                node = node.ChildKey(indexes[i])
+                # Leaves are cheap to re-derive from their parent, only keep the prefixes
+                if i + 1 < len(indexes):
+                    new_nodes.append((indexes[:i + 1], node))
+
+        if new_nodes:
+            with self._lock:
+                for prefix, prefix_node in new_nodes:
+                    self._put((seed_id, prefix), prefix_node)
+
+        return node
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters and current size"""
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._nodes),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        """
+        Drop every cached node and reset the counters
+
+        The seed digest key is rotated as well, so nothing derived before the
+        call can be matched against the cache afterwards.
+        """
+        with self._lock:
+            self._nodes.clear()
+            self._id_key = os.urandom(32)
+            self.hits = 0
+            self.misses = 0
+
+
+def _zeroize(buf: bytearray):
+    buf[:] = bytes(len(buf))
+
+
+class SeedCache:
+    """
+        Size-bounded, TTL-expiring cache of BIP39 seeds
+
+        Skips the 2048-round PBKDF2-HMAC-SHA512 stretch when the same
+        mnemonic/passphrase pair is opened again. Entries are keyed by an
+        HMAC of (mnemonic, passphrase) under a per-process random key and the
+        cached seed buffer is zeroed when it is evicted, expires or is cleared.
+
+        Usage:
+            cache = SeedCache(maxsize=32, ttl=300)
+            seed = cache.get_or_generate("abandon ...", passphrase="")
+    """
+
+    def __init__(self, maxsize: int=32, ttl: float=300.0,
+                 clock: Callable[[], float]=time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._seeds = OrderedDict()
+        self._lock = threading.Lock()
+        self._id_key = os.urandom(32)
+
+    def __len__(self) -> int:
+        return len(self._seeds)
+
+    def _entry_id(self, mnemonic_phrase: Union[str, bytes, bytearray], passphrase: str) -> bytes:
+        mac = hmac.new(self._id_key, digestmod=sha256)
+        mac.update(mnemonic_phrase.encode("utf-8") if isinstance(mnemonic_phrase, str) else mnemonic_phrase)
+        mac.update(b"\x00")
+        mac.update(passphrase.encode("utf-8"))
+        return mac.digest()
+
+    def _evict(self, entry_id: bytes):
+        seed_buf, _ = self._seeds.pop(entry_id)
+        _zeroize(seed_buf)
+
+    def _lookup(self, entry_id: bytes) -> Optional[bytes]:
+        entry = self._seeds.get(entry_id)
+        if entry is None:
+            return None
+
+        seed_buf, expires_at = entry
+        if self._clock() >= expires_at:
+            self._evict(entry_id)
+            return None
+
+        self._seeds.move_to_end(entry_id)
+        return bytes(seed_buf)
+
+    def get_or_generate(self, mnemonic_phrase: str, passphrase: Optional[str]="") -> bytes:
+        """
+        Returns the BIP39 seed for mnemonic_phrase/passphrase, running the
+        PBKDF2 stretch only on a cache miss
+        """
+        passphrase = passphrase or ""
+
+        with self._lock:
+            entry_id = self._entry_id(mnemonic_phrase, passphrase)
+            seed = self._lookup(entry_id)
+            if seed is not None:
+                self.hits += 1
+                return seed
+            self.misses += 1
+
+        with metrics.timed("seed_generation"):
+            seed = Bip39SeedGenerator(mnemonic_phrase).Generate(passphrase)
+
+        with self._lock:
+            if entry_id in self._seeds:
+                self._evict(entry_id)
+            self._seeds[entry_id] = (bytearray(seed), self._clock() + self.ttl)
+            while len(self._seeds) > self.maxsize:
+                self._evict(next(iter(self._seeds)))
+
+        return seed
+
+    def evict(self, mnemonic_phrase: Union[str, bytes, bytearray], passphrase: Optional[str]=""):
+        """
+        Zeroes and drops the seed of mnemonic_phrase/passphrase if it is cached
+
+        mnemonic_phrase may be the UTF-8 bytes of the phrase, so callers
+        holding it in a bytearray need not make a str copy.
+        """
+        with self._lock:
+            entry_id = self._entry_id(mnemonic_phrase, passphrase or "")
+            if entry_id in self._seeds:
+                self._evict(entry_id)
+
+    def purge_expired(self):
+        """Zeroes and drops every expired entry"""
+
+        with self._lock:
+            now = self._clock()
+            for entry_id in [k for k, (_, expires_at) in self._seeds.items() if now >= expires_at]:
+                self._evict(entry_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters and current size"""
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._seeds),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        """Zeroes and drops every cached seed and resets the counters"""
+
+        with self._lock:
+            for entry_id in list(self._seeds):
+                self._evict(entry_id)
+            self._id_key = os.urandom(32)
+            self.hits = 0
+            self.misses = 0
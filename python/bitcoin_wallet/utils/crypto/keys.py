@@ -1,22 +1,274 @@
 import os
-from typing import Optional, Tuple, Dict
+import logging
+import threading
+from collections import OrderedDict, deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, Dict, List, NamedTuple, Iterator, Iterable
 
 from ecdsa.curves import SECP256k1
 from ecdsa import SigningKey, VerifyingKey, BadSignatureError
+from ecdsa.ellipticcurve import PointJacobi
 from ecdsa.util import sigencode_der, sigdecode_der
 from hashlib import sha256
 
 from mnemonic import Mnemonic
 from bip_utils import (
-    Bip39SeedGenerator, 
     Bip32Slip10Secp256k1, 
     Bip44, 
     Bip44Coins, 
     Bip44Changes,
+    Bip44ConfGetter,
     P2PKHAddr
 )
 
-# TODO: Check line 105
+from python.bitcoin_wallet.utils.crypto.cache import NodeCache, SeedCache
+from python.bitcoin_wallet.utils.iterutils import chunked
+from python.bitcoin_wallet.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Shared by every HDKeys instance unless one is passed explicitly
+NODE_CACHE = NodeCache()
+SEED_CACHE = SeedCache()
+
+class DerivedAddress(NamedTuple):
+    """Compact record for a single derived address"""
+
+    index: int
+    path: str
+    address: str
+    public_key: bytes
+    private_key: Optional[bytes] = None
+
+def _derive_children(chain_ctx, chain_path: str, net_ver: bytes, start: int,
+                     count: int, include_priv: bool) -> List[DerivedAddress]:
+    """Derive `count` leaf addresses under an already derived chain node"""
+
+    indexes = range(start, start + count)
+
+    with metrics.timed("node_derivation", count):
+        nodes = [chain_ctx.ChildKey(address_idx) for address_idx in indexes]
+        pub_keys = [node.PublicKey().RawCompressed().ToBytes() for node in nodes]
+
+    with metrics.timed("address_encoding", count):
+        addresses = [P2PKHAddr.EncodeKey(pub_key, net_ver=net_ver) for pub_key in pub_keys]
+
+    return [
+        DerivedAddress(
+            index=address_idx,
+            path=f"{chain_path}/{address_idx}",
+            address=address,
+            public_key=pub_key,
+            private_key=node.PrivateKey().Raw().ToBytes() if include_priv else None,
+        )
+        for address_idx, node, pub_key, address in zip(indexes, nodes, pub_keys, addresses)
+    ]
+
+# Per-process state for derive_many workers, set once by the pool initializer
+_worker_chain = None
+
+def _init_derive_worker(extended_key: str, chain_path: str, net_ver: bytes):
+    global _worker_chain
+    _worker_chain = (Bip32Slip10Secp256k1.FromExtendedKey(extended_key), chain_path, net_ver)
+
+def _derive_chunk(bounds: Tuple[int, int, bool]) -> List[DerivedAddress]:
+    start, count, include_priv = bounds
+    chain_ctx, chain_path, net_ver = _worker_chain
+    return _derive_children(chain_ctx, chain_path, net_ver, start, count, include_priv)
+
+def _stream_chunks(chunks: List[Tuple[int, int, bool]], workers: Optional[int],
+                   initargs: Tuple[str, str, bytes]) -> Iterator[DerivedAddress]:
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_derive_worker,
+        initargs=initargs
+    ) as pool:
+        for chunk in pool.map(_derive_chunk, chunks):
+            yield from chunk
+
+class Signer:
+    """
+        Reusable deterministic ECDSA signer (secp256k1, sha256, DER)
+
+        The private key is parsed once; every signature after that skips the
+        key parsing and public point multiplication done by sign_message.
+
+        Usage:
+            signer = Signer(private_key)
+            sigs = signer.sign_many([msg1, msg2])
+    """
+
+    def __init__(self, private_key: bytes):
+        self._sk = SigningKey.from_string(private_key, curve=SECP256k1)
+
+    def sign(self, message: bytes) -> bytes:
+        """Returns DER-encoded signature"""
+
+        return self._sk.sign_deterministic(
+            message,
+            hashfunc=sha256,
+            sigencode=sigencode_der
+        )
+
+    def sign_many(self, messages: Iterable[bytes]) -> List[bytes]:
+        """Returns DER-encoded signatures in message order"""
+
+        sign = self.sign
+        return [sign(message) for message in messages]
+
+# Per-process signer for sign_many workers, set once by the pool initializer
+_worker_signer = None
+
+def _init_sign_worker(private_key: bytes):
+    global _worker_signer
+    _worker_signer = Signer(private_key)
+
+def _sign_chunk(messages: List[bytes]) -> List[bytes]:
+    return _worker_signer.sign_many(messages)
+
+_SECP256K1_P = SECP256k1.curve.p()
+
+@lru_cache(maxsize=4096)
+def _decompress_public_key(compressed_pubkey: bytes) -> bytes:
+    """Memoized 33 -> 64 byte decompression, repeated keys skip the modular square root"""
+
+    x = int.from_bytes(compressed_pubkey[1:], 'big')
+    if x >= _SECP256K1_P:
+        raise ValueError("Invalid compressed public key: x is not a field element")
+
+    # secp256k1: y^2 = x^3 + 7, and p % 4 == 3 so sqrt(a) = a^((p+1)/4)
+    y_squared = (pow(x, 3, _SECP256K1_P) + 7) % _SECP256K1_P
+    y = pow(y_squared, (_SECP256K1_P + 1) // 4, _SECP256K1_P)
+    if (y * y) % _SECP256K1_P != y_squared:
+        raise ValueError("Invalid compressed public key: point is not on the curve")
+
+    if (y & 1) != (compressed_pubkey[0] & 1):
+        y = _SECP256K1_P - y
+
+    return x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+
+def _uncompressed_public_key(public_key: bytes) -> bytes:
+    """Returns the 64-byte (X || Y) form of a 33-byte compressed or 64-byte public key"""
+
+    public_key = bytes(public_key)
+    if len(public_key) == 64:
+        return public_key
+    if len(public_key) == 33 and public_key[0] in (2, 3):
+        return _decompress_public_key(public_key)
+
+    raise ValueError("Expected 33-byte compressed or 64-byte uncompressed public key")
+
+def _ordered_window(pool: ProcessPoolExecutor, fn, chunks: Iterable, window: int) -> Iterator:
+    """Like pool.map, but keeps at most `window` chunks in flight so huge inputs are not buffered"""
+
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(fn, chunk))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+class VerifyingKeyCache:
+    """
+        Bounded LRU cache of parsed secp256k1 verifying keys
+
+        A key gets its multiplication tables precomputed (VerifyingKey.precompute)
+        once it has been used `precompute_after` times; the table costs roughly
+        a handful of verifications and halves the cost of every later one.
+    """
+
+    def __init__(self, maxsize: int=256, precompute_after: int=8):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize = maxsize
+        self.precompute_after = precompute_after
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, public_key: bytes) -> VerifyingKey:
+        """Returns the parsed VerifyingKey for a 64-byte uncompressed public key"""
+
+        precompute = False
+        with self._lock:
+            entry = self._keys.get(public_key)
+            if entry is not None:
+                self._keys.move_to_end(public_key)
+                entry[1] += 1
+                if entry[1] != self.precompute_after:
+                    return entry[0]
+                precompute = True
+
+        # Parse and precompute without holding the lock. Tables are built on a fresh
+        # key so threads verifying with the cached one never see them half done;
+        # parsing with the curve order attached keeps precompute() usable on the point
+        point = PointJacobi.from_bytes(SECP256k1.curve, public_key, order=SECP256k1.order)
+        vk = VerifyingKey.from_public_point(point, curve=SECP256k1)
+        if precompute:
+            vk.precompute()
+
+        with self._lock:
+            # First insert wins, so concurrent misses all get the same key
+            entry = self._keys.setdefault(public_key, [vk, self.precompute_after if precompute else 1])
+            if precompute:
+                entry[0] = vk
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+# Shared by Keys.verify_signature and in-process Keys.verify_many
+VK_CACHE = VerifyingKeyCache()
+
+def _verify_with(vk: VerifyingKey, message: bytes, sig: bytes) -> bool:
+    try:
+        return vk.verify(
+            sig,
+            message,
+            hashfunc=sha256,
+            sigdecode=sigdecode_der
+        )
+    except BadSignatureError:
+        return False
+
+def _verify_items(vk_cache: VerifyingKeyCache, items: List[Tuple[bytes, bytes, bytes]]) -> List[bool]:
+    """Verify (public_key, message, sig) tuples grouped by public key, results in input order"""
+
+    results = [False] * len(items)
+    public_keys = [_uncompressed_public_key(item[0]) for item in items]
+    for i in sorted(range(len(items)), key=public_keys.__getitem__):
+        _, message, sig = items[i]
+        results[i] = _verify_with(vk_cache.get(public_keys[i]), message, sig)
+
+    return results
+
+# Per-process verifying key cache for verify_many workers
+_worker_vk_cache = None
+
+def _init_verify_worker(maxsize: int):
+    global _worker_vk_cache
+    _worker_vk_cache = VerifyingKeyCache(maxsize=maxsize)
+
+def _verify_chunk(items: List[Tuple[bytes, bytes, bytes]]) -> List[bool]:
+    return _verify_items(_worker_vk_cache, items)
+
+def _stream_verify(items: Iterable[Tuple[bytes, bytes, bytes]], workers: int,
+                   chunk_size: int) -> Iterator[bool]:
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_verify_worker,
+        initargs=(VK_CACHE.maxsize,)
+    ) as pool:
+        for results in _ordered_window(pool, _verify_chunk, chunked(items, chunk_size), workers * 2):
+            yield from results
 
 class Keys:
     """Class for low-level ECDSA key helpers (secp256k1)"""
@@ -57,6 +309,18 @@ class Keys:
         prefix = b'\x02' if (int.from_bytes(y, 'big') % 2) == 0 else b'\x03'
 
         return prefix + x
+
+    def decompress_public_key(self, compressed_pubkey: bytes) -> bytes:
+        """Decompress a 33-bytes compressed public key to the 64-bytes uncompressed form
+
+        Results are memoized, so repeated keys skip the modular square root.
+        Returns: Uncompressed 64-bytes public key X || Y (type(bytes))
+        """
+
+        if len(compressed_pubkey) != 33 or compressed_pubkey[0] not in (2, 3):
+            raise ValueError("Expect 33-bytes compressed public key (0x02/0x03 || X)")
+
+        return _decompress_public_key(bytes(compressed_pubkey))
     
     def sign_message(self, private_key: str, message: bytes) -> bytes:
         """Signs message bytes deterministically
@@ -72,26 +336,65 @@ class Keys:
         )
 
         return sig
+
+    def signer(self, private_key: bytes) -> Signer:
+        """Returns a reusable Signer for private_key"""
+
+        return Signer(private_key)
+
+    def sign_many(self, private_key: bytes, messages: Iterable[bytes],
+                  workers: Optional[int]=None, chunk_size: int=256) -> List[bytes]:
+        """Signs many messages with one parsed key
+
+        With workers > 1 the messages are split into chunks of chunk_size and
+        signed in a process pool; each worker parses the key once.
+
+        Returns DER-encoded signatures in message order
+        """
+        if not workers or workers <= 1:
+            return Signer(private_key).sign_many(messages)
+
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        signatures = []
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_sign_worker,
+            initargs=(private_key,)
+        ) as pool:
+            for chunk in pool.map(_sign_chunk, chunked(messages, chunk_size)):
+                signatures.extend(chunk)
+
+        return signatures
     
     def verify_signature(self, public_key: bytes, message: bytes, sig: bytes) -> bool:
-        # TODO: This only works for uncompressed public key, make it work for compressed public key
-        # TODO: by writing the decompress_public_key function
-        """Verify a DER-encoded signature given an uncompressed public key"""
-
-        if len(public_key) != 64:
-            raise ValueError("Expected 64-byte uncompressed public key")
-
-        vk = VerifyingKey.from_string(public_key, curve=SECP256k1)
-        try:
-            return vk.verify(
-                sig,
-                message,
-                hashfunc=sha256,
-                sigdecode=sigdecode_der
-            )
-        except BadSignatureError:
-            return False
-        
+        """Verify a DER-encoded signature given a 33-byte compressed or 64-byte uncompressed public key"""
+
+        return _verify_with(VK_CACHE.get(_uncompressed_public_key(public_key)), message, sig)
+
+    def verify_many(self, items: Iterable[Tuple[bytes, bytes, bytes]],
+                    workers: Optional[int]=None, chunk_size: int=1024) -> Iterator[bool]:
+        """Verify many (public_key, message, sig) tuples
+
+        Parsed keys are reused across the whole stream and work inside each
+        chunk is grouped by public key. With workers > 1 chunks are fanned out
+        to a process pool, each worker keeping its own key cache.
+
+        Returns: iterator of bools in input order
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        if workers and workers > 1:
+            return _stream_verify(items, workers, chunk_size)
+
+        return (
+            result
+            for chunk in chunked(items, chunk_size)
+            for result in _verify_items(VK_CACHE, chunk)
+        )
+
 class HDKeys(Keys):
     """
         TESTNET-
@@ -102,11 +405,48 @@ class HDKeys(Keys):
             hd = HDKeys.from_mnemonic("abandon ...", passphrase="")
             seed = hd.seed
             addr = hd.generate_bip44_address(account_idx=0, change=False, address_idx=0)
+
+        Watch-only usage (no seed, public derivation only):
+            xpub = hd.account_xpub(seed, account_idx=0)
+            watch = HDKeys.from_xpub(xpub)
+            addr = watch.derive_public_address(change=False, address_idx=0)
     """
 
-    def __init__(self, seed: bytes):
-        # seed: BIP39 64-bytes seed
+    def __init__(self, seed: bytes, node_cache: Optional[NodeCache]=None):
+        # seed: BIP39 64-bytes seed, None for watch-only instances
         self.seed = seed
+        self.node_cache = node_cache if node_cache is not None else NODE_CACHE
+        self.account_node = None
+        self.account_path = "M"
+        self.testnet = True
+        self._public_chains = {}
+
+    @classmethod
+    def from_xpub(cls, xpub: str, testnet: bool=True, account_path: str="M") -> "HDKeys":
+        """Creates a watch-only instance from an account-level extended public key
+
+        Only non-hardened public children can be derived, no seed or private
+        key is ever held. account_path is only used to label derived paths,
+        e.g. "m/44'/1'/0'".
+
+        Returns: a class instance of HDkeys
+        """
+        coin_net = Bip44Coins.BITCOIN_TESTNET if testnet else Bip44Coins.BITCOIN
+        key_net_ver = Bip44ConfGetter.GetConfig(coin_net).KeyNetVersions()
+        node = Bip32Slip10Secp256k1.FromExtendedKey(xpub.strip(), key_net_ver)
+        if not node.IsPublicOnly():
+            node.ConvertToPublic()
+
+        hd = cls(None)
+        hd.account_node = node
+        hd.account_path = account_path
+        hd.testnet = testnet
+
+        return hd
+
+    @property
+    def is_watch_only(self) -> bool:
+        return self.account_node is not None
 
     @classmethod
     def from_mnemonic(cls, mnemonic_phrase: str, passphrase: Optional[str]="") -> "HDKeys":
@@ -114,19 +454,18 @@ class HDKeys(Keys):
         
         Returns: a class instance of HDkeys
         """
-        seed = Bip39SeedGenerator(mnemonic_phrase).Generate(passphrase)
-
-        print(f"[x] Generating seed from mnemonic phrase ...")
+        logger.debug("Generating seed from mnemonic phrase")
+        seed = SEED_CACHE.get_or_generate(mnemonic_phrase, passphrase)
 
         return cls(seed)
 
     def generate_mnemonic(self, strength: int = 256, lang: str='english') -> str:
         """Returns a new BIP39 mnemonic phrases"""
 
-        mnemo = Mnemonic(lang)
-        mnemonic_phrase = mnemo.generate(strength=strength)
-
-        print(f"[x] Generating mnemonic phrase for language: {lang} ...")
+        logger.debug("Generating mnemonic phrase for language: %s", lang)
+        with metrics.timed("mnemonic_generation"):
+            mnemo = Mnemonic(lang)
+            mnemonic_phrase = mnemo.generate(strength=strength)
 
         return mnemonic_phrase
     
@@ -136,10 +475,8 @@ class HDKeys(Keys):
         Returns: seed bytes
         """
 
-        seed = Bip39SeedGenerator(mnemonic_phrase).Generate(passphrase)
-
-        print(f"[x] Generating seed from mnemonic phrase ...")
-        print(f"[x] Seed: ", seed.hex())
+        logger.debug("Generating seed from mnemonic phrase")
+        seed = SEED_CACHE.get_or_generate(mnemonic_phrase, passphrase)
 
         return seed
     
@@ -150,7 +487,7 @@ class HDKeys(Keys):
         Returns:
             (master_private_key_bytes (32), master_chain_code_bytes (32))
         """
-        bip32_ctx = Bip32Slip10Secp256k1.FromSeed(seed)
+        bip32_ctx = self.node_cache.master(seed)
         master_priv = bip32_ctx.PrivateKey().ToRaw().ToBytes()
         chain_code = bip32_ctx.ChainCode().ToBytes()
 
@@ -162,8 +499,7 @@ class HDKeys(Keys):
 
         Returns: Node context.
         """
-        bip32_ctx = Bip32Slip10Secp256k1.FromSeed(seed)
-        node = bip32_ctx.DerivePath(derivation_path)
+        node = self.node_cache.derive(seed, derivation_path)
 
         return node
     
@@ -174,13 +510,12 @@ class HDKeys(Keys):
         Returns Address data which include private key bytes only if include_priv=True
         """
 
-        path = derivation_path.strip()
-        bip32_ctx = Bip32Slip10Secp256k1.FromSeed(seed)
-        node_ctx = bip32_ctx.DerivePath(path)
+        node_ctx = self.node_cache.derive(seed, derivation_path)
         pub_key = node_ctx.PublicKey().RawCompressed().ToBytes()
 
         net_ver = b'\x6f' if testnet else b'\x00'
-        address = P2PKHAddr.EncodeKey(pub_key, net_ver=net_ver)
+        with metrics.timed("address_encoding"):
+            address = P2PKHAddr.EncodeKey(pub_key, net_ver=net_ver)
 
         result = {
             "path": node_ctx,
@@ -210,22 +545,27 @@ class HDKeys(Keys):
             if include_priv = True
         """
 
+        logger.debug("Generating BIP44 address for account index: %s, change: %s, address index: %s",
+                     account_idx, change, address_idx)
+
         coin_net = Bip44Coins.BITCOIN_TESTNET if testnet else Bip44Coins.BITCOIN
-        bip44_mst_seed = Bip44.FromSeed(seed, coin_net)
-        address_ctx = (
-            bip44_mst_seed
-            .Purpose()
-            .Coin()
-            .Account(account_idx)
-            .Change(Bip44Changes.CHAIN_EXT if not change else Bip44Changes.Chain_EXT)
-            .AddressIndex(address_idx)
-        )
+        with metrics.timed("node_derivation"):
+            bip44_mst_seed = Bip44.FromSeed(seed, coin_net)
+            address_ctx = (
+                bip44_mst_seed
+                .Purpose()
+                .Coin()
+                .Account(account_idx)
+                .Change(Bip44Changes.CHAIN_EXT if not change else Bip44Changes.CHAIN_INT)
+                .AddressIndex(address_idx)
+            )
 
-        print(f"[x] Generating BIP44 account for account index: {account_idx}, change: {change}, address index: {address_idx} ...")
+        with metrics.timed("address_encoding"):
+            address = address_ctx.PublicKey().ToAddress()
 
         result = {
             "path": f"m/44'/{1 if testnet else 0}'/{account_idx}'/{0 if not change else 1}/{address_idx}",
-            "address": address_ctx.PublicKey().ToAddress(),
+            "address": address,
             "public_key": address_ctx.PublicKey().RawCompressed().ToBytes(),
         }
         
@@ -233,4 +573,93 @@ class HDKeys(Keys):
             result["private_key"] = address_ctx.PrivateKey().Raw().ToBytes()
 
         return result
-    
\ No newline at end of file
+
+    def derive_range(self, seed: bytes, account_idx: int, change: bool,
+                     start: int, count: int, testnet: bool=True,
+                     include_priv: bool=False) -> List[DerivedAddress]:
+        """Derive `count` consecutive BIP44 addresses starting at `start`.
+
+        The chain node (m/44'/coin'/account'/change) comes from the node cache,
+        every index after that costs a single child derivation.
+
+        Returns: list of DerivedAddress ordered by index, private_key is only
+        set if include_priv = True
+        """
+        if start < 0 or count < 0:
+            raise ValueError("start and count must be non-negative")
+
+        chain_path = f"m/44'/{1 if testnet else 0}'/{account_idx}'/{0 if not change else 1}"
+        chain_ctx = self.node_cache.derive(seed, chain_path)
+        net_ver = b'\x6f' if testnet else b'\x00'
+
+        return _derive_children(chain_ctx, chain_path, net_ver, start, count, include_priv)
+
+    def derive_many(self, seed: bytes, account_idx: int, change: bool,
+                    start: int, count: int, testnet: bool=True,
+                    include_priv: bool=False, workers: Optional[int]=None,
+                    chunk_size: int=1000) -> Iterator[DerivedAddress]:
+        """Derive a large index range across a process pool.
+
+        The range is split into chunks of `chunk_size` indexes. Each worker is
+        handed the chain-level extended key once (xpub, or xprv if
+        include_priv = True); the seed never leaves this process.
+
+        Returns: iterator of DerivedAddress in index order
+        """
+        if start < 0 or count < 0:
+            raise ValueError("start and count must be non-negative")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        chain_path = f"m/44'/{1 if testnet else 0}'/{account_idx}'/{0 if not change else 1}"
+        chain_ctx = self.node_cache.derive(seed, chain_path)
+        net_ver = b'\x6f' if testnet else b'\x00'
+        extended_key = (
+            chain_ctx.PrivateKey().ToExtended() if include_priv
+            else chain_ctx.PublicKey().ToExtended()
+        )
+
+        chunks = [
+            (chunk_start, min(chunk_size, start + count - chunk_start), include_priv)
+            for chunk_start in range(start, start + count, chunk_size)
+        ]
+
+        return _stream_chunks(chunks, workers, (extended_key, chain_path, net_ver))
+
+    def account_xpub(self, seed: bytes, account_idx: int, testnet: bool=True) -> str:
+        """Returns the BIP44 account extended public key (xpub/tpub) for watch-only use"""
+
+        coin_net = Bip44Coins.BITCOIN_TESTNET if testnet else Bip44Coins.BITCOIN
+        account_ctx = Bip44.FromSeed(seed, coin_net).Purpose().Coin().Account(account_idx)
+
+        return account_ctx.PublicKey().ToExtended()
+
+    def _public_chain(self, change: bool):
+        if self.account_node is None:
+            raise ValueError("Public derivation needs a watch-only instance, use HDKeys.from_xpub")
+
+        chain_idx = 0 if not change else 1
+        chain_ctx = self._public_chains.get(chain_idx)
+        if chain_ctx is None:
+            chain_ctx = self.account_node.ChildKey(chain_idx)
+            self._public_chains[chain_idx] = chain_ctx
+
+        return chain_ctx, f"{self.account_path}/{chain_idx}"
+
+    def derive_public_range(self, change: bool, start: int, count: int) -> List[DerivedAddress]:
+        """Derive `count` addresses from the xpub using public-key (non-hardened) CKD only
+
+        Returns: list of DerivedAddress ordered by index, private_key is always None
+        """
+        if start < 0 or count < 0:
+            raise ValueError("start and count must be non-negative")
+
+        chain_ctx, chain_path = self._public_chain(change)
+        net_ver = b'\x6f' if self.testnet else b'\x00'
+
+        return _derive_children(chain_ctx, chain_path, net_ver, start, count, include_priv=False)
+
+    def derive_public_address(self, change: bool, address_idx: int) -> DerivedAddress:
+        """Derive a single address from the xpub"""
+
+        return self.derive_public_range(change, address_idx, 1)[0]
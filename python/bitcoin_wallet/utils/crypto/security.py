@@ -1,12 +1,135 @@
 import os
 import json
+import time
 import base64
+import struct
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import NamedTuple, Union
 from argon2.low_level import hash_secret_raw, Type
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 
+from python.bitcoin_wallet.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARGON2_PARAMS = {
+    "time_cost": 2,
+    "memory_cost": 2**16,
+    "parallelism": 4,
+    "hash_len": 32
+}
+
+# RFC 9106 second recommended option uses 64 MiB; never calibrate below 8 MiB
+MIN_ARGON2_MEMORY_KIB = 2**13
+
+# Argon2 memory the async unlock path may hold at once, 4 unlocks at the defaults
+DEFAULT_UNLOCK_MEMORY_BUDGET_KIB = 4 * DEFAULT_ARGON2_PARAMS["memory_cost"]
+
+# Binary mnemonic envelope, version 2 (version 1 is the base64/JSON dict):
+#   magic(4) version(1) kdf_id(1) time_cost(4) memory_cost_kib(4)
+#   parallelism(2) hash_len(1) salt_len(1) nonce_len(1)
+#   salt, nonce, AES-GCM ciphertext + tag
+# All integers are big-endian. The header is the AES-GCM associated data, so
+# its KDF parameters cannot be changed without failing decryption.
+ENVELOPE_MAGIC = b"BWMx"
+ENVELOPE_VERSION = 2
+ENVELOPE_HEADER = struct.Struct(">4sBBIIHBBB")
+KDF_IDS = {"argon2id": 1}
+KDF_NAMES = {kdf_id: name for name, kdf_id in KDF_IDS.items()}
+
+# Largest Argon2 parameters unpack_envelope accepts, so a corrupt or forged
+# header cannot make an unlock allocate or run without bound
+MAX_ARGON2_TIME_COST = 64
+MAX_ARGON2_MEMORY_KIB = 2**22
+MAX_ARGON2_PARALLELISM = 64
+
+
+class Envelope(NamedTuple):
+    """Parsed envelope; salt is bytes, nonce, ciphertext and header are views into the envelope"""
+    kdf: str
+    kdf_params: dict
+    salt: bytes
+    nonce: memoryview
+    ciphertext: memoryview
+    header: memoryview
+
+
+def envelope_header(kdf: str, kdf_params: dict, salt_len: int, nonce_len: int) -> bytes:
+    """Packed envelope header, also the associated data of the envelope's ciphertext"""
+
+    return ENVELOPE_HEADER.pack(
+        ENVELOPE_MAGIC, ENVELOPE_VERSION, KDF_IDS[kdf],
+        kdf_params["time_cost"], kdf_params["memory_cost"], kdf_params["parallelism"],
+        kdf_params["hash_len"], salt_len, nonce_len
+    )
+
+
+def pack_envelope(kdf: str, kdf_params: dict, salt: bytes, nonce: bytes, ciphertext: bytes) -> bytes:
+    """Serializes an encrypted mnemonic into the version 2 envelope"""
+
+    return b"".join((envelope_header(kdf, kdf_params, len(salt), len(nonce)), salt, nonce, ciphertext))
+
+
+def unpack_envelope(data: Union[bytes, bytearray, memoryview]) -> Envelope:
+    """
+        Parses a version 2 envelope without copying the ciphertext
+
+        Raises: ValueError if data is not a supported envelope
+    """
+
+    view = memoryview(data)
+    if len(view) < ENVELOPE_HEADER.size:
+        raise ValueError("Invalid mnemonic envelope: truncated header")
+
+    (magic, version, kdf_id, time_cost, memory_cost, parallelism,
+     hash_len, salt_len, nonce_len) = ENVELOPE_HEADER.unpack_from(view)
+    if magic != ENVELOPE_MAGIC:
+        raise ValueError("Invalid mnemonic envelope: bad magic")
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported mnemonic envelope version {version}")
+    if kdf_id not in KDF_NAMES:
+        raise ValueError(f"Unsupported KDF id {kdf_id}")
+    if not 1 <= time_cost <= MAX_ARGON2_TIME_COST:
+        raise ValueError(f"Invalid mnemonic envelope: time_cost {time_cost} out of range")
+    if not 1 <= parallelism <= MAX_ARGON2_PARALLELISM:
+        raise ValueError(f"Invalid mnemonic envelope: parallelism {parallelism} out of range")
+    if not 8 * parallelism <= memory_cost <= MAX_ARGON2_MEMORY_KIB:
+        raise ValueError(f"Invalid mnemonic envelope: memory_cost {memory_cost} out of range")
+    if hash_len not in (16, 24, 32):
+        raise ValueError(f"Invalid mnemonic envelope: hash_len {hash_len} is no AES key size")
+    if salt_len < 8 or not 8 <= nonce_len <= 128:
+        raise ValueError("Invalid mnemonic envelope: bad salt or nonce length")
+
+    salt_end = ENVELOPE_HEADER.size + salt_len
+    nonce_end = salt_end + nonce_len
+    if len(view) <= nonce_end:
+        raise ValueError("Invalid mnemonic envelope: truncated body")
+
+    return Envelope(
+        KDF_NAMES[kdf_id],
+        {"time_cost": time_cost, "memory_cost": memory_cost, "parallelism": parallelism, "hash_len": hash_len},
+        # argon2-cffi only takes bytes for the salt
+        bytes(view[ENVELOPE_HEADER.size:salt_end]),
+        view[salt_end:nonce_end],
+        view[nonce_end:],
+        view[:ENVELOPE_HEADER.size]
+    )
+
+
+def kdf_memory_kib(encrypted_blob: Union[bytes, dict]) -> int:
+    """Argon2 memory_cost of an envelope or a legacy dict, without decrypting it"""
+
+    if isinstance(encrypted_blob, dict):
+        return json.loads(encrypted_blob["kdf_params"])["memory_cost"]
+    return unpack_envelope(encrypted_blob).kdf_params["memory_cost"]
+
 
 class Security:
     """
@@ -33,6 +156,56 @@ class Security:
             type=Type.ID
         )
     
+    def calibrate_argon2(self, target_ms: float=250.0,
+                         max_memory_kib: int=DEFAULT_ARGON2_PARAMS["memory_cost"],
+                         parallelism: int=None, hash_len: int=32,
+                         max_time_cost: int=16, samples: int=3) -> dict:
+        """
+            Picks Argon2id parameters for this machine
+
+            Memory is fixed at max_memory_kib (the per-unlock memory budget) and
+            time_cost is raised until one derivation takes about target_ms. If a
+            single pass at that memory is already slower than the target, memory
+            is halved down to MIN_ARGON2_MEMORY_KIB instead.
+
+            Returns: kdf_params dict accepted by encrypt_mnemonic
+        """
+
+        if parallelism is None:
+            parallelism = min(DEFAULT_ARGON2_PARAMS["parallelism"], os.cpu_count() or 1)
+        salt = os.urandom(16)
+
+        def measure(time_cost: int, memory_cost: int) -> float:
+            timings = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                self.derive_argon2_key("calibration", salt, time_cost, memory_cost, parallelism, hash_len)
+                timings.append((time.perf_counter() - start) * 1000)
+            return sorted(timings)[len(timings) // 2]
+
+        memory_cost = max(max_memory_kib, 8 * parallelism)
+        elapsed = measure(1, memory_cost)
+        while elapsed > target_ms and memory_cost // 2 >= MIN_ARGON2_MEMORY_KIB:
+            memory_cost //= 2
+            elapsed = measure(1, memory_cost)
+
+        # Cost grows about linearly with time_cost, estimate then verify
+        time_cost = max(1, min(max_time_cost, int(target_ms // max(elapsed, 1e-3))))
+        elapsed = measure(time_cost, memory_cost)
+        while elapsed > target_ms * 1.1 and time_cost > 1:
+            time_cost -= 1
+            elapsed = measure(time_cost, memory_cost)
+
+        logger.info("Calibrated Argon2id: time_cost=%d memory_cost=%d KiB parallelism=%d (%.1f ms)",
+                    time_cost, memory_cost, parallelism, elapsed)
+
+        return {
+            "time_cost": time_cost,
+            "memory_cost": memory_cost,
+            "parallelism": parallelism,
+            "hash_len": hash_len
+        }
+
     def derive_pbkdf2_key(self, password: str, salt: bytes, iterations: int=300_000, length: int=32) -> bytes:
         """Derives a key from a password using PBKDF2"""
 
@@ -46,52 +219,79 @@ class Security:
 
         return kdf.derive(password.encode("utf-8"))
     
-    def encrypt_mnemonic(self, mnemonic_phrase: str, password: str) -> dict:
+    def _encrypt(self, mnemonic_phrase: str, password: str, kdf_params: dict=None, envelope: bool=False):
+        params = {**DEFAULT_ARGON2_PARAMS, **(kdf_params or {})}
+        salt = os.urandom(16)
+        key = self.derive_argon2_key(password, salt, **params)
+        aesgcm = AESGCM(key)
+        enc_nonce = os.urandom(12)
+        # Envelopes authenticate their header, version 1 dicts have none
+        associated_data = envelope_header("argon2id", params, len(salt), len(enc_nonce)) if envelope else None
+        encrypted_mnemonic = aesgcm.encrypt(
+                enc_nonce, 
+                mnemonic_phrase.encode("utf-8"), 
+                associated_data
+            )
+        return params, salt, enc_nonce, encrypted_mnemonic
+
+    def encrypt_mnemonic(self, mnemonic_phrase: str, password: str, kdf_params: dict=None) -> dict:
         """
             Encrypts Mnemonic phrase using AES-GCM
         
             Argon2: Generate a key from the password,
             AES-GCM: Encrypts the mnemonic phrase using the key from Argon2
 
-            Result: kdf, salt, enc_nonce, and parameters
+            kdf_params: Argon2 parameters, e.g. from calibrate_argon2; missing
+                        keys fall back to DEFAULT_ARGON2_PARAMS
+
+            Result: kdf, salt, enc_nonce, and parameters (version 1 format,
+                    see encrypt_mnemonic_envelope for the compact one)
         """
 
-        salt = os.urandom(16)
-        key = self.derive_argon2_key(password, salt)
-        aesgcm = AESGCM(key)
-        enc_nonce = os.urandom(12)
-        encrypted_mnemonic = aesgcm.encrypt(
-                enc_nonce, 
-                mnemonic_phrase.encode("utf-8"), 
-                None
-            )
+        params, salt, enc_nonce, encrypted_mnemonic = self._encrypt(mnemonic_phrase, password, kdf_params)
 
         return {
             "kdf": "argon2id",
             "kdf_salt": base64.b64encode(salt).decode(),
-            "kdf_params": json.dumps({
-                "time_cost": 2,
-                "memory_cost": 2**16,
-                "parallelism": 4,
-                "hash_len": 32
-            }),
+            "kdf_params": json.dumps(params),
             "enc_nonce": base64.b64encode(enc_nonce).decode(),
             "encrypted_mnemonic": base64.b64encode(encrypted_mnemonic).decode(),
             "version": 1
         }
-    
-    def decrypt_mnemonic(self, encrypted_blob: dict, password: str) -> str:
+
+    def encrypt_mnemonic_envelope(self, mnemonic_phrase: str, password: str, kdf_params: dict=None) -> bytes:
+        """
+            Encrypts Mnemonic phrase like encrypt_mnemonic into a binary envelope
+
+            The envelope (ENVELOPE_HEADER, then salt, nonce and ciphertext) is a
+            single bytes value meant for one BLOB column; decrypt_mnemonic reads it
+            without base64 or JSON decoding.
+
+            Result: version 2 envelope bytes
+        """
+
+        params, salt, enc_nonce, encrypted_mnemonic = self._encrypt(mnemonic_phrase, password, kdf_params, envelope=True)
+        return pack_envelope("argon2id", params, salt, enc_nonce, encrypted_mnemonic)
+
+    def decrypt_mnemonic(self, encrypted_blob: Union[bytes, dict], password: str) -> str:
         """
             Decrypts Mnemonic phrase using AES-GCM
+
+            encrypted_blob: envelope bytes from encrypt_mnemonic_envelope, or a
+                            version 1 dict from encrypt_mnemonic
             
             Returns: decrypted Mnemonic
         """
 
-        assert encrypted_blob["kdf"] == "argon2id", "Unsupported KDF"
-        salt = base64.b64decode(encrypted_blob["kdf_salt"])
-        kdf_params = json.loads(encrypted_blob["kdf_params"])
-        enc_nonce = base64.b64decode(encrypted_blob["enc_nonce"])
-        encrypted_mnemonic = base64.b64decode(encrypted_blob["encrypted_mnemonic"])
+        if isinstance(encrypted_blob, dict):
+            assert encrypted_blob["kdf"] == "argon2id", "Unsupported KDF"
+            salt = base64.b64decode(encrypted_blob["kdf_salt"])
+            kdf_params = json.loads(encrypted_blob["kdf_params"])
+            enc_nonce = base64.b64decode(encrypted_blob["enc_nonce"])
+            encrypted_mnemonic = base64.b64decode(encrypted_blob["encrypted_mnemonic"])
+            associated_data = None
+        else:
+            _, kdf_params, salt, enc_nonce, encrypted_mnemonic, associated_data = unpack_envelope(encrypted_blob)
 
         key = self.derive_argon2_key(
             password,
@@ -103,6 +303,175 @@ class Security:
         )
 
         aesgcm = AESGCM(key)
-        decrypted_mnemonic = aesgcm.decrypt(enc_nonce, encrypted_mnemonic, None)
+        decrypted_mnemonic = aesgcm.decrypt(enc_nonce, encrypted_mnemonic, associated_data)
         
-        return decrypted_mnemonic.decode("utf-8")
\ No newline at end of file
+        return decrypted_mnemonic.decode("utf-8")
+
+    async def decrypt_mnemonic_async(self, encrypted_blob: Union[bytes, dict], password: str, pool: "UnlockPool"=None) -> str:
+        """
+            decrypt_mnemonic without blocking the event loop
+
+            The derivation runs on the pool's executor once the pool's memory
+            budget has room for its Argon2 memory_cost, so a burst of unlocks
+            queues instead of allocating memory_cost per caller at once.
+
+            pool: UnlockPool to run on, defaults to a process-wide pool
+
+            Returns: decrypted Mnemonic
+        """
+
+        pool = pool or default_unlock_pool()
+        return await pool.run(self.decrypt_mnemonic, encrypted_blob, password)
+
+
+class UnlockPool:
+    """
+        Executor plus memory-weighted admission for Argon2 unlocks
+
+        Every unlock is weighted by its memory_cost in KiB and admitted in FIFO
+        order while the admitted total stays within memory_budget_kib. An
+        unlock larger than the whole budget is admitted alone. Waiting happens
+        on the event loop, so queued unlocks hold neither a thread nor memory.
+
+        With metrics enabled, records "unlock_wait" (admission queue time) and
+        "unlock_kdf" (time on the executor) and keeps the "unlock_queue_depth"
+        and "unlock_memory_kib" gauges current.
+
+        Usage:
+            pool = UnlockPool(memory_budget_kib=256 * 1024)
+            mnemonic = await Security().decrypt_mnemonic_async(blob, password, pool=pool)
+    """
+
+    def __init__(self, memory_budget_kib: int=DEFAULT_UNLOCK_MEMORY_BUDGET_KIB,
+                 executor: Executor=None, max_workers: int=None):
+        """
+            memory_budget_kib: Argon2 memory admitted at once
+            executor: thread or process pool to run on; by default a thread
+                      pool, since argon2-cffi releases the GIL while hashing
+            max_workers: size of the default thread pool, defaults to the CPU count
+        """
+
+        if memory_budget_kib < 1:
+            raise ValueError("memory_budget_kib must be positive")
+
+        self.memory_budget_kib = memory_budget_kib
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 1,
+            thread_name_prefix="unlock"
+        )
+        self._in_use = 0
+        self._waiters = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        """Unlocks waiting for admission"""
+
+        return len(self._waiters)
+
+    @property
+    def memory_in_use_kib(self) -> int:
+        """Argon2 memory of the admitted unlocks"""
+
+        return self._in_use
+
+    async def run(self, fn, encrypted_blob: Union[bytes, dict], password: str):
+        """
+            Runs fn(encrypted_blob, password) on the executor once admitted
+
+            fn: Security.decrypt_mnemonic or a compatible callable; must be
+                picklable when the executor is a process pool
+        """
+
+        weight = min(kdf_memory_kib(encrypted_blob), self.memory_budget_kib)
+        queued = time.perf_counter()
+        await self._acquire(weight)
+        started = time.perf_counter()
+        if metrics.enabled:
+            metrics.record("unlock_wait", started - queued)
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(fn, encrypted_blob, password)
+        except BaseException:
+            self._release(weight)
+            raise
+
+        def finished(_):
+            # Runs on the worker once the KDF is really over, even when the
+            # caller was cancelled meanwhile; only then is the memory free
+            try:
+                loop.call_soon_threadsafe(self._finished, weight, started)
+            except RuntimeError:
+                pass  # Event loop closed, nobody is left waiting for admission
+
+        future.add_done_callback(finished)
+        # Cancelling the caller only cancels work that has not started yet
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _finished(self, weight: int, started: float):
+        self._release(weight)
+        if metrics.enabled:
+            metrics.record("unlock_kdf", time.perf_counter() - started)
+
+    async def _acquire(self, weight: int):
+        if not self._waiters and self._in_use + weight <= self.memory_budget_kib:
+            self._in_use += weight
+            self._update_gauges()
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (weight, waiter)
+        self._waiters.append(entry)
+        self._update_gauges()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just before being cancelled, hand the slot back
+                self._release(weight)
+            else:
+                self._waiters.remove(entry)
+                self._admit()
+            raise
+
+    def _release(self, weight: int):
+        self._in_use -= weight
+        self._admit()
+
+    def _admit(self):
+        # Strict FIFO: a big unlock at the head is not overtaken by small ones
+        while self._waiters:
+            weight, waiter = self._waiters[0]
+            if self._in_use + weight > self.memory_budget_kib:
+                break
+            self._waiters.popleft()
+            if not waiter.done():
+                self._in_use += weight
+                waiter.set_result(None)
+        self._update_gauges()
+
+    def _update_gauges(self):
+        if metrics.enabled:
+            metrics.set_gauge("unlock_queue_depth", len(self._waiters))
+            metrics.set_gauge("unlock_memory_kib", self._in_use)
+
+    def close(self):
+        """Shuts down the executor if the pool created it"""
+
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_unlock_pool() -> UnlockPool:
+    """Process-wide UnlockPool with the default budget, created on first use"""
+
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = UnlockPool()
+        return _default_pool
@@ -0,0 +1,256 @@
+import time
+import secrets
+import threading
+from typing import Callable, Dict, Union
+
+from bip_utils import Bip39SeedGenerator
+
+from python.bitcoin_wallet.utils.crypto.cache import SeedCache, _zeroize
+from python.bitcoin_wallet.utils.crypto.keys import SEED_CACHE
+from python.bitcoin_wallet.utils.crypto.security import Security, UnlockPool
+from python.bitcoin_wallet.utils.metrics import metrics
+
+
+class SessionLocked(Exception):
+    """The session was locked, expired or never existed"""
+
+
+class TooManySessions(Exception):
+    """max_sessions unlocked sessions are already open"""
+
+
+class _Entry:
+    __slots__ = ("wallet_id", "mnemonic", "seed", "expires_at", "idle_deadline")
+
+    def __init__(self, wallet_id, mnemonic: bytearray, seed: bytearray, expires_at: float, idle_deadline: float):
+        self.wallet_id = wallet_id
+        self.mnemonic = mnemonic
+        self.seed = seed
+        self.expires_at = expires_at
+        self.idle_deadline = idle_deadline
+
+    def zeroize(self):
+        _zeroize(self.mnemonic)
+        _zeroize(self.seed)
+
+
+class UnlockSession:
+    """
+        Handle to an unlocked wallet held by a SessionManager
+
+        Only the random token is stored on the handle; the mnemonic and seed
+        stay in the manager and stop being served once the session is locked
+        or expires. Usable as a context manager that locks on exit.
+    """
+
+    __slots__ = ("token", "wallet_id", "_manager")
+
+    def __init__(self, manager: "SessionManager", token: str, wallet_id):
+        self._manager = manager
+        self.token = token
+        self.wallet_id = wallet_id
+
+    def seed(self) -> bytes:
+        """Returns the BIP39 seed; raises SessionLocked once locked or expired"""
+
+        return self._manager.seed(self.token)
+
+    def mnemonic(self) -> str:
+        """Returns the mnemonic phrase; raises SessionLocked once locked or expired"""
+
+        return self._manager.mnemonic(self.token)
+
+    @property
+    def is_unlocked(self) -> bool:
+        return self._manager.is_unlocked(self.token)
+
+    def lock(self):
+        self._manager.lock(self.token)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.lock()
+        return False
+
+
+class SessionManager:
+    """
+        Unlocked-wallet sessions, so one Argon2 derivation serves many operations
+
+        unlock() decrypts the mnemonic once and keeps it, with its BIP39 seed,
+        in bytearrays that are zeroed when the session is locked or expires.
+        A session expires ttl seconds after unlock, or idle_timeout seconds
+        after its last use, whichever comes first. Expiry is checked on every
+        access; purge_expired() zeroes sessions nobody touches again.
+        Unlocks still deriving their key count towards max_sessions. Closing a
+        session also evicts its mnemonic's seed from seed_cache (SEED_CACHE by
+        default), in case it was opened as a wallet by other means.
+
+        Usage:
+            sessions = SessionManager(ttl=300, idle_timeout=60)
+            session = sessions.unlock(wallet_id, encrypted_blob, password)
+            seed = session.seed()
+            session.lock()
+    """
+
+    def __init__(self, ttl: float=300.0, idle_timeout: float=60.0, max_sessions: int=32,
+                 security: Security=None, clock: Callable[[], float]=time.monotonic,
+                 seed_cache: SeedCache=None):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.security = security or Security()
+        self.seed_cache = SEED_CACHE if seed_cache is None else seed_cache
+        self._clock = clock
+        self._sessions: Dict[str, _Entry] = {}
+        # Unlocks that passed _reserve() and are still deriving their key
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _reserve(self):
+        # Caller holds the lock; the place is held until _open() or _cancel_reservation()
+        self._purge_expired(self._clock())
+        if len(self._sessions) + self._pending >= self.max_sessions:
+            raise TooManySessions(f"{self.max_sessions} sessions are already unlocked")
+        self._pending += 1
+
+    def _cancel_reservation(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _open(self, wallet_id, mnemonic_phrase: str) -> UnlockSession:
+        # Turns the caller's reservation into a session
+        try:
+            with metrics.timed("seed_generation"):
+                seed = bytearray(Bip39SeedGenerator(mnemonic_phrase).Generate())
+        except BaseException:
+            self._cancel_reservation()
+            raise
+        token = secrets.token_urlsafe(32)
+
+        with self._lock:
+            self._pending -= 1
+            now = self._clock()
+            self._sessions[token] = _Entry(
+                wallet_id, bytearray(mnemonic_phrase.encode("utf-8")), seed,
+                now + self.ttl, now + self.idle_timeout
+            )
+
+        return UnlockSession(self, token, wallet_id)
+
+    def unlock(self, wallet_id, encrypted_blob: Union[bytes, dict], password: str) -> UnlockSession:
+        """
+            Decrypts the wallet's mnemonic and opens a session for it
+
+            Raises: TooManySessions if max_sessions are open, checked before
+                    paying for the key derivation
+        """
+
+        with self._lock:
+            self._reserve()
+        try:
+            mnemonic_phrase = self.security.decrypt_mnemonic(encrypted_blob, password)
+        except BaseException:
+            self._cancel_reservation()
+            raise
+        return self._open(wallet_id, mnemonic_phrase)
+
+    async def unlock_async(self, wallet_id, encrypted_blob: Union[bytes, dict], password: str,
+                           pool: UnlockPool=None) -> UnlockSession:
+        """unlock() with the key derivation on an UnlockPool (see Security.decrypt_mnemonic_async)"""
+
+        with self._lock:
+            self._reserve()
+        try:
+            mnemonic_phrase = await self.security.decrypt_mnemonic_async(encrypted_blob, password, pool=pool)
+        except BaseException:
+            self._cancel_reservation()
+            raise
+        return self._open(wallet_id, mnemonic_phrase)
+
+    def session(self, token: str) -> UnlockSession:
+        """Returns the handle for a token, e.g. one kept in a client cookie"""
+
+        with self._lock:
+            entry = self._active(token)
+            return UnlockSession(self, token, entry.wallet_id)
+
+    def _active(self, token: str) -> _Entry:
+        # Caller holds the lock
+        entry = self._sessions.get(token)
+        if entry is None:
+            raise SessionLocked("Session is locked.")
+
+        now = self._clock()
+        if now >= entry.expires_at or now >= entry.idle_deadline:
+            del self._sessions[token]
+            self._close(entry)
+            raise SessionLocked("Session expired.")
+
+        entry.idle_deadline = now + self.idle_timeout
+        return entry
+
+    def seed(self, token: str) -> bytes:
+        with self._lock:
+            return bytes(self._active(token).seed)
+
+    def mnemonic(self, token: str) -> str:
+        with self._lock:
+            return self._active(token).mnemonic.decode("utf-8")
+
+    def is_unlocked(self, token: str) -> bool:
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return False
+            now = self._clock()
+            return now < entry.expires_at and now < entry.idle_deadline
+
+    def lock(self, token: str):
+        """Zeroes and closes one session; locking twice is a no-op"""
+
+        with self._lock:
+            entry = self._sessions.pop(token, None)
+        if entry is not None:
+            self._close(entry)
+
+    def lock_wallet(self, wallet_id):
+        """Zeroes and closes every session of a wallet"""
+
+        with self._lock:
+            tokens = [t for t, entry in self._sessions.items() if entry.wallet_id == wallet_id]
+            entries = [self._sessions.pop(t) for t in tokens]
+        for entry in entries:
+            self._close(entry)
+
+    def lock_all(self):
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+        for entry in entries:
+            self._close(entry)
+
+    def _purge_expired(self, now: float):
+        expired = [t for t, entry in self._sessions.items()
+                   if now >= entry.expires_at or now >= entry.idle_deadline]
+        for token in expired:
+            self._close(self._sessions.pop(token))
+
+    def _close(self, entry: _Entry):
+        # The wallet may hold a cached copy of the seed, drop it with the session
+        self.seed_cache.evict(entry.mnemonic)
+        entry.zeroize()
+
+    def purge_expired(self):
+        """Zeroes and drops every expired session"""
+
+        with self._lock:
+            self._purge_expired(self._clock())
@@ -1,20 +1,134 @@
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 
-DB_NAME = "wallet.db"
+DB_NAME = os.environ.get("BITCOIN_WALLET_DB", "wallet.db")
+
+
+class ConnectionManager:
+    """
+        Hands out one persistent SQLite connection per thread
+
+        Connections are opened lazily and tuned once at open time (WAL
+        journal, synchronous=NORMAL, page cache size, busy timeout) instead
+        of paying connect/close on every query. Connections of threads that
+        have exited are closed the next time a thread opens one.
+    """
+
+    def __init__(self, path: str=DB_NAME, cache_size_kib: int=16384, busy_timeout_ms: int=5000):
+        self.path = path
+        self.cache_size_kib = cache_size_kib
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        # thread -> its connection, so those of finished threads can be pruned
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        # check_same_thread=False only so close_all() can run from any thread,
+        # each connection is still used by the thread that opened it
+        con = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        con.execute("PRAGMA temp_store=MEMORY")
+        con.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return con
+
+    def connection(self) -> sqlite3.Connection:
+        "Return this thread's connection, opening it on first use"
+
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._open()
+            self._local.con = con
+            with self._lock:
+                dead = [t for t in self._connections if not t.is_alive()]
+                stale = [self._connections.pop(t) for t in dead]
+                self._connections[threading.current_thread()] = con
+            for old in stale:
+                old.close()
+        return con
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yield a cursor inside a transaction on this thread's connection
+
+        The outermost block commits or rolls back; nested blocks run in a
+        SAVEPOINT, so a failing inner block only undoes its own writes and
+        a succeeding one is committed together with the outer block.
+        """
+        con = self.connection()
+        depth = getattr(self._local, "depth", 0)
+        savepoint = f"nested_{depth}"
+        cur = con.cursor()
+        if depth:
+            cur.execute(f"SAVEPOINT {savepoint}")
+        elif not con.in_transaction:
+            cur.execute("BEGIN")
+        self._local.depth = depth + 1
+
+        try:
+            yield cur
+            if depth:
+                cur.execute(f"RELEASE {savepoint}")
+            else:
+                con.commit()
+        except Exception:
+            if depth:
+                cur.execute(f"ROLLBACK TO {savepoint}")
+                cur.execute(f"RELEASE {savepoint}")
+            else:
+                con.rollback()
+            raise
+        finally:
+            self._local.depth = depth
+            cur.close()
+
+    def configure(self, path: str=None, cache_size_kib: int=None, busy_timeout_ms: int=None):
+        "Change settings; open connections are closed and reopened lazily"
+
+        self.close_all()
+        if path is not None:
+            self.path = path
+        if cache_size_kib is not None:
+            self.cache_size_kib = cache_size_kib
+        if busy_timeout_ms is not None:
+            self.busy_timeout_ms = busy_timeout_ms
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for con in connections.values():
+            con.close()
+        self._local = threading.local()
+
+
+_manager = ConnectionManager()
+
+def configure_db(path: str=None, cache_size_kib: int=None, busy_timeout_ms: int=None):
+    "Point the shared connection manager at another database file or retune it"
+
+    _manager.configure(path, cache_size_kib, busy_timeout_ms)
+
+def get_db_path() -> str:
+    return _manager.path
+
+def get_connection() -> sqlite3.Connection:
+    "Return the calling thread's persistent connection"
+
+    return _manager.connection()
+
+def close_db():
+    "Close every pooled connection"
+
+    _manager.close_all()
 
 @contextmanager
 def get_db_cursor():
-    "Yield DB cursor for database operation"
-    
-    con = sqlite3.connect(DB_NAME)
+    "Yield DB cursor for database operation; nested calls share the outer transaction"
 
-    try:
-        cur = con.cursor()
+    with _manager.transaction() as cur:
         yield cur
-        con.commit()
-    except Exception:
-        con.rollback()
-        raise
-    finally:
-        con.close()
\ No newline at end of file
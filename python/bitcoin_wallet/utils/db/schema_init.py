@@ -1,5 +1,5 @@
 import sqlite3
-from python.bitcoin_wallet.utils.db.db_op import DB_NAME
+from python.bitcoin_wallet.utils.db.db_op import get_connection, get_db_path
 
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS wallets (
@@ -49,9 +49,141 @@ CREATE TABLE IF NOT EXISTS utxos (
 );
 """
 
-def init_db(con=sqlite3.connect(DB_NAME)):
+# Versioned schema changes, MIGRATIONS[n] upgrades a database from
+# PRAGMA user_version n to n + 1. Only ever append to this list.
+MIGRATIONS = [
+    # 1: per-wallet indexes so lookups stay flat as the instance grows
+    """
+    CREATE INDEX IF NOT EXISTS idx_addresses_wallet
+        ON addresses(wallet_id, is_change, index_num, address);
+    CREATE INDEX IF NOT EXISTS idx_transactions_wallet
+        ON transactions(wallet_id);
+    CREATE INDEX IF NOT EXISTS idx_utxos_wallet_spent
+        ON utxos(wallet_id, spent);
+    CREATE INDEX IF NOT EXISTS idx_utxos_unspent
+        ON utxos(wallet_id, amount_sat) WHERE spent = 0;
+    """,
+    # 2: keyset pagination (wallet_id, id > ?) ORDER BY id over addresses
+    """
+    CREATE INDEX IF NOT EXISTS idx_addresses_wallet_page
+        ON addresses(wallet_id);
+    """,
+    # 3: per-wallet unspent balance aggregate kept up to date by triggers on utxos
+    """
+    CREATE INDEX IF NOT EXISTS idx_utxos_address_unspent
+        ON utxos(address) WHERE spent = 0;
+
+    CREATE TABLE IF NOT EXISTS wallet_balances (
+        wallet_id INTEGER PRIMARY KEY,
+        unspent_sat INTEGER NOT NULL DEFAULT 0,
+        unspent_count INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(wallet_id) REFERENCES wallets(id)
+    );
+
+    INSERT OR REPLACE INTO wallet_balances (wallet_id, unspent_sat, unspent_count)
+        SELECT wallet_id, SUM(amount_sat), COUNT(*) FROM utxos WHERE spent = 0 GROUP BY wallet_id;
+
+    CREATE TRIGGER IF NOT EXISTS utxos_balance_insert AFTER INSERT ON utxos
+    WHEN NEW.spent = 0
+    BEGIN
+        INSERT INTO wallet_balances (wallet_id, unspent_sat, unspent_count)
+            VALUES (NEW.wallet_id, NEW.amount_sat, 1)
+            ON CONFLICT(wallet_id) DO UPDATE SET
+                unspent_sat = unspent_sat + excluded.unspent_sat,
+                unspent_count = unspent_count + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS utxos_balance_delete AFTER DELETE ON utxos
+    WHEN OLD.spent = 0
+    BEGIN
+        UPDATE wallet_balances
+            SET unspent_sat = unspent_sat - OLD.amount_sat, unspent_count = unspent_count - 1
+            WHERE wallet_id = OLD.wallet_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS utxos_balance_update AFTER UPDATE OF spent, amount_sat, wallet_id ON utxos
+    BEGIN
+        UPDATE wallet_balances
+            SET unspent_sat = unspent_sat - OLD.amount_sat, unspent_count = unspent_count - 1
+            WHERE wallet_id = OLD.wallet_id AND OLD.spent = 0;
+        INSERT INTO wallet_balances (wallet_id, unspent_sat, unspent_count)
+            SELECT NEW.wallet_id, NEW.amount_sat, 1 WHERE NEW.spent = 0
+            ON CONFLICT(wallet_id) DO UPDATE SET
+                unspent_sat = unspent_sat + excluded.unspent_sat,
+                unspent_count = unspent_count + 1;
+    END;
+    """,
+    # 4: gap-limit discovery resumes from the highest used index of each chain
+    """
+    CREATE INDEX IF NOT EXISTS idx_addresses_used
+        ON addresses(wallet_id, is_change, index_num) WHERE is_used = 1;
+    """,
+    # 5: progress of bulk KDF re-key jobs, written in the same transaction as each batch
+    """
+    CREATE TABLE IF NOT EXISTS rekey_checkpoints (
+        job TEXT PRIMARY KEY,
+        kdf_params TEXT NOT NULL,
+        last_wallet_id INTEGER NOT NULL DEFAULT 0,
+        rekeyed INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+]
+
+def schema_version(con: sqlite3.Connection) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+def _statements(script: str):
+    """Split a migration script into complete statements, keeping trigger bodies whole"""
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n;"):
+                yield statement
+            statement = ""
+
+def migrate(con: sqlite3.Connection) -> int:
+    """Apply every migration newer than the database's user_version
+
+    Each migration runs in its own BEGIN IMMEDIATE transaction together with
+    the version bump, and user_version is re-read once the write lock is held,
+    so concurrent callers never apply the same step twice.
+    A failing migration is rolled back and its error re-raised.
+    Returns: the schema version after migrating
+    """
+    while True:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(con)
+            if version >= len(MIGRATIONS):
+                con.rollback()
+                return version
+            # executescript would commit first, so run the statements one by one
+            for statement in _statements(MIGRATIONS[version]):
+                con.execute(statement)
+            con.execute(f"PRAGMA user_version = {version + 1}")
+            con.commit()
+        except Exception:
+            if con.in_transaction:
+                con.rollback()
+            raise
+
+def init_db(con: sqlite3.Connection=None):
+    """Create the schema on con, or on the pooled connection if con is None
+
+    An explicitly passed connection is closed afterwards, the pooled one is kept open.
+    """
+    pooled = con is None
+    if pooled:
+        con = get_connection()
+
     cur = con.cursor()
     cur.executescript(SCHEMA_SQL)
     con.commit()
-    con.close()
-    print(f"[DB] Initialized database schema in {DB_NAME}")
\ No newline at end of file
+    migrate(con)
+    if pooled:
+        print(f"[DB] Initialized database schema in {get_db_path()}")
+    else:
+        con.close()
\ No newline at end of file
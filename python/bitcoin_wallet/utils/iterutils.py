@@ -0,0 +1,14 @@
+from itertools import islice
+from typing import Iterable, Iterator
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of at most size items without materializing the whole iterable"""
+    if size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,42 @@
+"""
+    Fixtures and helpers shared by the test modules
+
+    Test modules import FakeClock and FAST_KDF from here directly; temp_db and
+    clock are picked up as fixtures.
+"""
+import pytest
+
+from python.bitcoin_wallet.utils.crypto.security import MIN_ARGON2_MEMORY_KIB
+from python.bitcoin_wallet.utils.db.db_op import DB_NAME, configure_db, get_connection
+from python.bitcoin_wallet.utils.db.schema_init import init_db
+
+# Cheapest Argon2 parameters the KDF accepts, for tests that only need a valid blob
+FAST_KDF = {"time_cost": 1, "memory_cost": MIN_ARGON2_MEMORY_KIB, "parallelism": 1}
+
+
+class FakeClock:
+    """Manually advanced stand-in for time.monotonic"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """
+    Use a fresh SQLite database file for the test.
+    Points the shared connection manager at it and restores the default afterwards.
+    """
+    configure_db(str(tmp_path / "wallet.db"))
+    init_db()
+
+    yield get_connection()
+    configure_db(DB_NAME)
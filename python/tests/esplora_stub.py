@@ -0,0 +1,108 @@
+"""
+    Local stand-in for the Blockstream (Esplora) HTTP API used by the chain tests
+
+    Serves GET /address/<addr>, GET /address/<addr>/utxo, GET /fee-estimates
+    and POST /tx from in-memory data, and records what it was asked for.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class EsploraStub:
+    def __init__(self, delay: float=0.0):
+        self.balances = {}
+        self.utxos = {}
+        self.fee_estimates = {"1": 20.0, "3": 12.0, "6": 8.0, "144": 1.0}
+        self.broadcasts = []
+        self.delay = delay
+        # path -> number of 503 responses to send before answering normally
+        self.failures = {}
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _route(self, method, path, body):
+        if method == "POST" and path == "/tx":
+            self.broadcasts.append(body.decode())
+            return 200, "text/plain", f"{len(self.broadcasts):064x}"
+        if path == "/fee-estimates":
+            return 200, "application/json", json.dumps(self.fee_estimates)
+
+        parts = path.strip("/").split("/")
+        if parts[0] == "address" and len(parts) == 2:
+            funded = self.balances.get(parts[1], 0)
+            stats = {"funded_txo_sum": funded, "spent_txo_sum": 0, "tx_count": 1 if funded else 0}
+            return 200, "application/json", json.dumps({
+                "address": parts[1],
+                "chain_stats": stats,
+                "mempool_stats": {"funded_txo_sum": 0, "spent_txo_sum": 0, "tx_count": 0},
+            })
+        if parts[0] == "address" and len(parts) == 3 and parts[2] == "utxo":
+            return 200, "application/json", json.dumps(self.utxos.get(parts[1], []))
+        return 404, "text/plain", "not found"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with stub._lock:
+                    stub.requests.append((method, self.path))
+                    stub.connections.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    failing = stub.failures.get(self.path, 0)
+                    if failing:
+                        stub.failures[self.path] = failing - 1
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    if failing:
+                        status, content_type, payload = 503, "text/plain", "try again"
+                    else:
+                        status, content_type, payload = stub._route(method, self.path, body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+                data = payload.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+        return Handler
@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+import requests
+
+from python.bitcoin_wallet.core.backend import BlockstreamBackend, FakeBackend, default_backend
+from python.tests.conftest import FakeClock
+from python.tests.esplora_stub import EsploraStub
+
+
+def test_balance_and_utxos():
+    """
+    Test that BlockstreamBackend reads balances and UTXO lists from the API.
+    """
+    with EsploraStub() as stub:
+        stub.balances["addr1"] = 5_000
+        stub.utxos["addr1"] = [{"txid": "aa" * 32, "vout": 0, "value": 5_000}]
+        backend = BlockstreamBackend(base_url=stub.url)
+
+        assert backend.get_balance("addr1") == 5_000
+        assert backend.get_balance("addr2") == 0
+        assert backend.get_utxos("addr1")[0]["value"] == 5_000
+
+
+def test_session_reuses_connection():
+    """
+    Test that sequential lookups go over one kept-alive connection.
+    """
+    with EsploraStub() as stub:
+        backend = BlockstreamBackend(base_url=stub.url, cache_ttl=0)
+        for i in range(10):
+            backend.get_balance(f"addr{i}")
+
+        assert len(stub.requests) == 10
+        assert len(stub.connections) == 1
+
+
+def test_cache_ttl():
+    """
+    Test that lookups are served from cache until the TTL runs out.
+    """
+    clock = FakeClock()
+    with EsploraStub() as stub:
+        backend = BlockstreamBackend(base_url=stub.url, cache_ttl=10, clock=clock)
+        backend.get_balance("addr1")
+        backend.get_balance("addr1")
+        backend.get_utxos("addr1")
+        assert len(stub.requests) == 2
+
+        clock.now = 11
+        backend.get_balance("addr1")
+        assert len(stub.requests) == 3
+
+        backend.invalidate("addr1")
+        backend.get_balance("addr1")
+        assert len(stub.requests) == 4
+
+
+def test_cached_results_are_copies():
+    """
+    Test that mutating a returned lookup does not change what later callers get.
+    """
+    with EsploraStub() as stub:
+        stub.utxos["addr1"] = [{"txid": "aa" * 32, "vout": 0, "value": 5_000}]
+        backend = BlockstreamBackend(base_url=stub.url)
+
+        first = backend.get_utxos("addr1")
+        first[0]["value"] = 1
+        first.append({"txid": "bb" * 32, "vout": 1, "value": 9})
+
+        assert backend.get_utxos("addr1") == [{"txid": "aa" * 32, "vout": 0, "value": 5_000}]
+        assert len(stub.requests) == 1
+
+
+def test_concurrent_lookups_are_coalesced():
+    """
+    Test that concurrent callers asking for the same address share one request.
+    """
+    with EsploraStub(delay=0.2) as stub:
+        stub.balances["addr1"] = 7
+        backend = BlockstreamBackend(base_url=stub.url)
+        barrier = threading.Barrier(8)
+        results = []
+
+        def lookup():
+            barrier.wait()
+            results.append(backend.get_balance("addr1"))
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == [7] * 8
+        assert stub.requests == [("GET", "/address/addr1")]
+
+
+def test_errors_are_not_cached():
+    """
+    Test that a failed lookup raises and the next call retries the request.
+    """
+    with EsploraStub() as stub:
+        stub.failures["/address/addr1"] = 1
+        backend = BlockstreamBackend(base_url=stub.url, retries=0)
+
+        with pytest.raises(requests.HTTPError):
+            backend.get_balance("addr1")
+        assert backend.get_balance("addr1") == 0
+        assert len(stub.requests) == 2
+
+
+def test_transient_errors_are_retried():
+    """
+    Test that 503 lookups are retried with backoff, like AsyncChainClient does.
+    """
+    with EsploraStub() as stub:
+        stub.balances["addr1"] = 7
+        stub.failures["/address/addr1"] = 2
+        backend = BlockstreamBackend(base_url=stub.url, retries=3, backoff=0.01)
+
+        assert backend.get_balance("addr1") == 7
+        assert stub.requests.count(("GET", "/address/addr1")) == 3
+
+        stub.failures["/address/addr2"] = 10
+        with pytest.raises(requests.HTTPError):
+            BlockstreamBackend(base_url=stub.url, retries=1, backoff=0.01).get_balance("addr2")
+        assert stub.requests.count(("GET", "/address/addr2")) == 2
+
+
+def test_broadcast_invalidates_cache():
+    """
+    Test that broadcast returns the txid and drops cached UTXO lists.
+    """
+    with EsploraStub() as stub:
+        backend = BlockstreamBackend(base_url=stub.url)
+        backend.get_utxos("addr1")
+
+        txid = backend.broadcast("0200")
+
+        assert stub.broadcasts == ["0200"]
+        assert len(txid) == 64
+        backend.get_utxos("addr1")
+        assert len(stub.requests) == 3
+
+
+def test_default_backend_is_shared_per_network():
+    """
+    Test that default_backend hands out one backend, and so one cache, per network.
+    """
+    assert default_backend('testnet') is default_backend('testnet')
+    assert default_backend('testnet') is not default_backend('bitcoin')
+    assert default_backend('testnet').network == 'testnet'
+
+
+def test_fake_backend():
+    """
+    Test that FakeBackend answers from its in-memory state.
+    """
+    backend = FakeBackend()
+    backend.add_utxo("addr1", "aa" * 32, 0, 1_000)
+    backend.add_utxo("addr1", "bb" * 32, 1, 500, confirmed=False)
+
+    assert backend.get_balance("addr1") == 1_000
+    assert len(backend.get_utxos("addr1")) == 2
+    assert backend.get_utxos("addr2") == []
+    assert backend.broadcast("00") == f"{1:064x}"
+    assert backend.calls == 4
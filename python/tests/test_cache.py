@@ -0,0 +1,95 @@
+import pytest
+from bip_utils import Bip39SeedGenerator, Bip32Slip10Secp256k1
+from python.bitcoin_wallet.utils.crypto.cache import NodeCache, SeedCache
+from python.tests.conftest import FakeClock
+
+
+@pytest.fixture
+def seed():
+    mnemonic = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+    return Bip39SeedGenerator(mnemonic).Generate("")
+
+
+def test_node_cache_matches_direct_derivation(seed):
+    """Cached derivation should give the same node as deriving from the root"""
+    cache = NodeCache()
+    path = "m/44'/1'/0'/0/57"
+
+    node = cache.derive(seed, path)
+    direct = Bip32Slip10Secp256k1.FromSeed(seed).DerivePath(path)
+
+    assert node.PrivateKey().Raw().ToBytes() == direct.PrivateKey().Raw().ToBytes()
+    assert node.ChainCode().ToBytes() == direct.ChainCode().ToBytes()
+
+def test_node_cache_resumes_from_prefix(seed):
+    """Second path under the same chain should be a hit and not grow the cache"""
+    cache = NodeCache()
+    cache.derive(seed, "m/44'/1'/0'/0/57")
+    assert cache.stats()["misses"] == 1
+    size = len(cache)
+
+    cache.derive(seed, "m/44'/1'/0'/0/58")
+
+    assert cache.stats()["hits"] == 1
+    assert len(cache) == size
+
+def test_node_cache_lru_eviction(seed):
+    """Cache should never hold more than maxsize nodes"""
+    cache = NodeCache(maxsize=3)
+    cache.derive(seed, "m/44'/1'/0'/0/0")
+    cache.derive(seed, "m/84'/1'/0'/0/0")
+
+    assert len(cache) == 3
+
+def test_node_cache_clear(seed):
+    """clear() drops all nodes and resets counters"""
+    cache = NodeCache()
+    cache.derive(seed, "m/44'/1'/0'/0/0")
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 0
+
+
+MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+
+def test_seed_cache_hit_matches_generation(seed):
+    """Second lookup is served from the cache and equals the real seed"""
+    cache = SeedCache()
+
+    assert cache.get_or_generate(MNEMONIC) == seed
+    assert cache.get_or_generate(MNEMONIC) == seed
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_seed_cache_passphrase_is_part_of_key(seed):
+    """A different passphrase must not be served the cached seed"""
+    cache = SeedCache()
+    cache.get_or_generate(MNEMONIC)
+
+    assert cache.get_or_generate(MNEMONIC, "TREZOR") != seed
+    assert len(cache) == 2
+
+def test_seed_cache_ttl_expiry_zeroizes():
+    """Expired entries are regenerated and their buffer is zeroed"""
+    clock = FakeClock()
+    cache = SeedCache(ttl=10, clock=clock)
+    cache.get_or_generate(MNEMONIC)
+    seed_buf, _ = next(iter(cache._seeds.values()))
+
+    clock.now = 11
+    cache.get_or_generate(MNEMONIC)
+
+    assert seed_buf == bytearray(len(seed_buf))
+    assert cache.stats()["misses"] == 2
+
+def test_seed_cache_size_bound():
+    """Oldest entry is evicted once maxsize is exceeded"""
+    cache = SeedCache(maxsize=1)
+    cache.get_or_generate(MNEMONIC, "a")
+    cache.get_or_generate(MNEMONIC, "b")
+
+    assert len(cache) == 1
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+from python.bitcoin_wallet.core.chain_client import AsyncChainClient, fetch_balances, fetch_utxos
+from python.tests.esplora_stub import EsploraStub
+
+
+@pytest.fixture
+def stub():
+    with EsploraStub(delay=0.02) as server:
+        yield server
+
+
+def test_balances_fetched_concurrently_within_bound(stub):
+    """Many addresses are fetched in parallel, never above the concurrency limit"""
+    addresses = [f"tb1qaddr{i}" for i in range(24)]
+    stub.balances = {a: i * 1000 for i, a in enumerate(addresses)}
+
+    balances = fetch_balances(addresses, base_url=stub.url, concurrency=4)
+
+    assert balances == stub.balances
+    assert 1 < stub.max_in_flight <= 4
+
+def test_connections_are_kept_alive(stub):
+    """Requests reuse a bounded pool of connections"""
+    addresses = [f"tb1qaddr{i}" for i in range(20)]
+
+    fetch_balances(addresses, base_url=stub.url, concurrency=3)
+
+    assert len(stub.requests) == 20
+    assert len(stub.connections) <= 3
+
+def test_utxos_for_many_addresses(stub):
+    stub.utxos = {"tb1qa": [{"txid": "aa" * 32, "vout": 0, "value": 500}]}
+
+    utxos = fetch_utxos(["tb1qa", "tb1qb", "tb1qa"], base_url=stub.url)
+
+    assert utxos == {"tb1qa": stub.utxos["tb1qa"], "tb1qb": []}
+
+def test_transient_errors_are_retried(stub):
+    """503 responses are retried with backoff until the request succeeds"""
+    stub.balances = {"tb1qflaky": 7}
+    stub.failures = {"/address/tb1qflaky": 2}
+
+    async def run():
+        async with AsyncChainClient(base_url=stub.url, retries=3, backoff=0.01) as client:
+            return await client.get_balance("tb1qflaky")
+
+    assert asyncio.run(run()) == 7
+    assert stub.requests.count(("GET", "/address/tb1qflaky")) == 3
+
+def test_gives_up_after_retries(stub):
+    stub.failures = {"/address/tb1qdown": 10}
+
+    async def run():
+        async with AsyncChainClient(base_url=stub.url, retries=1, backoff=0.01) as client:
+            return await client.get_balance("tb1qdown")
+
+    with pytest.raises(Exception):
+        asyncio.run(run())
+    assert stub.requests.count(("GET", "/address/tb1qdown")) == 2
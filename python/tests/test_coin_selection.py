@@ -0,0 +1,144 @@
+import random
+
+import pytest
+
+from python.bitcoin_wallet.core.coin_selection import (
+    CoinSelector, InsufficientFunds, INPUT_VBYTES, OUTPUT_VBYTES, select_coins, tx_vsize,
+)
+
+
+def _utxos(*values):
+    return [{'txid': f"{i:064x}", 'vout': 0, 'value': value} for i, value in enumerate(values)]
+
+
+def _check_balanced(selection, amount):
+    assert sum(u['value'] for u in selection.inputs) == amount + selection.fee + selection.change
+
+
+def test_tx_vsize():
+    """
+    Test that vsize adds the segwit marker only when an input has a witness.
+    """
+    assert tx_vsize(['p2wpkh'], ['p2wpkh', 'p2wpkh']) == 141
+    assert tx_vsize(['p2pkh'], ['p2pkh']) == 10 + INPUT_VBYTES['p2pkh'] + OUTPUT_VBYTES['p2pkh']
+
+
+def test_single_utxo_changeless_match():
+    """
+    Test that a UTXO covering amount + fee within the cost of change is spent without change.
+    """
+    selector = CoinSelector(fee_rate=2.0)
+    fee = selector.base_fee + selector.input_fee
+    selection = selector.select(_utxos(500_000, 10_000 + fee + 50, 3_000), 10_000)
+
+    assert selection.algorithm == 'bnb'
+    assert [u['value'] for u in selection.inputs] == [10_000 + fee + 50]
+    assert selection.change == 0
+    assert selection.fee == fee + 50
+    _check_balanced(selection, 10_000)
+
+
+def test_bnb_finds_exact_combination():
+    """
+    Test that branch-and-bound combines several inputs to avoid a change output.
+    """
+    selector = CoinSelector(fee_rate=1.0)
+    values = [v + selector.input_fee for v in (20_000 + selector.base_fee, 7_000, 3_000)]
+    selection = selector.select(_utxos(25_000 + selector.input_fee, *values, 1_500), 30_000)
+
+    assert selection.algorithm == 'bnb'
+    assert sorted(u['value'] for u in selection.inputs) == sorted(values)
+    assert selection.waste == 0
+    assert selection.fee == selector.base_fee + 3 * selector.input_fee
+    _check_balanced(selection, 30_000)
+
+
+def test_falls_back_to_knapsack_with_change():
+    """
+    Test that a change output is created when no changeless set exists.
+    """
+    selection = select_coins(_utxos(100_000, 60_000), 30_000, fee_rate=3.0)
+
+    assert selection.algorithm == 'knapsack'
+    assert [u['value'] for u in selection.inputs] == [60_000]
+    assert selection.change > 0
+    _check_balanced(selection, 30_000)
+
+
+def test_excess_below_dust_goes_to_fee():
+    """
+    Test that leftover value too small for a change output is added to the fee.
+    """
+    selector = CoinSelector(fee_rate=1.0, max_tries=0)
+    fee = selector.base_fee + selector.input_fee
+    amount = 10_000
+    selection = selector.select(_utxos(amount + fee + selector.cost_of_change + 100), amount)
+
+    assert selection.change == 0
+    assert selection.fee == fee + selector.cost_of_change + 100
+    _check_balanced(selection, amount)
+
+
+def test_fee_covers_inputs_added_by_selection():
+    """
+    Test that the fee grows with every selected input, unlike the old
+    amount-only greedy selection.
+    """
+    selector = CoinSelector(fee_rate=10.0)
+    selection = selector.select(_utxos(*([5_000] * 10)), 20_000)
+
+    # 4 inputs leave 17_280 after their own fees, the 5th is needed
+    assert len(selection.inputs) == 5
+    outputs = ['p2wpkh', 'p2wpkh'] if selection.change else ['p2wpkh']
+    assert selection.fee >= 10.0 * tx_vsize(['p2wpkh'] * 5, outputs)
+    _check_balanced(selection, 20_000)
+
+
+def test_uneconomic_utxos_are_ignored():
+    """
+    Test that UTXOs worth less than the fee to spend them are never selected.
+    """
+    selector = CoinSelector(fee_rate=20.0)
+    with pytest.raises(InsufficientFunds):
+        selector.select(_utxos(*([1_000] * 50)), 5_000)
+
+
+def test_insufficient_funds():
+    with pytest.raises(InsufficientFunds):
+        select_coins(_utxos(1_000, 2_000), 5_000, fee_rate=1.0)
+
+
+def test_waste_not_worse_than_largest_first():
+    """
+    Test that the selection never wastes more than the largest-first baseline.
+    """
+    rng = random.Random(7)
+    utxos = _utxos(*(int(rng.lognormvariate(11, 1.5)) for _ in range(2_000)))
+    selector = CoinSelector(fee_rate=5.0, long_term_fee_rate=2.0)
+
+    for amount in (20_000, 250_000, 3_000_000):
+        selection = selector.select(utxos, amount)
+        baseline = selector.select_largest_first(utxos, amount)
+        assert selection.waste <= baseline.waste
+        _check_balanced(selection, amount)
+
+
+def test_prepared_candidates_match_unprepared():
+    """
+    Test that selecting from prepared or presorted UTXOs gives the same result
+    as sorting on every call.
+    """
+    rng = random.Random(3)
+    utxos = _utxos(*(int(rng.lognormvariate(11, 1.5)) for _ in range(2_000)))
+    descending = sorted(utxos, key=lambda utxo: utxo['value'], reverse=True)
+    selector = CoinSelector(fee_rate=5.0, long_term_fee_rate=2.0)
+    candidates = selector.prepare(descending, presorted=True)
+
+    assert all(value > 0 for value in candidates.values)
+    for amount in (20_000, 250_000, 3_000_000):
+        expected = selector.select(utxos, amount)
+        assert selector.select(candidates, amount) == expected
+        assert selector.select(descending, amount, presorted=True) == expected
+
+    with pytest.raises(ValueError):
+        CoinSelector(fee_rate=1.0).select(candidates, 20_000)
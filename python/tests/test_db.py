@@ -1,30 +1,15 @@
 import sqlite3
-import pytest
-
-from python.bitcoin_wallet.utils.db.schema_init import init_db
-from python.bitcoin_wallet.database.models import WalletDB, AddressDB, TransactionDB
-from python.bitcoin_wallet.utils.db.db_op import DB_NAME
-
-init_db()
+import threading
 
-# ---------------- FIXTURE SETUP ----------------
-@pytest.fixture(scope="function", autouse=True)
-def temp_db(monkeypatch):
-    """
-    Use an in-memory SQLite database for testing.
-    Monkeypatch get_db_cursor to always use this temporary DB.
-    """
-    conn = sqlite3.connect(":memory:", check_same_thread=False)
-    init_db(conn) 
-
-    def get_cursor():
-        return conn.cursor()
+import pytest
 
-    # Monkeypatch get_db_cursor in all modules
-    monkeypatch.setattr("python.bitcoin_wallet.utils.db.db_op.get_db_cursor", lambda: conn.cursor())
+from python.bitcoin_wallet.utils.db import schema_init
+from python.bitcoin_wallet.utils.db.schema_init import init_db, migrate, schema_version, MIGRATIONS
+from python.bitcoin_wallet.database.models import WalletDB, AddressDB, TransactionDB, UtxoDB
+from python.bitcoin_wallet.utils.db.db_op import get_connection, get_db_path, close_db, get_db_cursor
 
-    yield conn
-    conn.close()
+# Every test runs against a fresh database file (temp_db in conftest.py)
+pytestmark = pytest.mark.usefixtures("temp_db")
 
 
 # ---------------- WALLETDB TESTS ----------------
@@ -51,6 +36,38 @@ def test_create_and_delete_wallet(temp_db):
     row = wallet_db.get_wallet(wallet_id)
     assert row is None
 
+def test_wallet_mnemonic_envelope_and_legacy_rows(temp_db):
+    """Version 2 rows hold the envelope in one BLOB, version 1 rows still read back as dicts"""
+    import base64
+    from python.bitcoin_wallet.utils.crypto.security import Security
+
+    sec = Security()
+    mnemonic = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+    params = {"time_cost": 1, "memory_cost": 8192, "parallelism": 1}
+    wallet_db = WalletDB()
+
+    envelope = sec.encrypt_mnemonic_envelope(mnemonic, "pw", kdf_params=params)
+    v2_id = wallet_db.create_wallet_envelope("Envelope", envelope)
+
+    legacy = sec.encrypt_mnemonic(mnemonic, "pw", kdf_params=params)
+    v1_id = wallet_db.create_wallet(
+        "Legacy",
+        base64.b64decode(legacy["encrypted_mnemonic"]),
+        legacy["kdf"],
+        base64.b64decode(legacy["kdf_salt"]),
+        legacy["kdf_params"],
+        base64.b64decode(legacy["enc_nonce"]),
+        1
+    )
+
+    stored = wallet_db.get_encrypted_mnemonic(v2_id)
+    assert stored == envelope
+    assert wallet_db.get_wallet(v2_id)[7] == 2
+    assert sec.decrypt_mnemonic(stored, "pw") == mnemonic
+    assert wallet_db.get_encrypted_mnemonic(v1_id) == legacy
+    assert sec.decrypt_mnemonic(wallet_db.get_encrypted_mnemonic(v1_id), "pw") == mnemonic
+    assert wallet_db.get_encrypted_mnemonic(v2_id + v1_id) is None
+
 
 # ---------------- ADDRESSDB TESTS ----------------
 def test_create_and_list_addresses(temp_db):
@@ -135,4 +152,304 @@ def test_add_and_list_transaction(temp_db):
     # Verify retrieval
     txs = tx_db.all_transactions(wallet_id)
     assert len(txs) == 1
-    assert txs[0][2] == txid 
+    assert txs[0][2] == txid
+
+
+# ---------------- CONNECTION MANAGER TESTS ----------------
+def test_connection_is_reused_and_tuned(temp_db, tmp_path):
+    """The same thread always gets the same WAL-mode connection"""
+    assert get_connection() is get_connection()
+    assert get_db_path() == str(tmp_path / "wallet.db")
+
+    journal_mode = get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = get_connection().execute("PRAGMA synchronous").fetchone()[0]
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+
+def test_cursor_rolls_back_on_error(temp_db):
+    """A failing block must not leave partial writes behind"""
+    with pytest.raises(RuntimeError):
+        with get_db_cursor() as cur:
+            cur.execute("INSERT INTO transactions (wallet_id, txid) VALUES (1, 'rolled_back')")
+            raise RuntimeError("boom")
+
+    assert TransactionDB().all_transactions(1) == []
+
+def test_nested_cursor_joins_outer_transaction(temp_db):
+    """An inner block commits with the outer one, and a failing inner block only undoes itself"""
+    tx_db = TransactionDB()
+    with pytest.raises(RuntimeError):
+        with get_db_cursor() as cur:
+            cur.execute("INSERT INTO transactions (wallet_id, txid) VALUES (1, 'outer')")
+            with get_db_cursor() as inner:
+                inner.execute("INSERT INTO transactions (wallet_id, txid) VALUES (1, 'inner')")
+            raise RuntimeError("boom")
+
+    assert tx_db.all_transactions(1) == []
+
+    with get_db_cursor() as cur:
+        cur.execute("INSERT INTO transactions (wallet_id, txid) VALUES (1, 'kept')")
+        with pytest.raises(RuntimeError):
+            with get_db_cursor() as inner:
+                inner.execute("INSERT INTO transactions (wallet_id, txid) VALUES (1, 'undone')")
+                raise RuntimeError("boom")
+
+    assert [row[2] for row in tx_db.all_transactions(1)] == ['kept']
+
+def test_connections_of_finished_threads_are_closed(temp_db):
+    """A thread's connection is pruned once the thread has exited"""
+    from python.bitcoin_wallet.utils.db.db_op import _manager
+
+    opened = []
+    worker = threading.Thread(target=lambda: opened.append(get_connection()))
+    worker.start()
+    worker.join()
+    assert worker in _manager._connections
+
+    second = threading.Thread(target=get_connection)
+    second.start()
+    second.join()
+    assert worker not in _manager._connections
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+
+def test_close_db_reopens_lazily(temp_db):
+    """Closed connections are replaced on next use"""
+    first = get_connection()
+    close_db()
+
+    assert get_connection() is not first
+    assert WalletDB().get_wallet(1) is None
+
+
+# ---------------- BULK INSERT TESTS ----------------
+def test_bulk_create_addresses_from_generator(temp_db):
+    """Rows streamed from a generator are inserted in chunks within one call"""
+    wallet_id = WalletDB().create_wallet("BulkWallet", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+    addr_db = AddressDB()
+
+    rows = (
+        (wallet_id, f"tb1qbulk{i}", "p2pkh", i, f"m/44'/1'/0'/0/{i}")
+        for i in range(25)
+    )
+    inserted = addr_db.create_addresses(rows, chunk_size=10)
+
+    assert inserted == 25
+    addrs = addr_db.all_addresses(wallet_id)
+    assert len(addrs) == 25
+    assert addrs[0][6] == 0 and addrs[0][7] == 0  # is_change / is_used defaults
+
+def test_bulk_create_addresses_is_atomic(temp_db):
+    """A duplicate address rolls back the whole batch"""
+    wallet_id = WalletDB().create_wallet("BulkWallet2", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+    addr_db = AddressDB()
+    rows = [(wallet_id, "tb1qdup", "p2pkh", 0, "m/0"), (wallet_id, "tb1qdup", "p2pkh", 1, "m/1")]
+
+    with pytest.raises(Exception):
+        addr_db.create_addresses(rows)
+
+    assert addr_db.all_addresses(wallet_id) == []
+
+def test_bulk_add_transactions(temp_db):
+    """Known txids are skipped and only new rows are counted"""
+    wallet_id = WalletDB().create_wallet("BulkTx", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+    tx_db = TransactionDB()
+    tx_db.add_transaction(wallet_id, "tx0", b"raw")
+
+    inserted = tx_db.add_transactions(
+        [(wallet_id, f"tx{i}", b"raw") for i in range(5)] + [(wallet_id, "tx9", b"raw", "confirmed")],
+        chunk_size=2
+    )
+
+    assert inserted == 5
+    txs = tx_db.all_transactions(wallet_id)
+    assert len(txs) == 6
+    assert [tx[4] for tx in txs if tx[2] == "tx9"] == ["confirmed"]
+
+
+# ---------------- SCHEMA / INDEX TESTS ----------------
+def _query_plan(sql, params):
+    rows = get_connection().execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return " | ".join(row[3] for row in rows)
+
+def test_migrations_are_applied_once(temp_db):
+    """init_db brings the schema to the latest version and is idempotent"""
+    assert schema_version(temp_db) == len(MIGRATIONS)
+
+    init_db()
+    assert migrate(temp_db) == len(MIGRATIONS)
+
+def test_failed_migration_is_rolled_back(temp_db, monkeypatch):
+    """A failing migration leaves neither partial changes nor an open transaction"""
+    broken = "CREATE TABLE half_done (x INTEGER);\nINSERT INTO no_such_table VALUES (1);"
+    monkeypatch.setattr(schema_init, "MIGRATIONS", MIGRATIONS + [broken])
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(temp_db)
+
+    assert not temp_db.in_transaction
+    assert schema_version(temp_db) == len(MIGRATIONS)
+    assert temp_db.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+
+def test_concurrent_migrations_apply_each_step_once(temp_db, tmp_path, monkeypatch):
+    """Callers racing to migrate the same file apply every step exactly once"""
+    counted = "CREATE TABLE IF NOT EXISTS applied (n INTEGER);\nINSERT INTO applied VALUES (1);"
+    monkeypatch.setattr(schema_init, "MIGRATIONS", MIGRATIONS + [counted])
+    path = str(tmp_path / "wallet.db")
+    barrier = threading.Barrier(4)
+    versions = []
+
+    def run():
+        con = sqlite3.connect(path, timeout=10)
+        barrier.wait()
+        versions.append(migrate(con))
+        con.close()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert versions == [len(MIGRATIONS) + 1] * 4
+    assert temp_db.execute("SELECT COUNT(*) FROM applied").fetchone()[0] == 1
+
+def test_per_wallet_queries_use_indexes(temp_db):
+    """Per-wallet lookups must search an index instead of scanning the table"""
+    assert "USING INDEX idx_addresses_wallet" in _query_plan(
+        "SELECT * FROM addresses WHERE wallet_id = ?", (1,))
+    assert "USING INDEX idx_transactions_wallet" in _query_plan(
+        "SELECT * FROM transactions WHERE wallet_id = ?", (1,))
+    assert "USING INDEX idx_utxos_wallet_spent" in _query_plan(
+        "SELECT * FROM utxos WHERE wallet_id = ? AND spent = ?", (1, 1))
+    assert "USING INDEX idx_utxos_unspent" in _query_plan(
+        "SELECT txid, vout FROM utxos WHERE wallet_id = ? AND spent = 0 ORDER BY amount_sat DESC", (1,))
+
+def test_address_list_is_covered(temp_db):
+    """Listing address strings is answered from the index alone"""
+    assert "USING COVERING INDEX idx_addresses_wallet" in _query_plan(
+        "SELECT address FROM addresses WHERE wallet_id = ? AND is_change = ? ORDER BY index_num", (1, 0))
+
+    wallet_id = WalletDB().create_wallet("Covered", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+    AddressDB().create_addresses([
+        (wallet_id, "tb1qchange", "p2pkh", 0, "m/1/0", False, True),
+        (wallet_id, "tb1qext1", "p2pkh", 1, "m/0/1"),
+        (wallet_id, "tb1qext0", "p2pkh", 0, "m/0/0"),
+    ])
+    assert AddressDB().address_list(wallet_id, is_change=False) == ["tb1qext0", "tb1qext1"]
+    assert len(AddressDB().address_list(wallet_id)) == 3
+
+
+# ---------------- PAGINATION TESTS ----------------
+def test_address_pages_and_stream(temp_db):
+    """Keyset pages cover every row exactly once and stream lazily"""
+    wallet_id = WalletDB().create_wallet("Paged", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+    addr_db = AddressDB()
+    addr_db.create_addresses((wallet_id, f"tb1qpage{i}", "p2pkh", i, f"m/0/{i}") for i in range(7))
+
+    first = addr_db.page_addresses(wallet_id, limit=3)
+    second = addr_db.page_addresses(wallet_id, after_id=first[-1].id, limit=3)
+    assert [row.index_num for row in first + second] == [0, 1, 2, 3, 4, 5]
+    assert first[0].address == "tb1qpage0"
+
+    streamed = addr_db.iter_addresses(wallet_id, page_size=3)
+    assert [row.address for row in streamed] == [f"tb1qpage{i}" for i in range(7)]
+
+def test_transaction_history_skips_raw_tx(temp_db):
+    """raw_tx is not loaded unless asked for, and can be fetched lazily"""
+    wallet_id = WalletDB().create_wallet("History", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+    tx_db = TransactionDB()
+    tx_db.add_transactions((wallet_id, f"hist{i}", b"\x00" * 1000) for i in range(5))
+
+    rows = list(tx_db.iter_transactions(wallet_id, page_size=2))
+    assert [row.txid for row in rows] == [f"hist{i}" for i in range(5)]
+    assert all(row.raw_tx is None for row in rows)
+
+    assert tx_db.page_transactions(wallet_id, limit=1, include_raw=True)[0].raw_tx == b"\x00" * 1000
+    assert tx_db.get_raw_tx("hist3") == b"\x00" * 1000
+    assert tx_db.get_raw_tx("missing") is None
+
+def test_keyset_pages_use_index(temp_db):
+    """Paging queries search an index and need no sort step"""
+    for table in ("addresses", "transactions"):
+        plan = _query_plan(f"SELECT id FROM {table} WHERE wallet_id = ? AND id > ? ORDER BY id LIMIT ?", (1, 0, 10))
+        assert "USING" in plan and "INDEX" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+# ---------------- UTXODB TESTS ----------------
+def _utxo_wallet(name="Utxos"):
+    return WalletDB().create_wallet(name, b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+
+def test_utxo_upsert_and_balance(temp_db):
+    """Balance aggregate follows inserts, refreshes and spends"""
+    wallet_id = _utxo_wallet()
+    utxo_db = UtxoDB()
+
+    written = utxo_db.upsert_utxos([
+        ("aa" * 32, 0, wallet_id, "tb1qone", 5_000, b"\x00\x14"),
+        ("bb" * 32, 1, wallet_id, "tb1qone", 20_000, b"\x00\x14"),
+        ("cc" * 32, 0, wallet_id, "tb1qtwo", 1_000, b"\x00\x14"),
+    ])
+    assert written == 3
+    assert utxo_db.balance(wallet_id) == 26_000
+
+    # Refreshing an output replaces its value, not adds to it
+    utxo_db.upsert_utxos([("aa" * 32, 0, wallet_id, "tb1qone", 6_000, b"\x00\x14")])
+    assert utxo_db.balance(wallet_id) == 27_000
+
+    assert utxo_db.mark_spent([("bb" * 32, 1), ("bb" * 32, 1), ("ff" * 32, 0)]) == 1
+    assert utxo_db.balance(wallet_id) == 7_000
+    assert utxo_db.balance(wallet_id + 1) == 0
+
+def test_utxo_spent_flag_survives_resync(temp_db):
+    """An output spent locally is not resurrected by a later upsert"""
+    wallet_id = _utxo_wallet()
+    utxo_db = UtxoDB()
+    row = ("aa" * 32, 0, wallet_id, "tb1qone", 5_000, b"\x00\x14")
+    utxo_db.upsert_utxos([row])
+    utxo_db.mark_spent([("aa" * 32, 0)])
+
+    utxo_db.upsert_utxos([row])
+
+    assert utxo_db.balance(wallet_id) == 0
+    assert utxo_db.select_candidates(wallet_id) == []
+
+def test_utxo_candidates_ordered_by_value(temp_db):
+    """Candidates come back largest first from the unspent index"""
+    wallet_id = _utxo_wallet()
+    utxo_db = UtxoDB()
+    utxo_db.upsert_utxos((f"{i:064x}", 0, wallet_id, "tb1qone", amount, b"") for i, amount in enumerate([300, 100, 500, 200]))
+
+    assert [u.amount_sat for u in utxo_db.select_candidates(wallet_id)] == [500, 300, 200, 100]
+    assert [u.amount_sat for u in utxo_db.select_candidates(wallet_id, limit=2, largest_first=False)] == [100, 200]
+    assert [u.amount_sat for u in utxo_db.select_candidates(wallet_id, min_amount=250)] == [500, 300]
+    assert len(utxo_db.unspent_for_address("tb1qone")) == 4
+    assert "USING INDEX idx_utxos_unspent" in _query_plan(
+        "SELECT txid FROM utxos WHERE wallet_id = ? AND spent = 0 AND amount_sat >= ? ORDER BY amount_sat DESC LIMIT ?",
+        (wallet_id, 0, -1))
+
+# ---------------- ADDRESS DISCOVERY TESTS ----------------
+def test_upsert_addresses_keeps_used_flag(temp_db):
+    """Re-scanning an address never clears is_used, and max_used_index follows it per chain"""
+    wallet_id = WalletDB().create_wallet("ScanWallet", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+    addr_db = AddressDB()
+    assert addr_db.max_used_index(wallet_id) is None
+
+    addr_db.upsert_addresses([
+        (wallet_id, "tb1qscan0", "p2pkh", 0, "m/0/0", True, False),
+        (wallet_id, "tb1qscan1", "p2pkh", 1, "m/0/1", False, False),
+        (wallet_id, "tb1qchange3", "p2pkh", 3, "m/1/3", True, True),
+    ])
+    addr_db.upsert_addresses([
+        (wallet_id, "tb1qscan0", "p2pkh", 0, "m/0/0", False, False),
+        (wallet_id, "tb1qscan1", "p2pkh", 1, "m/0/1", True, False),
+    ])
+
+    assert len(addr_db.all_addresses(wallet_id)) == 3
+    assert addr_db.max_used_index(wallet_id) == 1
+    assert addr_db.max_used_index(wallet_id, is_change=True) == 3
+    assert addr_db.used_addresses(wallet_id) == ["tb1qscan0", "tb1qscan1", "tb1qchange3"]
+    assert "USING INDEX idx_addresses_used" in _query_plan(
+        "SELECT MAX(index_num) FROM addresses WHERE wallet_id = ? AND is_change = ? AND is_used = 1",
+        (wallet_id, False))
@@ -0,0 +1,103 @@
+import pytest
+
+from python.bitcoin_wallet.core.backend import FakeBackend
+from python.bitcoin_wallet.core.discovery import AccountDiscovery
+from python.bitcoin_wallet.database.models import AddressDB, WalletDB
+from python.bitcoin_wallet.utils.crypto.keys import HDKeys
+
+MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+
+
+pytestmark = pytest.mark.usefixtures("temp_db")
+
+
+@pytest.fixture
+def seed():
+    return HDKeys(b"dummy_seed").generate_seed_from_mnemonic(MNEMONIC)
+
+
+@pytest.fixture
+def wallet_id():
+    return WalletDB().create_wallet("w", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+
+
+class CountingBackend(FakeBackend):
+    def __init__(self):
+        super().__init__()
+        self.looked_up = []
+
+    def get_address_stats_many(self, addresses):
+        addresses = list(addresses)
+        self.looked_up.extend(addresses)
+        return super().get_address_stats_many(addresses)
+
+
+def _fund(backend, keys, seed, change, index):
+    address = keys.derive_range(seed, 0, change, index, 1)[0].address
+    backend.add_utxo(address, f"{index:064x}", 0, 1_000)
+
+
+def test_scan_stops_after_gap_limit(seed, wallet_id):
+    """
+    Test that each chain is scanned up to gap_limit addresses past the last used one.
+    """
+    backend = CountingBackend()
+    keys = HDKeys(seed)
+    for index in (0, 3, 8):
+        _fund(backend, keys, seed, False, index)
+    _fund(backend, keys, seed, True, 1)
+
+    result = AccountDiscovery.from_seed(wallet_id, seed, backend, gap_limit=5).run()
+
+    assert result.external == (False, 8, 14, 3)
+    assert result.change == (True, 1, 7, 1)
+    assert len(backend.looked_up) == 21
+    address_db = AddressDB()
+    assert len(address_db.all_addresses(wallet_id)) == 21
+    assert address_db.max_used_index(wallet_id) == 8
+    assert address_db.max_used_index(wallet_id, is_change=True) == 1
+
+
+def test_rescan_resumes_from_frontier(seed, wallet_id):
+    """
+    Test that a rescan only looks at addresses after the highest stored used index.
+    """
+    backend = CountingBackend()
+    keys = HDKeys(seed)
+    _fund(backend, keys, seed, False, 2)
+    discovery = AccountDiscovery.from_seed(wallet_id, seed, backend, gap_limit=5)
+    discovery.scan_chain(False)
+
+    backend.looked_up.clear()
+    _fund(backend, keys, seed, False, 6)
+    scan = discovery.scan_chain(False)
+
+    assert scan == (False, 6, 9, 1)
+    assert backend.looked_up[0] == keys.derive_range(seed, 0, False, 3, 1)[0].address
+    assert len(AddressDB().all_addresses(wallet_id)) == 12
+
+    backend.looked_up.clear()
+    assert discovery.scan_chain(False, full=True) == (False, 6, 12, 2)
+    assert len(backend.looked_up) == 12
+
+
+def test_watch_only_discovery_matches_seed(seed, wallet_id):
+    """
+    Test that discovery from the account xpub finds the same addresses as from the seed.
+    """
+    backend = FakeBackend()
+    keys = HDKeys(seed)
+    _fund(backend, keys, seed, False, 4)
+    xpub = keys.account_xpub(seed, 0)
+
+    scan = AccountDiscovery.from_xpub(wallet_id, xpub, backend, gap_limit=5).scan_chain(False)
+
+    assert scan.last_used == 4
+    assert AddressDB().address_list(wallet_id, is_change=False) == [
+        derived.address for derived in keys.derive_range(seed, 0, False, 0, 10)
+    ]
+
+
+def test_invalid_gap_limit(seed, wallet_id):
+    with pytest.raises(ValueError):
+        AccountDiscovery.from_seed(wallet_id, seed, FakeBackend(), gap_limit=0)
@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+from python.bitcoin_wallet.core.backend import BlockstreamBackend, FakeBackend
+from python.bitcoin_wallet.core.fees import FeeEstimator
+from python.tests.conftest import FakeClock
+from python.tests.esplora_stub import EsploraStub
+
+
+class FlakyBackend(FakeBackend):
+    def __init__(self):
+        super().__init__()
+        self.fail = False
+
+    def get_fee_estimates(self):
+        if self.fail:
+            self.calls += 1
+            raise ConnectionError("backend down")
+        return super().get_fee_estimates()
+
+
+def test_named_targets():
+    """
+    Test that named targets map to the backend's per-block estimates.
+    """
+    estimator = FeeEstimator(FakeBackend())
+
+    assert estimator.quotes() == {'next_block': 20.0, 'six_blocks': 8.0, 'economy': 1.0}
+    assert estimator.fee_rate(1) == 20.0
+
+
+def test_missing_target_uses_shorter_estimate():
+    """
+    Test that a block count without an estimate gets the next shorter target's rate.
+    """
+    estimator = FeeEstimator(FakeBackend())
+
+    assert estimator.fee_rate(2) == 20.0
+    assert estimator.fee_rate(25) == 8.0
+    assert estimator.fee_rate(1008) == 1.0
+    with pytest.raises(ValueError):
+        estimator.fee_rate(0)
+
+
+def test_min_fee_rate_floor():
+    backend = FakeBackend()
+    backend.fee_estimates = {1: 3.0, 144: 0.2}
+
+    assert FeeEstimator(backend).fee_rate('economy') == 1.0
+
+
+def test_quotes_are_served_from_cache():
+    """
+    Test that quotes only reach the backend again after the TTL.
+    """
+    clock = FakeClock()
+    backend = FakeBackend()
+    estimator = FeeEstimator(backend, ttl=60, clock=clock)
+
+    for _ in range(10_000):
+        estimator.fee_rate('six_blocks')
+    assert backend.calls == 1
+
+    backend.fee_estimates[6] = 15.0
+    clock.now = 61
+    assert estimator.fee_rate('six_blocks') == 15.0
+    assert backend.calls == 2
+
+
+def test_concurrent_refresh_hits_backend_once():
+    backend = FakeBackend()
+    estimator = FeeEstimator(backend)
+    threads = [threading.Thread(target=estimator.quotes) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert backend.calls == 1
+
+
+def test_stale_estimates_survive_backend_failure():
+    """
+    Test that a failed refresh keeps serving the last estimates until max_stale.
+    """
+    clock = FakeClock()
+    backend = FlakyBackend()
+    estimator = FeeEstimator(backend, ttl=60, max_stale=300, clock=clock)
+    estimator.fee_rate()
+
+    backend.fail = True
+    clock.now = 200
+    assert estimator.fee_rate() == 8.0
+
+    clock.now = 400
+    with pytest.raises(ConnectionError):
+        estimator.fee_rate()
+
+
+def test_backend_outage_is_retried_with_backoff():
+    """
+    Test that quotes during an outage retry the backend at most every retry_after seconds.
+    """
+    clock = FakeClock()
+    backend = FlakyBackend()
+    estimator = FeeEstimator(backend, ttl=60, max_stale=300, retry_after=10, clock=clock)
+    estimator.fee_rate()
+
+    backend.fail = True
+    clock.now = 61
+    for _ in range(1_000):
+        assert estimator.fee_rate() == 8.0
+    assert backend.calls == 2
+
+    clock.now = 72
+    for _ in range(1_000):
+        estimator.fee_rate()
+    assert backend.calls == 3
+
+    backend.fail = False
+    backend.fee_estimates[6] = 15.0
+    clock.now = 83
+    assert estimator.fee_rate() == 15.0
+    assert backend.calls == 4
+
+
+def test_blockstream_fee_estimates():
+    """
+    Test that the Blockstream backend reads /fee-estimates with integer targets.
+    """
+    with EsploraStub() as stub:
+        estimator = FeeEstimator(BlockstreamBackend(base_url=stub.url))
+
+        assert estimator.estimates() == {1: 20.0, 3: 12.0, 6: 8.0, 144: 1.0}
+        assert estimator.fee_rate(4) == 12.0
+        assert stub.requests == [("GET", "/fee-estimates")]
@@ -1,6 +1,10 @@
+import threading
+
 import pytest
-from ecdsa import BadSignatureError
-from python.bitcoin_wallet.utils.crypto.keys import Keys, HDKeys
+from hashlib import sha256
+from ecdsa import BadSignatureError, VerifyingKey
+from ecdsa.util import sigdecode_der
+from python.bitcoin_wallet.utils.crypto.keys import Keys, HDKeys, VerifyingKeyCache
 
 
 @pytest.fixture
@@ -87,3 +91,220 @@ def test_different_paths_generate_different_addresses(mnemonic):
     addr2 = hd.derive_address_from_path(seed, "m/44'/0'/0'/0/1", include_priv=True)
 
     assert addr1["address"] != addr2["address"]
+
+def test_derive_range_matches_single_derivation(mnemonic):
+    """Batch derivation should return the same addresses as one-by-one derivation"""
+    hd = HDKeys(b"dummy_seed")
+    seed = hd.generate_seed_from_mnemonic(mnemonic)
+
+    batch = hd.derive_range(seed, account_idx=0, change=False, start=3, count=5, include_priv=True)
+
+    assert [item.index for item in batch] == [3, 4, 5, 6, 7]
+    for item in batch:
+        single = hd.generate_bip44_address(seed, account_idx=0, change=False, address_idx=item.index, include_priv=True)
+        assert item.address == single["address"]
+        assert item.path == single["path"]
+        assert item.public_key == single["public_key"]
+        assert item.private_key == single["private_key"]
+
+def test_derive_range_change_chain(mnemonic):
+    """Change chain addresses should differ from the external chain"""
+    hd = HDKeys(b"dummy_seed")
+    seed = hd.generate_seed_from_mnemonic(mnemonic)
+
+    external = hd.derive_range(seed, 0, change=False, start=0, count=2)
+    internal = hd.derive_range(seed, 0, change=True, start=0, count=2)
+
+    assert internal[0].path == "m/44'/1'/0'/1/0"
+    assert internal[0].private_key is None
+    assert {a.address for a in external}.isdisjoint({a.address for a in internal})
+
+def test_derive_many_matches_derive_range(mnemonic):
+    """Process-pool derivation should stream the same addresses in index order"""
+    hd = HDKeys(b"dummy_seed")
+    seed = hd.generate_seed_from_mnemonic(mnemonic)
+
+    expected = hd.derive_range(seed, 0, change=False, start=5, count=25, include_priv=True)
+    streamed = list(hd.derive_many(seed, 0, change=False, start=5, count=25,
+                                   include_priv=True, workers=2, chunk_size=7))
+
+    assert streamed == expected
+
+def test_derive_many_public_only(mnemonic):
+    """Without include_priv workers only receive the xpub and return no private keys"""
+    hd = HDKeys(b"dummy_seed")
+    seed = hd.generate_seed_from_mnemonic(mnemonic)
+
+    streamed = list(hd.derive_many(seed, 0, change=True, start=0, count=4, workers=2, chunk_size=3))
+
+    assert [item.index for item in streamed] == [0, 1, 2, 3]
+    assert all(item.private_key is None for item in streamed)
+    assert streamed[0].address == hd.derive_range(seed, 0, change=True, start=0, count=1)[0].address
+
+def test_watch_only_xpub_matches_seed_derivation(mnemonic):
+    """Addresses derived from the account xpub should match seed-based derivation"""
+    hd = HDKeys(b"dummy_seed")
+    seed = hd.generate_seed_from_mnemonic(mnemonic)
+
+    xpub = hd.account_xpub(seed, account_idx=0)
+    watch = HDKeys.from_xpub(xpub, account_path="m/44'/1'/0'")
+
+    assert watch.is_watch_only
+    assert watch.seed is None
+    assert watch.derive_public_range(change=False, start=0, count=3) == hd.derive_range(seed, 0, False, 0, 3)
+    assert watch.derive_public_address(change=True, address_idx=7) == hd.derive_range(seed, 0, True, 7, 1)[0]
+
+def test_public_derivation_requires_xpub():
+    """Seed-based instances should refuse public-only derivation"""
+    hd = HDKeys(b"dummy_seed")
+
+    with pytest.raises(ValueError):
+        hd.derive_public_address(change=False, address_idx=0)
+
+def test_derivation_does_not_print_secrets(mnemonic, capsys):
+    """Seed generation and derivation should not write to stdout"""
+    hd = HDKeys.from_mnemonic(mnemonic)
+    seed = hd.generate_seed_from_mnemonic(mnemonic)
+    hd.generate_bip44_address(seed, account_idx=0, change=False, address_idx=0)
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert seed.hex() not in captured.err
+
+def test_derivation_metrics(mnemonic):
+    """Enabled metrics should count seed generation, node derivation and address encoding"""
+    from python.bitcoin_wallet.utils.metrics import metrics
+    from python.bitcoin_wallet.utils.crypto.keys import SEED_CACHE
+
+    SEED_CACHE.clear()
+    metrics.reset()
+    metrics.enable()
+    try:
+        hd = HDKeys.from_mnemonic(mnemonic)
+        hd.derive_range(hd.seed, 0, change=False, start=0, count=5)
+        snap = metrics.snapshot()
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+    assert snap["seed_generation"]["count"] == 1
+    assert snap["address_encoding"]["count"] == 5
+    assert snap["node_derivation"]["count"] >= 5
+
+def test_sign_many_matches_sign_message(keys):
+    """Batch signatures are identical to one-by-one deterministic signatures"""
+    messages = [f"payout {i}".encode() for i in range(10)]
+
+    sigs = keys.sign_many(keys.private_key, messages)
+
+    assert sigs == [keys.sign_message(keys.private_key, m) for m in messages]
+
+def test_sign_many_process_pool(keys):
+    """Process-pool mode keeps message order and produces valid signatures"""
+    messages = (f"input {i}".encode() for i in range(9))
+
+    sigs = keys.sign_many(keys.private_key, messages, workers=2, chunk_size=4)
+
+    assert len(sigs) == 9
+    assert sigs[5] == keys.sign_message(keys.private_key, b"input 5")
+
+def test_reusable_signer(keys, message):
+    """A Signer can be reused and its signatures verify"""
+    signer = keys.signer(keys.private_key)
+
+    assert keys.verify_signature(keys.public_key.to_string(), message, signer.sign(message))
+    assert signer.sign(message) == signer.sign(message)
+
+def test_verify_many_streams_results_in_order(keys, message):
+    """Batch verification returns one result per tuple, in input order"""
+    other = Keys()
+    pub = keys.public_key.to_string()
+    other_pub = other.public_key.to_string()
+    sig = keys.sign_message(keys.private_key, message)
+    other_sig = other.sign_message(other.private_key, message)
+
+    items = [(pub, message, sig), (other_pub, message, other_sig), (pub, message + b"x", sig)] * 4
+    results = keys.verify_many(iter(items), chunk_size=5)
+
+    assert not isinstance(results, list)
+    assert list(results) == [True, True, False] * 4
+
+def test_verify_many_process_pool(keys, message):
+    """Process-pool mode agrees with in-process verification"""
+    pub = keys.public_key.to_string()
+    sigs = keys.sign_many(keys.private_key, [message, message + b"2"])
+    items = [(pub, message, sigs[0]), (pub, message, sigs[1]), (pub, message + b"2", sigs[1])] * 3
+
+    assert list(keys.verify_many(items, workers=2, chunk_size=4)) == [True, False, True] * 3
+
+def test_verifying_key_cache_precomputes_hot_keys(keys, message):
+    """Keys used often enough get their tables precomputed and still verify"""
+    cache = VerifyingKeyCache(maxsize=2, precompute_after=2)
+    pub = keys.public_key.to_string()
+    sig = keys.sign_message(keys.private_key, message)
+
+    for _ in range(3):
+        vk = cache.get(pub)
+    assert len(cache) == 1
+    assert vk.verify(sig, message, hashfunc=sha256, sigdecode=sigdecode_der)
+
+def test_verifying_key_cache_precomputes_outside_lock(keys, message, monkeypatch):
+    """Concurrent misses share the first inserted key and precompute() runs without the lock"""
+    cache = VerifyingKeyCache(precompute_after=100)
+    pub = keys.public_key.to_string()
+    barrier = threading.Barrier(4)
+    found = []
+
+    def lookup():
+        barrier.wait()
+        found.append(cache.get(pub))
+
+    threads = [threading.Thread(target=lookup) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(found) == 4 and all(vk is found[0] for vk in found)
+
+    cache = VerifyingKeyCache(precompute_after=2)
+    precompute = VerifyingKey.precompute
+    held = []
+
+    def checked(vk, *args, **kwargs):
+        held.append(cache._lock.locked())
+        return precompute(vk, *args, **kwargs)
+
+    monkeypatch.setattr(VerifyingKey, "precompute", checked)
+    cache.get(pub)
+    hot = cache.get(pub)
+
+    assert held == [False]
+    assert cache.get(pub) is hot
+    assert hot.verify(keys.sign_message(keys.private_key, message), message,
+                      hashfunc=sha256, sigdecode=sigdecode_der)
+
+def test_compress_decompress_roundtrip(keys):
+    """Decompressing a compressed key gives back the original 64-byte key"""
+    uncompressed = keys.public_key.to_string()
+    compressed = keys.compress_public_key(uncompressed)
+
+    assert len(compressed) == 33
+    assert keys.decompress_public_key(compressed) == uncompressed
+
+def test_decompress_rejects_invalid_keys(keys):
+    """Wrong length, prefix or an x with no curve point should raise"""
+    with pytest.raises(ValueError):
+        keys.decompress_public_key(b"\x04" + b"\x01" * 32)
+    with pytest.raises(ValueError):
+        keys.decompress_public_key(b"\x02" + b"\x01" * 31)
+    with pytest.raises(ValueError):
+        keys.decompress_public_key(b"\x02" + (5).to_bytes(32, "big"))
+
+def test_verify_with_compressed_public_key(keys, message):
+    """verify_signature and verify_many accept 33-byte compressed keys"""
+    compressed = keys.compress_public_key(keys.public_key.to_string())
+    sig = keys.sign_message(keys.private_key, message)
+
+    assert keys.verify_signature(compressed, message, sig)
+    assert not keys.verify_signature(compressed, message + b"x", sig)
+    assert list(keys.verify_many([(compressed, message, sig)])) == [True]
@@ -0,0 +1,57 @@
+import pytest
+from python.bitcoin_wallet.utils.metrics import Metrics
+
+
+@pytest.fixture
+def metrics():
+    return Metrics()
+
+
+def test_disabled_metrics_record_nothing(metrics):
+    """Nothing is counted while metrics are disabled"""
+    with metrics.timed("seed_generation"):
+        pass
+
+    assert metrics.snapshot() == {}
+
+def test_enabled_metrics_count_and_time(metrics):
+    """Counters and cumulative timings are kept per operation"""
+    metrics.enable()
+    with metrics.timed("node_derivation", count=10):
+        pass
+    with metrics.timed("node_derivation"):
+        pass
+
+    snap = metrics.snapshot()
+    assert snap["node_derivation"]["count"] == 11
+    assert snap["node_derivation"]["total_s"] >= 0
+
+def test_hooks_are_called(metrics):
+    """Registered hooks receive every record"""
+    calls = []
+    metrics.enable()
+    metrics.add_hook(lambda op, elapsed, count: calls.append((op, count)))
+
+    with metrics.timed("address_encoding", count=3):
+        pass
+
+    assert calls == [("address_encoding", 3)]
+
+def test_reset(metrics):
+    metrics.enable()
+    metrics.record("seed_generation", 0.5)
+    metrics.reset()
+
+    assert metrics.snapshot() == {}
+
+def test_gauges_keep_latest_value(metrics):
+    metrics.set_gauge("unlock_queue_depth", 3)
+    assert metrics.gauges() == {}
+
+    metrics.enable()
+    metrics.set_gauge("unlock_queue_depth", 3)
+    metrics.set_gauge("unlock_queue_depth", 1)
+    assert metrics.gauges() == {"unlock_queue_depth": 1}
+
+    metrics.reset()
+    assert metrics.gauges() == {}
@@ -0,0 +1,201 @@
+import base64
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from python.bitcoin_wallet.core import rekey
+from python.bitcoin_wallet.core.rekey import RekeyJob
+from python.bitcoin_wallet.database.models import WalletDB
+from python.bitcoin_wallet.utils.crypto.security import Security, unpack_envelope
+from python.bitcoin_wallet.utils.db.db_op import get_db_cursor
+
+MNEMONIC = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+OLD_KDF = {"time_cost": 1, "memory_cost": 8192, "parallelism": 1}
+NEW_KDF = {"time_cost": 2, "memory_cost": 8192, "parallelism": 1}
+
+
+pytestmark = pytest.mark.usefixtures("temp_db")
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def _create_wallets(count):
+    """Wallet i gets password pw<i>; odd ids are stored in the legacy version 1 layout"""
+    sec, wallet_db = Security(), WalletDB()
+    ids = []
+    for i in range(count):
+        wallet_id = i + 1
+        if wallet_id % 2:
+            legacy = sec.encrypt_mnemonic(MNEMONIC, f"pw{wallet_id}", kdf_params=OLD_KDF)
+            ids.append(wallet_db.create_wallet(
+                f"w{wallet_id}", base64.b64decode(legacy["encrypted_mnemonic"]), legacy["kdf"],
+                base64.b64decode(legacy["kdf_salt"]), legacy["kdf_params"],
+                base64.b64decode(legacy["enc_nonce"]), 1
+            ))
+        else:
+            envelope = sec.encrypt_mnemonic_envelope(MNEMONIC, f"pw{wallet_id}", kdf_params=OLD_KDF)
+            ids.append(wallet_db.create_wallet_envelope(f"w{wallet_id}", envelope))
+    return ids
+
+
+def _password(wallet_id):
+    return f"pw{wallet_id}"
+
+
+def _assert_rekeyed(wallet_id):
+    envelope = WalletDB().get_encrypted_mnemonic(wallet_id)
+    assert unpack_envelope(envelope).kdf_params == {**NEW_KDF, "hash_len": 32}
+    assert Security().decrypt_mnemonic(envelope, _password(wallet_id)) == MNEMONIC
+
+
+def test_rekey_all_wallets(executor):
+    """Legacy and envelope rows end up as envelopes with the new parameters"""
+    ids = _create_wallets(7)
+
+    result = RekeyJob(_password, NEW_KDF, batch_size=3, executor=executor).run()
+
+    assert (result.rekeyed, result.skipped, result.failed) == (7, 0, 0)
+    assert result.last_wallet_id == ids[-1]
+    for wallet_id in ids:
+        _assert_rekeyed(wallet_id)
+
+    checkpoint = WalletDB().get_rekey_checkpoint("rekey")
+    assert checkpoint.last_wallet_id == ids[-1] and checkpoint.rekeyed == 7
+
+    # A second job finds nothing left to do
+    again = RekeyJob(_password, NEW_KDF, job="again", executor=executor).run()
+    assert (again.rekeyed, again.skipped) == (0, 7)
+
+def test_failures_are_reported_and_left_untouched(executor):
+    ids = _create_wallets(4)
+    before = WalletDB().get_encrypted_mnemonic(ids[1])
+
+    passwords = lambda wallet_id: "wrong" if wallet_id == ids[1] else None if wallet_id == ids[2] else _password(wallet_id)
+    result = RekeyJob(passwords, NEW_KDF, executor=executor).run()
+
+    assert result.failed_ids == [ids[1]]
+    assert (result.rekeyed, result.skipped, result.failed) == (2, 1, 1)
+    assert WalletDB().get_encrypted_mnemonic(ids[1]) == before
+    _assert_rekeyed(ids[0])
+    _assert_rekeyed(ids[3])
+
+def test_unreadable_rows_fail_without_stopping_the_job(executor):
+    """A corrupt envelope or bad legacy kdf_params is reported, the rest is re-keyed"""
+    ids = _create_wallets(2)
+    wallet_db = WalletDB()
+    corrupt = wallet_db.create_wallet_envelope("corrupt", b"BWMx garbage")
+    bad_params = wallet_db.create_wallet("bad-params", b"ct", "argon2id", b"salt", "{not json", b"nonce", 1)
+    ids.append(wallet_db.create_wallet_envelope(
+        "last", Security().encrypt_mnemonic_envelope(MNEMONIC, "pw5", kdf_params=OLD_KDF)
+    ))
+
+    result = RekeyJob(_password, NEW_KDF, executor=executor).run()
+
+    assert result.failed_ids == [corrupt, bad_params]
+    assert (result.rekeyed, result.skipped, result.failed) == (3, 0, 2)
+    assert result.last_wallet_id == ids[-1]
+    assert wallet_db.get_encrypted_mnemonic(corrupt) == b"BWMx garbage"
+    for wallet_id in ids:
+        _assert_rekeyed(wallet_id)
+
+def test_wallet_changed_during_job_is_left_alone(executor):
+    """A mnemonic replaced after the job read it is not overwritten with a stale envelope"""
+    ids = _create_wallets(3)
+    replacement = Security().encrypt_mnemonic_envelope(MNEMONIC, "changed", kdf_params=OLD_KDF)
+
+    def changing(wallet_id):
+        if wallet_id == ids[1]:
+            # e.g. a password change committed while the job is running
+            with get_db_cursor() as cur:
+                cur.execute("UPDATE wallets SET encrypted_mnemonic = ?, version = 2 WHERE id = ?",
+                            (replacement, wallet_id))
+        return _password(wallet_id)
+
+    result = RekeyJob(changing, NEW_KDF, executor=executor).run()
+
+    assert (result.rekeyed, result.skipped, result.failed) == (2, 1, 0)
+    assert WalletDB().get_encrypted_mnemonic(ids[1]) == replacement
+    assert WalletDB().get_rekey_checkpoint("rekey").rekeyed == 2
+    _assert_rekeyed(ids[0])
+    _assert_rekeyed(ids[2])
+
+def test_interrupted_job_resumes_from_checkpoint(executor):
+    """Completed batches survive an interruption and are not redone"""
+    ids = _create_wallets(6)
+    asked = []
+
+    def interrupting(wallet_id):
+        if wallet_id == ids[4]:
+            raise KeyboardInterrupt
+        asked.append(wallet_id)
+        return _password(wallet_id)
+
+    with pytest.raises(KeyboardInterrupt):
+        RekeyJob(interrupting, NEW_KDF, batch_size=2, executor=executor).run()
+
+    # Work still queued when interrupted may be cancelled, anything written is in order
+    done = WalletDB().get_rekey_checkpoint("rekey").last_wallet_id
+    assert done in ids[:4]
+    for wallet_id in ids[:ids.index(done) + 1]:
+        _assert_rekeyed(wallet_id)
+
+    asked.clear()
+    resuming = lambda wallet_id: asked.append(wallet_id) or _password(wallet_id)
+    result = RekeyJob(resuming, NEW_KDF, batch_size=2, executor=executor).run()
+
+    assert asked == ids[ids.index(done) + 1:]
+    assert result.rekeyed == 6
+    for wallet_id in ids:
+        _assert_rekeyed(wallet_id)
+
+def test_checkpoint_for_other_params_is_rejected(executor):
+    _create_wallets(1)
+    RekeyJob(_password, NEW_KDF, executor=executor).run()
+
+    job = RekeyJob(_password, {**NEW_KDF, "time_cost": 3}, executor=executor)
+    with pytest.raises(ValueError):
+        job.run()
+    job.reset()
+    assert job.run().rekeyed == 1
+
+def test_work_in_flight_stays_within_memory_budget(monkeypatch):
+    """No more KDF work runs at once than the memory budget allows"""
+    ids = _create_wallets(8)
+    lock = threading.Lock()
+    running, peak = 0, 0
+    real_rekey = rekey._rekey
+
+    def counting_rekey(*args):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        try:
+            return real_rekey(*args)
+        finally:
+            with lock:
+                running -= 1
+
+    monkeypatch.setattr(rekey, "_rekey", counting_rekey)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        result = RekeyJob(_password, NEW_KDF, memory_budget_kib=2 * 8192, executor=pool).run()
+
+    assert result.rekeyed == len(ids)
+    assert peak == 2
+
+def test_rekey_in_process_pool():
+    """The default executor is a process pool"""
+    ids = _create_wallets(3)
+
+    result = RekeyJob(_password, NEW_KDF, memory_budget_kib=2 * 8192).run()
+
+    assert result.rekeyed == 3
+    for wallet_id in ids:
+        _assert_rekeyed(wallet_id)
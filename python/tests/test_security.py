@@ -1,6 +1,16 @@
 import pytest
+import json
+import time
 import base64
-from python.bitcoin_wallet.utils.crypto.security import Security
+import struct
+import asyncio
+import threading
+from cryptography.exceptions import InvalidTag
+from python.bitcoin_wallet.utils.crypto.security import (
+    Security, UnlockPool, MIN_ARGON2_MEMORY_KIB, MAX_ARGON2_MEMORY_KIB, ENVELOPE_HEADER, unpack_envelope,
+)
+from python.bitcoin_wallet.utils.metrics import metrics
+from python.tests.conftest import FAST_KDF
 
 se = Security()
 
@@ -54,4 +64,211 @@ def test_derive_argon2_and_pbkdf2_keys(sec, password):
 
     assert len(key1) == 32
     assert len(key2) == 32
-    assert key1 != key2
\ No newline at end of file
+    assert key1 != key2
+
+def test_encrypt_with_custom_kdf_params(sec, mnemonic, password):
+    """The parameters actually used are stored and used again to decrypt"""
+    params = {"time_cost": 1, "memory_cost": 1024, "parallelism": 1, "hash_len": 32}
+    encrypted = sec.encrypt_mnemonic(mnemonic, password, kdf_params=params)
+
+    assert json.loads(encrypted["kdf_params"]) == params
+    assert sec.decrypt_mnemonic(encrypted, password) == mnemonic
+
+def test_calibrate_argon2_respects_memory_budget(sec):
+    """Calibration never exceeds the memory budget and returns usable parameters"""
+    params = sec.calibrate_argon2(target_ms=20, max_memory_kib=MIN_ARGON2_MEMORY_KIB, samples=1)
+
+    assert params["memory_cost"] <= MIN_ARGON2_MEMORY_KIB
+    assert params["time_cost"] >= 1
+    assert 1 <= params["parallelism"] <= 4
+    assert len(sec.derive_argon2_key("pw", b"0" * 16, **params)) == params["hash_len"]
+
+def test_calibrate_argon2_scales_time_cost(sec):
+    """A longer target buys more passes at the same memory"""
+    fast = sec.calibrate_argon2(target_ms=1, max_memory_kib=1024, samples=1)
+    slow = sec.calibrate_argon2(target_ms=40, max_memory_kib=1024, samples=1)
+
+    assert fast["time_cost"] == 1
+    assert slow["time_cost"] > fast["time_cost"]
+    assert slow["memory_cost"] == fast["memory_cost"] == 1024
+
+def test_decrypt_mnemonic_async_does_not_block_loop(sec, mnemonic, password):
+    """The event loop keeps running while the KDF runs on the pool"""
+    encrypted = sec.encrypt_mnemonic(mnemonic, password, kdf_params=FAST_KDF)
+    pool = UnlockPool()
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        decrypted = await sec.decrypt_mnemonic_async(encrypted, password, pool=pool)
+        task.cancel()
+        return decrypted, ticks
+
+    try:
+        decrypted, ticks = asyncio.run(run())
+    finally:
+        pool.close()
+
+    assert decrypted == mnemonic
+    assert ticks > 1
+
+def test_unlock_pool_admits_within_memory_budget(sec, mnemonic, password):
+    """Unlocks beyond the memory budget queue instead of running in parallel"""
+    encrypted = sec.encrypt_mnemonic(mnemonic, password, kdf_params=FAST_KDF)
+    pool = UnlockPool(memory_budget_kib=2 * MIN_ARGON2_MEMORY_KIB, max_workers=8)
+    lock = threading.Lock()
+    running, peak, depths = 0, 0, []
+
+    def slow_decrypt(blob, pw):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return sec.decrypt_mnemonic(blob, pw)
+
+    async def run():
+        tasks = [asyncio.create_task(pool.run(slow_decrypt, encrypted, password)) for _ in range(6)]
+        await asyncio.sleep(0)
+        depths.append(pool.queue_depth)
+        return await asyncio.gather(*tasks)
+
+    metrics.reset()
+    metrics.enable()
+    try:
+        results = asyncio.run(run())
+        snap = metrics.snapshot()
+    finally:
+        metrics.disable()
+        metrics.reset()
+        pool.close()
+
+    assert results == [mnemonic] * 6
+    assert peak == 2
+    assert depths == [4]
+    assert pool.queue_depth == 0 and pool.memory_in_use_kib == 0
+    assert snap["unlock_wait"]["count"] == 6
+    assert snap["unlock_kdf"]["count"] == 6
+
+def test_unlock_pool_cancelled_waiter_frees_its_place(sec, mnemonic, password):
+    """Cancelling a queued unlock removes it without leaking budget"""
+    encrypted = sec.encrypt_mnemonic(mnemonic, password, kdf_params=FAST_KDF)
+    pool = UnlockPool(memory_budget_kib=MIN_ARGON2_MEMORY_KIB, max_workers=2)
+
+    async def run():
+        first = asyncio.create_task(pool.run(sec.decrypt_mnemonic, encrypted, password))
+        queued = asyncio.create_task(pool.run(sec.decrypt_mnemonic, encrypted, password))
+        await asyncio.sleep(0)
+        assert pool.queue_depth == 1
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert pool.queue_depth == 0
+        return await first
+
+    try:
+        assert asyncio.run(run()) == mnemonic
+    finally:
+        pool.close()
+
+    assert pool.memory_in_use_kib == 0
+
+def test_unlock_pool_cancelled_unlock_keeps_budget_until_kdf_ends(sec, mnemonic, password):
+    """Cancelling a running unlock does not free its memory while the KDF still runs"""
+    encrypted = sec.encrypt_mnemonic(mnemonic, password, kdf_params=FAST_KDF)
+    pool = UnlockPool(memory_budget_kib=MIN_ARGON2_MEMORY_KIB, max_workers=2)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_decrypt(blob, pw):
+        started.set()
+        release.wait(5)
+        return sec.decrypt_mnemonic(blob, pw)
+
+    async def run():
+        running = asyncio.create_task(pool.run(blocking_decrypt, encrypted, password))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+        assert running.cancelled()
+
+        queued = asyncio.create_task(pool.run(sec.decrypt_mnemonic, encrypted, password))
+        await asyncio.sleep(0.05)
+        assert pool.memory_in_use_kib == MIN_ARGON2_MEMORY_KIB
+        assert pool.queue_depth == 1 and not queued.done()
+
+        release.set()
+        return await queued
+
+    try:
+        assert asyncio.run(run()) == mnemonic
+    finally:
+        release.set()
+        pool.close()
+
+    assert pool.memory_in_use_kib == 0
+
+def test_envelope_roundtrip(sec, mnemonic, password):
+    """The binary envelope decrypts and carries its own KDF parameters"""
+    envelope = sec.encrypt_mnemonic_envelope(mnemonic, password, kdf_params=FAST_KDF)
+
+    assert isinstance(envelope, bytes)
+    assert sec.decrypt_mnemonic(envelope, password) == mnemonic
+    parsed = unpack_envelope(envelope)
+    assert parsed.kdf == "argon2id"
+    assert parsed.kdf_params == {**FAST_KDF, "hash_len": 32}
+    assert len(parsed.salt) == 16 and len(parsed.nonce) == 12
+
+def test_envelope_smaller_than_legacy_blob(sec, mnemonic, password):
+    envelope = sec.encrypt_mnemonic_envelope(mnemonic, password, kdf_params=FAST_KDF)
+    legacy = sec.encrypt_mnemonic(mnemonic, password, kdf_params=FAST_KDF)
+    legacy_size = sum(len(legacy[k]) for k in ("kdf", "kdf_salt", "kdf_params", "enc_nonce", "encrypted_mnemonic"))
+
+    assert len(envelope) == ENVELOPE_HEADER.size + 16 + 12 + len(mnemonic) + 16
+    assert len(envelope) < legacy_size
+
+def test_envelope_rejects_corrupt_input(sec, mnemonic, password):
+    envelope = sec.encrypt_mnemonic_envelope(mnemonic, password, kdf_params=FAST_KDF)
+
+    with pytest.raises(ValueError):
+        unpack_envelope(b"XXXX" + envelope[4:])
+    with pytest.raises(ValueError):
+        unpack_envelope(envelope[:4] + b"\x09" + envelope[5:])
+    with pytest.raises(ValueError):
+        unpack_envelope(envelope[:ENVELOPE_HEADER.size + 20])
+
+def test_envelope_header_is_authenticated(sec, mnemonic, password):
+    """Changing a KDF parameter in the header makes decryption fail"""
+    envelope = sec.encrypt_mnemonic_envelope(mnemonic, password, kdf_params=FAST_KDF)
+    # time_cost follows magic, version and kdf_id
+    tampered = envelope[:6] + struct.pack(">I", 2) + envelope[10:]
+
+    assert unpack_envelope(tampered).kdf_params["time_cost"] == 2
+    with pytest.raises(InvalidTag):
+        sec.decrypt_mnemonic(tampered, password)
+
+def test_envelope_rejects_excessive_params(sec, mnemonic, password):
+    envelope = sec.encrypt_mnemonic_envelope(mnemonic, password, kdf_params=FAST_KDF)
+
+    with pytest.raises(ValueError):
+        # memory_cost follows time_cost
+        unpack_envelope(envelope[:10] + struct.pack(">I", MAX_ARGON2_MEMORY_KIB + 1) + envelope[14:])
+    with pytest.raises(ValueError):
+        unpack_envelope(envelope[:6] + struct.pack(">I", 2**32 - 1) + envelope[10:])
+    with pytest.raises(ValueError):
+        unpack_envelope(envelope[:6] + struct.pack(">I", 0) + envelope[10:])
+
+def test_decrypt_mnemonic_async_with_envelope(sec, mnemonic, password):
+    envelope = sec.encrypt_mnemonic_envelope(mnemonic, password, kdf_params=FAST_KDF)
+    pool = UnlockPool()
+    try:
+        assert asyncio.run(sec.decrypt_mnemonic_async(envelope, password, pool=pool)) == mnemonic
+    finally:
+        pool.close()
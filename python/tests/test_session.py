@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import pytest
+from bip_utils import Bip39SeedGenerator
+
+from python.bitcoin_wallet.utils.crypto.cache import SeedCache
+from python.bitcoin_wallet.utils.crypto.security import Security
+from python.bitcoin_wallet.utils.crypto.session import SessionManager, SessionLocked, TooManySessions
+from python.tests.conftest import FAST_KDF
+
+class CountingSecurity(Security):
+    def __init__(self):
+        self.derivations = 0
+
+    def decrypt_mnemonic(self, encrypted_blob, password):
+        self.derivations += 1
+        return super().decrypt_mnemonic(encrypted_blob, password)
+
+
+@pytest.fixture
+def mnemonic():
+    return "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+
+@pytest.fixture
+def blob(mnemonic):
+    return Security().encrypt_mnemonic(mnemonic, "pw", kdf_params=FAST_KDF)
+
+@pytest.fixture
+def security():
+    return CountingSecurity()
+
+def test_session_derives_key_once(blob, mnemonic, security, clock):
+    """Repeated seed reads within a session never rerun the KDF"""
+    sessions = SessionManager(security=security, clock=clock)
+    session = sessions.unlock(1, blob, "pw")
+
+    for _ in range(3):
+        assert session.seed() == Bip39SeedGenerator(mnemonic).Generate()
+    assert session.mnemonic() == mnemonic
+    assert security.derivations == 1
+    assert sessions.session(session.token).wallet_id == 1
+
+def test_lock_zeroizes_secrets(blob, security, clock):
+    sessions = SessionManager(security=security, clock=clock)
+    session = sessions.unlock(1, blob, "pw")
+    entry = sessions._sessions[session.token]
+
+    session.lock()
+
+    assert not session.is_unlocked
+    assert entry.seed == bytearray(64) and not any(entry.mnemonic)
+    with pytest.raises(SessionLocked):
+        session.seed()
+    session.lock()
+
+def test_idle_timeout_and_ttl(blob, security, clock):
+    """Use keeps a session alive until ttl; idling past idle_timeout locks it"""
+    sessions = SessionManager(ttl=100, idle_timeout=30, security=security, clock=clock)
+    session = sessions.unlock(1, blob, "pw")
+
+    for clock.now in (20, 40, 60, 80):
+        session.seed()
+    clock.now = 100
+    with pytest.raises(SessionLocked):
+        session.seed()
+
+    idle = sessions.unlock(1, blob, "pw")
+    clock.now += 30
+    assert not idle.is_unlocked
+    sessions.purge_expired()
+    assert len(sessions) == 0
+
+def test_max_sessions(blob, security, clock):
+    """The limit is checked before deriving; expired sessions free their slot"""
+    sessions = SessionManager(ttl=10, max_sessions=2, security=security, clock=clock)
+    sessions.unlock(1, blob, "pw")
+    sessions.unlock(2, blob, "pw")
+
+    with pytest.raises(TooManySessions):
+        sessions.unlock(3, blob, "pw")
+    assert security.derivations == 2
+
+    clock.now = 10
+    assert sessions.unlock(3, blob, "pw").is_unlocked
+    assert len(sessions) == 1
+
+def test_lock_wallet(blob, security, clock):
+    sessions = SessionManager(security=security, clock=clock)
+    first, second = sessions.unlock(1, blob, "pw"), sessions.unlock(1, blob, "pw")
+    other = sessions.unlock(2, blob, "pw")
+
+    sessions.lock_wallet(1)
+
+    assert not first.is_unlocked and not second.is_unlocked
+    assert other.is_unlocked
+
+def test_unlock_async(blob, mnemonic, clock):
+    sessions = SessionManager(clock=clock)
+
+    with asyncio.run(sessions.unlock_async(1, blob, "pw")) as session:
+        assert session.mnemonic() == mnemonic
+    assert len(sessions) == 0
+
+def test_wrong_password_opens_no_session(blob, security, clock):
+    sessions = SessionManager(security=security, clock=clock)
+
+    with pytest.raises(Exception):
+        sessions.unlock(1, blob, "wrong")
+    assert len(sessions) == 0
+
+def test_concurrent_unlocks_respect_max_sessions(blob, clock):
+    """Unlocks still deriving hold their place, so extra ones fail before paying for the KDF"""
+    gate = threading.Event()
+
+    class BlockingSecurity(CountingSecurity):
+        def decrypt_mnemonic(self, encrypted_blob, password):
+            gate.wait(5)
+            return super().decrypt_mnemonic(encrypted_blob, password)
+
+    security = BlockingSecurity()
+    sessions = SessionManager(max_sessions=2, security=security, clock=clock)
+    opened, rejected = [], []
+
+    def unlock(wallet_id):
+        try:
+            opened.append(sessions.unlock(wallet_id, blob, "pw"))
+        except TooManySessions:
+            rejected.append(wallet_id)
+            if len(rejected) == 2:
+                gate.set()
+
+    threads = [threading.Thread(target=unlock, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    gate.set()
+
+    assert len(opened) == 2 and len(rejected) == 2
+    assert security.derivations == 2
+    assert len(sessions) == 2 and sessions._pending == 0
+
+def test_failed_unlock_releases_its_reservation(blob, security, clock):
+    sessions = SessionManager(max_sessions=1, security=security, clock=clock)
+
+    with pytest.raises(Exception):
+        sessions.unlock(1, blob, "wrong")
+    assert sessions._pending == 0
+    assert sessions.unlock(1, blob, "pw").is_unlocked
+
+def test_closing_sessions_evicts_cached_seed(blob, mnemonic, security, clock):
+    """Lock, lock_wallet and expiry all drop the wallet's seed from the seed cache"""
+    seed_cache = SeedCache(clock=clock)
+    sessions = SessionManager(ttl=10, security=security, clock=clock, seed_cache=seed_cache)
+
+    for close in (lambda s: s.lock(), lambda s: sessions.lock_wallet(1), lambda s: sessions.purge_expired()):
+        session = sessions.unlock(1, blob, "pw")
+        seed_cache.get_or_generate(mnemonic)
+        assert len(seed_cache) == 1
+
+        clock.now += 10
+        close(session)
+        assert len(seed_cache) == 0 and len(sessions) == 0
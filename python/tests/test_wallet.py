@@ -2,6 +2,8 @@ import pytest
 from pyzbar.pyzbar import decode
 from PIL import Image
 from python.bitcoin_wallet.core.wallet import BitcoinWallet
+from python.bitcoin_wallet.core.backend import FakeBackend
+from python.bitcoin_wallet.core.coin_selection import DUST_LIMIT
 
 
 class TestBitcoinWallet:
@@ -68,7 +70,7 @@ class TestBitcoinWallet:
         assert addr.startswith('bc1')
         assert len(addr) > 10  # Bech32 addresses are longer
 
-    def test_qr_address_generation(self):
+    def test_qr_address_generation(self, tmp_path):
         """
         Test that generate_qr_code creates a QR code file for the wallet address.
 
@@ -76,19 +78,17 @@ class TestBitcoinWallet:
         """
         wallet = BitcoinWallet()
         addr = wallet.get_address()
-        qr_path = wallet.generate_qr_code(filename='test_qr.png')
-        assert qr_path == 'test_qr.png'
-
-        # Decode the QR code to verify it encodes the correct address
-        decoded = decode(Image.open(qr_path))[0].data.decode()
-        assert decoded == addr
+        filename = str(tmp_path / 'test_qr.png')
+        qr_path = wallet.generate_qr_code(filename=filename)
+        assert qr_path == filename
 
         # Check that the file was created
         import os
         assert os.path.isfile(qr_path)
 
-        # Clean up the test QR code file
-        os.remove(qr_path)
+        # Decode the QR code to verify it encodes the correct address
+        decoded = decode(Image.open(qr_path))[0].data.decode()
+        assert decoded == addr
 
     def test_get_balance(self):
         """
@@ -102,4 +102,277 @@ class TestBitcoinWallet:
         assert isinstance(balance, int)
         assert balance >= 0
 
-        
\ No newline at end of file
+    def test_watch_only_wallet(self):
+        """
+        Test that a watch-only wallet built from an account xpub derives the
+        same addresses as the full wallet and exposes no private key.
+        """
+        mnemonic = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+        wallet = BitcoinWallet(mnemonic=mnemonic, network='testnet')
+        account = wallet.master_key.child_private(84, hardened=True).child_private(1, hardened=True).child_private(0, hardened=True)
+
+        watch = BitcoinWallet.watch_only(account.wif_public(), network='testnet')
+
+        assert watch.is_watch_only
+        assert not wallet.is_watch_only
+        assert watch.get_mnemonic() is None
+        assert watch.derive_address(3) == account.child_private(0).child_private(3).address()
+        assert watch.derive_address(0, change=True) == account.child_private(1).child_private(0).address()
+        with pytest.raises(ValueError):
+            watch.get_master_private_key()
+
+    def test_watch_only_matches_full_wallet(self):
+        """
+        Test that the account xpub exported by a full wallet reproduces its
+        receive and change addresses.
+        """
+        mnemonic = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+        wallet = BitcoinWallet(mnemonic=mnemonic, network='testnet', backend=FakeBackend())
+        watch = BitcoinWallet.watch_only(wallet.get_account_xpub(), network='testnet', backend=FakeBackend())
+
+        assert wallet.account_path == "m/84'/1'/0'"
+        for index in (0, 1, 7):
+            assert watch.derive_address(index) == wallet.derive_address(index)
+            assert watch.derive_address(index, change=True) == wallet.derive_address(index, change=True)
+        # BIP84 test vector for this mnemonic, first testnet receive address
+        assert wallet.derive_address(0) == "tb1q6rz28mcfaxtmd6v789l9rrlrusdprr9pqcpvkl"
+
+    def test_wallets_share_default_backend(self):
+        """
+        Test that wallets on the same network share one backend and fee estimator.
+        """
+        first = BitcoinWallet(network='testnet')
+        second = BitcoinWallet(network='testnet')
+        assert first.backend is second.backend
+        assert first.fee_estimator is second.fee_estimator
+
+        own = BitcoinWallet(network='testnet', backend=FakeBackend())
+        assert own.fee_estimator.backend is own.backend
+
+    def test_wallet_from_unlock_session(self):
+        """
+        Test that a wallet opened from an unlock session matches the mnemonic
+        wallet and cannot be opened once the session is locked.
+        """
+        from python.bitcoin_wallet.utils.crypto.security import Security
+        from python.bitcoin_wallet.utils.crypto.session import SessionManager, SessionLocked
+
+        mnemonic = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+        blob = Security().encrypt_mnemonic(mnemonic, "pw", kdf_params={"time_cost": 1, "memory_cost": 8192})
+        sessions = SessionManager()
+        session = sessions.unlock(1, blob, "pw")
+
+        wallet = BitcoinWallet.from_session(session, network='testnet', backend=FakeBackend())
+        assert wallet.get_master_private_key() == BitcoinWallet(mnemonic, network='testnet').get_master_private_key()
+
+        session.lock()
+        with pytest.raises(SessionLocked):
+            BitcoinWallet.from_session(session, network='testnet')
+
+    def test_locked_session_leaves_no_cached_seed(self):
+        """
+        Test that opening a wallet from a session and locking it leaves no seed
+        in SEED_CACHE, also when the mnemonic was opened directly as well.
+        """
+        from python.bitcoin_wallet.utils.crypto.keys import SEED_CACHE
+        from python.bitcoin_wallet.utils.crypto.security import Security
+        from python.bitcoin_wallet.utils.crypto.session import SessionManager
+
+        mnemonic = "abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about"
+        blob = Security().encrypt_mnemonic(mnemonic, "pw", kdf_params={"time_cost": 1, "memory_cost": 8192})
+        sessions = SessionManager()
+        SEED_CACHE.clear()
+
+        session = sessions.unlock(1, blob, "pw")
+        BitcoinWallet.from_session(session, network='testnet', backend=FakeBackend())
+        assert len(SEED_CACHE) == 0
+
+        BitcoinWallet(mnemonic, network='testnet', backend=FakeBackend())
+        assert len(SEED_CACHE) == 1
+        session.lock()
+        assert not session.is_unlocked
+        assert len(SEED_CACHE) == 0
+
+
+class TestLocalUtxoSet:
+    """
+    Tests for the UtxoDB-backed balance and send paths (no network access).
+    """
+
+    @pytest.fixture(autouse=True)
+    def local_wallet(self, temp_db):
+        from python.bitcoin_wallet.database.models import WalletDB
+
+        self.wallet_id = WalletDB().create_wallet("w", b"enc", "argon2id", b"salt", "{}", b"nonce", 1)
+
+    def test_sync_and_local_balance(self):
+        """
+        Test that sync_utxos stores the backend outputs and get_balance(wallet_id)
+        answers from the local set, dropping outputs the backend no longer lists.
+        """
+        backend = FakeBackend()
+        wallet = BitcoinWallet(network='testnet', backend=backend)
+        address = wallet.get_address()
+        backend.add_utxo(address, 'aa' * 32, 0, 40_000)
+        backend.add_utxo(address, 'bb' * 32, 1, 2_000)
+
+        assert wallet.sync_utxos(self.wallet_id) == 2
+        assert wallet.get_balance(wallet_id=self.wallet_id) == 42_000
+
+        backend.utxos[address].pop()
+        wallet.sync_utxos(self.wallet_id)
+        assert wallet.get_balance(wallet_id=self.wallet_id) == 40_000
+
+    def test_send_from_local_utxos(self):
+        """
+        Test that send_bitcoin with a wallet_id spends local outputs without
+        fetching UTXOs and records the change output.
+        """
+        from python.bitcoin_wallet.core.wallet import script_pubkey
+        from python.bitcoin_wallet.database.models import UtxoDB
+
+        backend = FakeBackend()
+        wallet = BitcoinWallet(network='testnet', backend=backend)
+        address = wallet.get_address()
+        UtxoDB().upsert_utxos([('aa' * 32, 0, self.wallet_id, address, 50_000, script_pubkey(address))])
+
+        txid = wallet.send_bitcoin("tb1qh4eju9vpchznqv043mdrk7t2s32freruty77qk", 10_000, fee_rate=1.0,
+                                   wallet_id=self.wallet_id)
+
+        assert backend.calls == 1 and len(backend.broadcasts) == 1
+        candidates = UtxoDB().select_candidates(self.wallet_id)
+        assert [(u.txid, u.vout) for u in candidates] == [(txid, 1)]
+        assert 0 < wallet.get_balance(wallet_id=self.wallet_id) < 40_000
+
+    def test_discovered_addresses_are_synced(self):
+        """
+        Test that funds on derived addresses show up in the local balance once
+        discover_addresses has marked those addresses used.
+        """
+        backend = FakeBackend()
+        wallet = BitcoinWallet(network='testnet', backend=backend)
+        backend.add_utxo(wallet.derive_address(2), 'aa' * 32, 0, 3_000)
+        backend.add_utxo(wallet.derive_address(0, change=True), 'bb' * 32, 0, 500)
+
+        assert wallet.sync_utxos(self.wallet_id) == 0
+        result = wallet.discover_addresses(self.wallet_id, gap_limit=4)
+
+        assert result.external.last_used == 2 and result.change.last_used == 0
+        assert wallet.sync_utxos(self.wallet_id) == 2
+        assert wallet.get_balance(wallet_id=self.wallet_id) == 3_500
+
+    def test_discovered_utxos_are_spendable(self):
+        """
+        Test that UTXOs on discovered receive and change addresses are spent,
+        each input signed with its own derived key.
+        """
+        from bitcoinlib.transactions import Transaction
+        from python.bitcoin_wallet.database.models import AddressDB
+
+        backend = FakeBackend()
+        wallet = BitcoinWallet(network='testnet', backend=backend)
+        backend.add_utxo(wallet.derive_address(2), 'aa' * 32, 0, 30_000)
+        backend.add_utxo(wallet.derive_address(0, change=True), 'bb' * 32, 0, 25_000)
+        wallet.discover_addresses(self.wallet_id, gap_limit=4)
+        wallet.sync_utxos(self.wallet_id)
+
+        paths = {row.address: row.derivation_path for row in AddressDB().iter_addresses(self.wallet_id)}
+        assert paths[wallet.derive_address(2)] == "m/84'/1'/0'/0/2"
+        assert paths[wallet.derive_address(0, change=True)] == "m/84'/1'/0'/1/0"
+
+        wallet.send_bitcoin("tb1qh4eju9vpchznqv043mdrk7t2s32freruty77qk", 50_000, fee_rate=1.0,
+                            wallet_id=self.wallet_id)
+
+        tx = Transaction.parse_hex(backend.broadcasts[0], network='testnet')
+        values = {wallet.derive_address(2): 30_000, wallet.derive_address(0, change=True): 25_000}
+        assert {i.address for i in tx.inputs} == set(values)
+        # Segwit signatures commit to the spent value, which the raw tx does not carry
+        for tx_input in tx.inputs:
+            tx_input.value = values[tx_input.address]
+        assert tx.verify()
+
+    def test_send_many_batches_payments(self):
+        """
+        Test that send_many pays every recipient from one transaction, returns
+        their output indexes and records the transaction.
+        """
+        from bitcoinlib.transactions import Transaction
+        from python.bitcoin_wallet.core.wallet import script_pubkey
+        from python.bitcoin_wallet.database.models import TransactionDB, UtxoDB
+
+        backend = FakeBackend()
+        wallet = BitcoinWallet(network='testnet', backend=backend)
+        address = wallet.get_address()
+        UtxoDB().upsert_utxos([('aa' * 32, 0, self.wallet_id, address, 80_000, script_pubkey(address))])
+        payments = [
+            ("tb1qh4eju9vpchznqv043mdrk7t2s32freruty77qk", 10_000),
+            ("mipcBbFg9gMiCh81Kj8tqqdgoZub1ZJRfn", 15_000),
+            (wallet.derive_address(5), 20_000),
+        ]
+
+        txid, outputs = wallet.send_many(payments, fee_rate=2.0, wallet_id=self.wallet_id)
+
+        assert len(backend.broadcasts) == 1
+        tx = Transaction.parse_hex(backend.broadcasts[0], network='testnet')
+        assert len(tx.inputs) == 1 and len(tx.outputs) == 4
+        for to_address, amount in payments:
+            assert tx.outputs[outputs[to_address]].address == to_address
+            assert tx.outputs[outputs[to_address]].value == amount
+        assert TransactionDB().get_raw_tx(txid) == bytes.fromhex(backend.broadcasts[0])
+        change = UtxoDB().select_candidates(self.wallet_id)
+        assert [(u.txid, u.vout) for u in change] == [(txid, 3)]
+        assert 80_000 - 45_000 - change[0].amount_sat >= 2.0 * tx.vsize
+
+    def test_send_many_rejects_invalid_payments(self, monkeypatch):
+        backend = FakeBackend()
+        wallet = BitcoinWallet(network='testnet', backend=backend)
+        recipient = "tb1qh4eju9vpchznqv043mdrk7t2s32freruty77qk"
+
+        with pytest.raises(ValueError):
+            wallet.send_many([])
+        with pytest.raises(ValueError):
+            wallet.send_many([(recipient, 100)])
+        # A negative payment must not be netted against another one to the same address
+        for payments in ([(recipient, 20_000), (recipient, -10_000)], [(recipient, 0)],
+                         [(recipient, 1000.5)], [(recipient, "1000")], [(recipient, True)]):
+            with pytest.raises(ValueError):
+                wallet.send_many(payments)
+
+        monkeypatch.delitem(DUST_LIMIT, 'p2wpkh')
+        with pytest.raises(ValueError, match="Unsupported output type"):
+            wallet.send_many([(recipient, 10_000)])
+        assert backend.broadcasts == []
+
+    def test_send_many_merges_repeated_recipients(self):
+        """
+        Test that several payments to one address become a single output.
+        """
+        from bitcoinlib.transactions import Transaction
+
+        backend = FakeBackend()
+        wallet = BitcoinWallet(network='testnet', backend=backend)
+        backend.add_utxo(wallet.get_address(), 'aa' * 32, 0, 100_000)
+        recipient, other = "tb1qh4eju9vpchznqv043mdrk7t2s32freruty77qk", "mipcBbFg9gMiCh81Kj8tqqdgoZub1ZJRfn"
+
+        _, outputs = wallet.send_many([(recipient, 10_000), (other, 7_000), (recipient, 5_000)], fee_rate=1.0)
+
+        tx = Transaction.parse_hex(backend.broadcasts[0], network='testnet')
+        assert outputs == {recipient: 0, other: 1}
+        assert [(o.address, o.value) for o in tx.outputs[:2]] == [(recipient, 15_000), (other, 7_000)]
+
+    def test_send_uses_fee_estimate(self):
+        """
+        Test that sends without a fee_rate pay the estimated rate for fee_target.
+        """
+        from bitcoinlib.transactions import Transaction
+
+        backend = FakeBackend()
+        backend.fee_estimates = {1: 30.0, 6: 10.0, 144: 2.0}
+        wallet = BitcoinWallet(network='testnet', backend=backend)
+        backend.add_utxo(wallet.get_address(), 'aa' * 32, 0, 100_000)
+
+        wallet.send_bitcoin("tb1qh4eju9vpchznqv043mdrk7t2s32freruty77qk", 10_000, fee_target='next_block')
+
+        tx = Transaction.parse_hex(backend.broadcasts[0], network='testnet')
+        fee = 100_000 - sum(output.value for output in tx.outputs)
+        assert 30.0 * tx.vsize <= fee < 31.0 * tx.vsize